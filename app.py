@@ -1,32 +1,172 @@
+import asyncio
 import hashlib
+import hmac
 import logging
 import os
-from datetime import date, timedelta
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from decimal import Decimal
+from typing import List, Optional, Set
 
-import asyncpg
-from aiogram import Bot
+from aiogram import Dispatcher
+from aiogram.types import Update
 from dotenv import load_dotenv
-from fastapi import FastAPI, Request
+from environs import Env
+from fastapi import FastAPI, Request, Response
 from fastapi.responses import PlainTextResponse
 
+from bot import build_dispatcher, on_startup
+from database import background_jobs, db, ledger, outbox
+from tgbot.config import LoggingConfig, WebhookConfig, load_config
 from tgbot.keyboards.inline import chane_sub
+from tgbot.misc.log import bind_log_context, setup_logging
+from tgbot.services.invite_pool import InviteLinkPool
+from tgbot.services.leader import LeaderElection
+from tgbot.services.metrics import HTTP_REQUEST_SECONDS, render_metrics
+from tgbot.services.migrations import apply_migrations
+from tgbot.services.pending import pending_payments
+from tgbot.services.robokassa import robokassa_client
+from tgbot.services.subscribers import CHANNEL_ACCESS_MODE, subscribers
+from tgbot.services.telegram import close_bot, get_bot
+from tgbot.services.tracing import SLOW_REQUEST_SECONDS, trace
 
 load_dotenv()
 
-BOT_TOKEN = os.getenv("BOT_TOKEN")
-
 CHANNEL_ID = int(os.getenv("CHANNEL_ID"))
 
-DB_DSN = os.getenv("DB_DSN")
-
 ROBO_PASS1 = os.getenv("ROBO_PASS1")
 
 ROBO_PASS2 = os.getenv("ROBO_PASS2")
 
-bot = Bot(BOT_TOKEN)
-app = FastAPI()
+INVITE_POOL_LOW = int(os.getenv("INVITE_POOL_LOW", "20"))
+
+INVITE_POOL_HIGH = int(os.getenv("INVITE_POOL_HIGH", "50"))
+
+INVITE_LINK_TTL_DAYS = int(os.getenv("INVITE_LINK_TTL_DAYS", "7"))
+
+# Пул ссылок пополняет одна реплика — та, что держит этот advisory lock.
+INVITE_POOL_LOCK_ID = 74100009
+
+# Ссылка с заявками на вступление для CHANNEL_ACCESS_MODE=join_request;
+# если не задана, создаётся при первой оплате.
+CHANNEL_JOIN_LINK = os.getenv("CHANNEL_JOIN_LINK")
+
+webhook_config = WebhookConfig.from_env(Env())
+
+dp: Optional[Dispatcher] = None
+
+webhook_slots = asyncio.Semaphore(webhook_config.max_concurrency)
+
+_webhook_tasks: Set[asyncio.Task] = set()
+
+setup_logging(LoggingConfig.from_env(Env()))
+
+invite_pool = InviteLinkPool(
+    db,
+    channel_id=CHANNEL_ID,
+    low_watermark=INVITE_POOL_LOW,
+    high_watermark=INVITE_POOL_HIGH,
+    link_ttl=timedelta(days=INVITE_LINK_TTL_DAYS),
+)
+
+
+async def start_webhook() -> List[asyncio.Task]:
+    """
+    Режим webhook: Dispatcher работает в этом же приложении с тем же
+    Bot и пулом БД; здесь же запускаются фоновые задачи под лидерством.
+    """
+    global dp
+
+    config = load_config(".env")
+    bot = get_bot(config.tg_bot.token)
+    dp = build_dispatcher(config, session_pool=db)
+    await on_startup(bot, config.tg_bot.admin_ids)
+    await bot.set_webhook(
+        url=webhook_config.url,
+        secret_token=webhook_config.secret,
+        max_connections=webhook_config.max_concurrency,
+        allowed_updates=dp.resolve_used_update_types(),
+    )
+    logging.info("🌐 Webhook установлен: %s", webhook_config.url)
+    return [asyncio.create_task(background_jobs())]
+
+
+async def drain_webhook_updates(timeout: float) -> None:
+    """
+    Дожидается обновлений, которые уже обрабатываются, чтобы они
+    не упали на закрытом пуле БД; не успевшие за timeout отменяются.
+    """
+    if not _webhook_tasks:
+        return
+    _, pending = await asyncio.wait(set(_webhook_tasks), timeout=timeout)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    if pending:
+        logging.warning("⏹ Отменено обновлений при остановке: %s", len(pending))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Открывает общий пул БД, применяет миграции и запускает пополнение
+    пула ссылок (под лидерством) или прогрев кэша подписчиков (а в
+    режиме webhook — и бота) на время жизни приложения.
+    """
+    await db.open()
+    async with db.acquire() as conn:
+        await apply_migrations(conn)
+    tasks = []
+    if CHANNEL_ACCESS_MODE == "join_request":
+        await subscribers.warm(db)
+    else:
+        leader = LeaderElection(db.dsn, INVITE_POOL_LOCK_ID, name="Пул ссылок")
+        tasks.append(asyncio.create_task(leader.run(invite_pool.run_forever)))
+    if webhook_config.enabled:
+        tasks += await start_webhook()
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+        await drain_webhook_updates(webhook_config.shutdown_timeout)
+        await robokassa_client.close()
+        await db.close()
+        await close_bot()
+
 
-logging.basicConfig(level=logging.INFO)
+app = FastAPI(lifespan=lifespan)
+
+
+@app.middleware("http")
+async def observe_latency(request: Request, call_next):
+    """
+    Гистограмма времени ответа по шаблону маршрута, заголовок
+    Server-Timing и трассировка: медленные запросы попадают в лог
+    с самыми долгими вызовами БД и Bot API.
+    """
+    name = f"HTTP {request.method} {request.url.path}"
+    status = 500
+    with trace(name, SLOW_REQUEST_SECONDS) as current:
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            response.headers["Server-Timing"] = (
+                f"app;dur={current.elapsed * 1000:.1f}"
+            )
+            return response
+        finally:
+            route = request.scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(
+                route.path if route is not None else "unmatched", status
+            ).observe(current.elapsed)
+
+
+@app.get("/metrics")
+async def metrics():
+    """Метрики для Prometheus."""
+    payload, content_type = render_metrics()
+    return Response(payload, media_type=content_type)
 
 
 def generate_signature(*parts: str) -> str:
@@ -35,6 +175,48 @@ def generate_signature(*parts: str) -> str:
     return hashlib.md5(raw_str.encode("utf-8")).hexdigest().upper()
 
 
+async def channel_join_link() -> str:
+    """Общая ссылка на вступление по заявке (создаётся один раз)."""
+    global CHANNEL_JOIN_LINK
+    if CHANNEL_JOIN_LINK is None:
+        link = await get_bot().create_chat_invite_link(
+            chat_id=CHANNEL_ID,
+            name="Заявки подписчиков",
+            creates_join_request=True,
+        )
+        CHANNEL_JOIN_LINK = link.invite_link
+        logging.info("🚪 Создана ссылка с заявками: %s", CHANNEL_JOIN_LINK)
+    return CHANNEL_JOIN_LINK
+
+
+async def _process_update(update: Update) -> None:
+    try:
+        await dp.feed_update(get_bot(), update)
+    except Exception as e:
+        logging.error("❌ Ошибка обработки update %s: %s", update.update_id, e)
+    finally:
+        webhook_slots.release()
+
+
+@app.post(webhook_config.path)
+async def telegram_webhook(request: Request):
+    """Приём обновлений Telegram в режиме webhook."""
+    if dp is None:
+        return Response(status_code=404)
+    secret = request.headers.get("X-Telegram-Bot-Api-Secret-Token")
+    if not hmac.compare_digest((secret or "").encode(), webhook_config.secret.encode()):
+        return Response(status_code=403)
+
+    update = Update.model_validate(await request.json(), context={"bot": get_bot()})
+    # Не больше max_concurrency обновлений в обработке одновременно;
+    # остальные запросы Telegram ждут здесь.
+    await webhook_slots.acquire()
+    task = asyncio.create_task(_process_update(update))
+    _webhook_tasks.add(task)
+    task.add_done_callback(_webhook_tasks.discard)
+    return Response(status_code=200)
+
+
 @app.get("/robokassa/result")
 async def robokassa_result(
     OutSum: str,
@@ -44,6 +226,7 @@ async def robokassa_result(
     SignatureValue: str,
 ):
     """Callback от Robokassa после оплаты (обновление подписки в БД)."""
+    bind_log_context(inv_id=InvId, user_id=Shp_user)
 
     my_crc = generate_signature(
         OutSum,
@@ -57,41 +240,30 @@ async def robokassa_result(
         logging.error("❌ Bad sign for InvId=%s", InvId)
         return PlainTextResponse("bad sign", status_code=400)
 
+    inv_id = int(InvId)
+    if ledger.is_processed(inv_id):
+        return PlainTextResponse(f"OK{InvId}")
+
     user_id = int(Shp_user)
     months = int(Shp_months)
-    user_name = f"user_{user_id}"
-    recurring_id = InvId
-
-    start_date = date.today()
-    end_date = start_date + timedelta(days=30 * months)
 
-    conn = await asyncpg.connect(DB_DSN)
-    try:
-        await conn.execute(
-            """
-            INSERT INTO public.privat_user (user_id,
-             user_name,
-              start_subscription,
-               end_subscription,
-                duration_months,
-                 recurring_id)
-            VALUES ($1, $2, $3, $4, $5, $6)
-            ON CONFLICT (user_id) DO UPDATE
-            SET start_subscription = EXCLUDED.start_subscription,
-                end_subscription = EXCLUDED.end_subscription,
-                duration_months = EXCLUDED.duration_months,
-                recurring_id = EXCLUDED.recurring_id,
-                user_name = EXCLUDED.user_name
-        """,
-            user_id,
-            user_name,
-            start_date,
-            end_date,
-            months,
-            recurring_id,
+    pending = await pending_payments.pop(inv_id)
+    expected = (user_id, months)
+    if pending is not None and (pending.user_id, pending.months) != expected:
+        logging.warning(
+            "⚠️ InvId=%s выставлялся user_id=%s на %s мес.",
+            inv_id,
+            pending.user_id,
+            pending.months,
         )
-    finally:
-        await conn.close()
+
+    applied = await ledger.apply_payment(
+        inv_id, user_id, f"user_{user_id}", months, Decimal(OutSum)
+    )
+    if not applied:
+        return PlainTextResponse(f"OK{InvId}")
+    if CHANNEL_ACCESS_MODE == "join_request":
+        await subscribers.add(user_id)
 
     logging.info(
         "✅ Оплата подтверждена: user_id=%s, months=%s", user_id, months
@@ -108,6 +280,7 @@ async def robokassa_success(
     SignatureValue: str,
 ):
     """Успешная оплата (видно в браузере клиента)."""
+    bind_log_context(inv_id=InvId, user_id=Shp_user)
 
     my_crc = generate_signature(
         OutSum,
@@ -123,21 +296,18 @@ async def robokassa_success(
 
     user_id = int(Shp_user)
 
-    invite_link = await bot.create_chat_invite_link(
-        chat_id=CHANNEL_ID,
-        expire_date=None,
-        member_limit=1,
-        name=f"Оплата InvId={InvId}",
-    )
-
-    await bot.send_message(
+    if CHANNEL_ACCESS_MODE == "join_request":
+        invite_link = await channel_join_link()
+    else:
+        invite_link = await invite_pool.claim(user_id)
+    await outbox.enqueue(
         user_id,
         f"✅ Оплата прошла успешно!\n"
-        f"Вот доступ в закрытый канал:\n{invite_link.invite_link}",
+        f"Вот доступ в закрытый канал:\n{invite_link}",
         reply_markup=chane_sub(),
     )
 
-    logging.info("🔑 Invite link создан для user_id=%s", user_id)
+    logging.info("🔑 Invite link выдан для user_id=%s", user_id)
     return PlainTextResponse("Оплата прошла успешно. Вернись в Telegram 😉")
 
 
@@ -0,0 +1,147 @@
+import asyncio
+import random
+import time
+from abc import ABC, abstractmethod
+from collections import Counter
+from typing import Any, Dict, Optional
+
+from aiohttp import web
+
+ROBOKASSA_OP_STATE = (
+    '<?xml version="1.0" encoding="utf-8"?>'
+    '<OperationStateResponse xmlns="http://merchant.roboxchange.com/'
+    'WebService/"><Result><Code>0</Code></Result>'
+    "<State><Code>100</Code></State></OperationStateResponse>"
+)
+
+
+class FakeServer(ABC):
+    """
+    Локальный HTTP-сервер на свободном порту с искусственной задержкой
+    (latency ± jitter секунд) и долей ответов 500 (error_rate).
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests: Counter = Counter()
+        self._random = random.Random(seed)
+        self._runner: Optional[web.AppRunner] = None
+        self.url = ""
+
+    @abstractmethod
+    def routes(self, app: web.Application) -> None:
+        """Регистрирует обработчики заглушки в app."""
+
+    async def start(self, host: str = "127.0.0.1") -> str:
+        app = web.Application()
+        self.routes(app)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _delay(self) -> bool:
+        """Ждёт задержку; возвращает True, если нужно ответить ошибкой."""
+        delay = self.latency + self._random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return self._random.random() < self.error_rate
+
+
+class FakeTelegram(FakeServer):
+    """Заглушка Bot API для методов, которые вызывает бот."""
+
+    def routes(self, app: web.Application) -> None:
+        app.router.add_post("/bot{token}/{method}", self.handle)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.requests[method] += 1
+        if await self._delay():
+            return web.json_response(
+                {
+                    "ok": False,
+                    "error_code": 500,
+                    "description": "Internal Server Error",
+                },
+                status=500,
+            )
+        data = await request.post()
+        return web.json_response({"ok": True, "result": self.result(method, data)})
+
+    def result(self, method: str, data: Any) -> Any:
+        now = int(time.time())
+        bot_user = {"id": 1, "is_bot": True, "first_name": "bench"}
+        if method == "getMe":
+            return bot_user
+        if method == "sendMessage":
+            chat_id = int(data.get("chat_id", 0))
+            return {
+                "message_id": self.requests[method],
+                "date": now,
+                "chat": {"id": chat_id, "type": "private"},
+                "text": data.get("text", ""),
+            }
+        if method == "createChatInviteLink":
+            return {
+                "invite_link": f"https://t.me/+bench{self.requests[method]}",
+                "creator": bot_user,
+                "creates_join_request": False,
+                "is_primary": False,
+                "is_revoked": False,
+                "member_limit": 1,
+            }
+        return True
+
+
+class FakeRobokassa(FakeServer):
+    """Заглушка Robokassa: рекуррентное списание и OpStateExt."""
+
+    def __init__(self, decline_rate: float = 0.0, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.decline_rate = decline_rate
+
+    @property
+    def recurring_url(self) -> str:
+        return f"{self.url}/Merchant/Recurring"
+
+    @property
+    def op_state_url(self) -> str:
+        return f"{self.url}/Merchant/WebService/Service.asmx/OpStateExt"
+
+    def routes(self, app: web.Application) -> None:
+        app.router.add_post("/Merchant/Recurring", self.recurring)
+        app.router.add_get(
+            "/Merchant/WebService/Service.asmx/OpStateExt", self.op_state
+        )
+
+    async def recurring(self, request: web.Request) -> web.Response:
+        self.requests["Recurring"] += 1
+        if await self._delay():
+            return web.Response(status=500, text="Internal Server Error")
+        data: Dict[str, Any] = dict(await request.post())
+        if self._random.random() < self.decline_rate:
+            return web.Response(text="ERROR")
+        return web.Response(text=f"OK+{data.get('InvoiceID')}")
+
+    async def op_state(self, request: web.Request) -> web.Response:
+        self.requests["OpStateExt"] += 1
+        if await self._delay():
+            return web.Response(status=500, text="Internal Server Error")
+        return web.Response(text=ROBOKASSA_OP_STATE, content_type="application/xml")
@@ -0,0 +1,100 @@
+import os
+import random
+import uuid
+from contextlib import asynccontextmanager
+from datetime import date, timedelta
+from typing import AsyncIterator
+from urllib.parse import urlsplit, urlunsplit
+
+import asyncpg
+
+from tgbot.services.migrations import apply_migrations
+
+# Колонки, которые заполняет seed_users; остальные получают DEFAULT.
+SEED_COLUMNS = [
+    "user_id",
+    "user_name",
+    "start_subscription",
+    "end_subscription",
+    "duration_months",
+    "recurring_id",
+]
+
+
+def _with_database(dsn: str, database: str) -> str:
+    parts = urlsplit(dsn)
+    return urlunsplit(parts._replace(path=f"/{database}"))
+
+
+@asynccontextmanager
+async def disposable_database(admin_dsn: str) -> AsyncIterator[str]:
+    """
+    Создаёт временную базу на сервере admin_dsn, применяет миграции
+    и удаляет базу после теста. Возвращает DSN новой базы.
+    """
+    name = f"privatbot_bench_{os.getpid()}_{uuid.uuid4().hex[:8]}"
+    admin = await asyncpg.connect(admin_dsn)
+    try:
+        await admin.execute(f'CREATE DATABASE "{name}"')
+        dsn = _with_database(admin_dsn, name)
+        conn = await asyncpg.connect(dsn)
+        try:
+            await apply_migrations(conn)
+        finally:
+            await conn.close()
+        yield dsn
+    finally:
+        await admin.execute(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)')
+        await admin.close()
+
+
+async def seed_users(
+    dsn: str,
+    count: int,
+    expired_share: float = 1.0,
+    recurring_share: float = 0.9,
+    first_user_id: int = 10_000_000,
+    seed: int = 1,
+) -> int:
+    """
+    Заполняет privat_user синтетическими подписками через COPY.
+    expired_share — доля истёкших вчера (их обработает продление),
+    recurring_share — доля с сохранённым recurring_id.
+    Возвращает число истёкших подписок.
+    """
+    rng = random.Random(seed)
+    today = date.today()
+    expired = 0
+    records = []
+    for i in range(count):
+        user_id = first_user_id + i
+        months = rng.choice((1, 3, 6, 9))
+        if rng.random() < expired_share:
+            end = today - timedelta(days=1)
+            expired += 1
+        else:
+            end = today + timedelta(days=rng.randint(1, 270))
+        recurring_id = str(1_000_000 + i) if rng.random() < recurring_share else None
+        records.append(
+            (
+                user_id,
+                f"user_{user_id}",
+                end - timedelta(days=30 * months),
+                end,
+                months,
+                recurring_id,
+            )
+        )
+
+    conn = await asyncpg.connect(dsn)
+    try:
+        await conn.copy_records_to_table(
+            "privat_user",
+            records=records,
+            columns=SEED_COLUMNS,
+            schema_name="public",
+        )
+        await conn.execute("ANALYZE public.privat_user")
+    finally:
+        await conn.close()
+    return expired
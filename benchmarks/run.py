@@ -0,0 +1,294 @@
+"""
+Нагрузочные тесты PrivatBot на локальных заглушках Bot API и Robokassa
+и одноразовой базе PostgreSQL.
+
+    python -m benchmarks.run payments --requests 5000 --concurrency 100
+    python -m benchmarks.run renewals --users 20000 --drain-outbox
+
+Подробности — в benchmarks/README.md.
+"""
+import argparse
+import asyncio
+import functools
+import logging
+import os
+import random
+from typing import Any, Awaitable, Callable, Dict, List
+
+import aiohttp
+
+from benchmarks.fakes import FakeRobokassa, FakeTelegram
+from benchmarks.postgres import disposable_database, seed_users
+from benchmarks.stats import LatencyRecorder
+
+FIRST_USER_ID = 10_000_000
+
+FIRST_BENCH_INV_ID = 2_000_000_000
+
+
+def configure_env(dsn: str, telegram: FakeTelegram, robokassa: FakeRobokassa) -> None:
+    """
+    Направляет сервис на одноразовую базу и заглушки. Вызывается до
+    импорта app/database: настройки читаются при импорте модулей.
+    """
+    os.environ.update(
+        {
+            "DB_DSN": dsn,
+            "BOT_TOKEN": "42:bench",
+            "BOT_API_SERVER": telegram.url,
+            "ROBOKASSA_RECURRING_URL": robokassa.recurring_url,
+            "ROBOKASSA_OP_STATE_URL": robokassa.op_state_url,
+            "WEBHOOK_ENABLED": "false",
+        }
+    )
+    for key, value in (
+        ("CHANNEL_ID", "-1001"),
+        ("ROBO_LOGIN", "bench"),
+        ("ROBO_PASS1", "bench1"),
+        ("ROBO_PASS2", "bench2"),
+    ):
+        os.environ.setdefault(key, value)
+
+
+def timed(
+    func: Callable[..., Awaitable[Any]], recorder: LatencyRecorder
+) -> Callable[..., Awaitable[Any]]:
+    """Обёртка, записывающая время каждого вызова func в recorder."""
+
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        ok = False
+        try:
+            result = await func(*args, **kwargs)
+            ok = True
+            return result
+        finally:
+            recorder.record(loop.time() - started, ok)
+
+    return wrapper
+
+
+async def hammer(
+    session: aiohttp.ClientSession,
+    url: str,
+    requests: List[Dict[str, str]],
+    concurrency: int,
+    recorder: LatencyRecorder,
+) -> None:
+    """Отправляет GET-запросы с параметрами requests в concurrency потоков."""
+    queue: asyncio.Queue = asyncio.Queue()
+    for params in requests:
+        queue.put_nowait(params)
+
+    async def worker() -> None:
+        while not queue.empty():
+            params = queue.get_nowait()
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            try:
+                async with session.get(url, params=params) as resp:
+                    await resp.read()
+                    ok = resp.status == 200
+            except aiohttp.ClientError:
+                ok = False
+            recorder.record(loop.time() - started, ok)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    recorder.finish()
+
+
+def payment_params(args: argparse.Namespace, password: str) -> List[Dict[str, str]]:
+    """Подписанные параметры callback'ов Robokassa для seeded-пользователей."""
+    from app import generate_signature
+
+    rng = random.Random(args.seed)
+    requests = []
+    for i in range(args.requests):
+        user_id = str(FIRST_USER_ID + rng.randrange(args.users))
+        months = str(rng.choice((1, 3, 6, 9)))
+        out_sum = "1290.00"
+        inv_id = str(FIRST_BENCH_INV_ID + i)
+        requests.append(
+            {
+                "OutSum": out_sum,
+                "InvId": inv_id,
+                "Shp_user": user_id,
+                "Shp_months": months,
+                "SignatureValue": generate_signature(
+                    out_sum,
+                    inv_id,
+                    password,
+                    f"Shp_months={months}",
+                    f"Shp_user={user_id}",
+                ),
+            }
+        )
+    return requests
+
+
+async def bench_payments(args: argparse.Namespace) -> List[LatencyRecorder]:
+    """Нагрузка на /robokassa/result и /robokassa/success через uvicorn."""
+    import uvicorn
+
+    import app as service
+
+    server = uvicorn.Server(
+        uvicorn.Config(
+            service.app,
+            host="127.0.0.1",
+            port=args.port,
+            log_level="warning",
+            access_log=False,
+        )
+    )
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        if serving.done():
+            await serving
+            raise RuntimeError("uvicorn не запустился")
+        await asyncio.sleep(0.05)
+
+    base = f"http://127.0.0.1:{args.port}"
+    scenarios = [
+        ("/robokassa/result", payment_params(args, os.environ["ROBO_PASS2"])),
+        ("/robokassa/success", payment_params(args, os.environ["ROBO_PASS1"])),
+    ]
+    recorders: List[LatencyRecorder] = []
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    try:
+        async with aiohttp.ClientSession(connector=connector) as session:
+            for path, params in scenarios:
+                # Время сценария считается от его старта, а не от
+                # подготовки параметров или предыдущего сценария.
+                recorder = LatencyRecorder(path)
+                recorders.append(recorder)
+                await hammer(
+                    session, f"{base}{path}", params, args.concurrency, recorder
+                )
+    finally:
+        server.should_exit = True
+        await serving
+    return recorders
+
+
+async def bench_renewals(args: argparse.Namespace) -> List[LatencyRecorder]:
+    """Прогон check_subscriptions по seeded-пользователям."""
+    import database
+    from tgbot.services.robokassa import robokassa_client
+    from tgbot.services.telegram import close_bot
+
+    await database.db.open()
+    try:
+        charges = LatencyRecorder("Списание Robokassa")
+        kicks = LatencyRecorder("Исключение из канала")
+        database.charge_recurring_payment = timed(
+            database.charge_recurring_payment, charges
+        )
+        database._kick_user = timed(database._kick_user, kicks)
+        recorders = [charges, kicks]
+        report = await database.check_subscriptions(
+            workers=args.workers or database.RENEWAL_WORKERS
+        )
+        charges.finish()
+        kicks.finish()
+        print(f"📊 {report}")
+        print(
+            f"📊 Продлений в минуту: {report.throughput * 60:.0f}, "
+            f"пул БД: {database.db.stats()}"
+        )
+
+        if args.drain_outbox:
+            drain = LatencyRecorder("Пачка outbox")
+            sent = 0
+            while True:
+                loop = asyncio.get_running_loop()
+                started = loop.time()
+                size = await database.outbox.drain_once()
+                if not size:
+                    break
+                drain.record(loop.time() - started)
+                sent += size
+            drain.finish()
+            print(
+                f"📨 Outbox: {sent} сообщений, " f"{sent / drain.elapsed:.1f} сообщ./с"
+            )
+            recorders.append(drain)
+    finally:
+        await robokassa_client.close()
+        await close_bot()
+        await database.db.close()
+    return recorders
+
+
+async def main(args: argparse.Namespace) -> None:
+    telegram = FakeTelegram(
+        latency=args.tg_latency,
+        jitter=args.tg_latency / 2,
+        error_rate=args.tg_error_rate,
+        seed=args.seed,
+    )
+    robokassa = FakeRobokassa(
+        latency=args.robokassa_latency,
+        jitter=args.robokassa_latency / 2,
+        error_rate=args.robokassa_error_rate,
+        decline_rate=args.decline_rate,
+        seed=args.seed,
+    )
+    await telegram.start()
+    await robokassa.start()
+    try:
+        async with disposable_database(args.admin_dsn) as dsn:
+            expired = await seed_users(
+                dsn,
+                args.users,
+                expired_share=args.expired_share,
+                recurring_share=args.recurring_share,
+                first_user_id=FIRST_USER_ID,
+                seed=args.seed,
+            )
+            print(f"🗄 Создано {args.users} подписок, истёкших: {expired}")
+            configure_env(dsn, telegram, robokassa)
+            if args.scenario == "payments":
+                recorders = await bench_payments(args)
+            else:
+                recorders = await bench_renewals(args)
+    finally:
+        await telegram.stop()
+        await robokassa.stop()
+
+    for recorder in recorders:
+        print(f"⏱ {recorder}")
+    print(f"🤖 Bot API: {dict(telegram.requests)}")
+    print(f"💳 Robokassa: {dict(robokassa.requests)}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("scenario", choices=("payments", "renewals"))
+    parser.add_argument(
+        "--admin-dsn",
+        default=os.getenv("BENCH_ADMIN_DSN", "postgresql://localhost/postgres"),
+        help="сервер PostgreSQL с правом CREATE DATABASE",
+    )
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--expired-share", type=float, default=1.0)
+    parser.add_argument("--recurring-share", type=float, default=0.9)
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--tg-latency", type=float, default=0.05)
+    parser.add_argument("--tg-error-rate", type=float, default=0.0)
+    parser.add_argument("--robokassa-latency", type=float, default=0.2)
+    parser.add_argument("--robokassa-error-rate", type=float, default=0.0)
+    parser.add_argument("--decline-rate", type=float, default=0.05)
+    parser.add_argument("--drain-outbox", action="store_true")
+    parser.add_argument("--seed", type=int, default=1)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=os.getenv("BENCH_LOG_LEVEL", "WARNING"))
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,47 @@
+import time
+from dataclasses import dataclass, field
+from typing import List
+
+
+@dataclass
+class LatencyRecorder:
+    """Задержки и ошибки одного сценария нагрузочного теста."""
+
+    name: str
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+    started_at: float = field(default_factory=time.perf_counter)
+    finished_at: float = 0.0
+
+    def record(self, seconds: float, ok: bool = True) -> None:
+        self.latencies.append(seconds)
+        if not ok:
+            self.errors += 1
+
+    def finish(self) -> None:
+        self.finished_at = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    @property
+    def throughput(self) -> float:
+        """Операций в секунду."""
+        return len(self.latencies) / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, q: float) -> float:
+        """Перцентиль задержки (nearest-rank), q в диапазоне 0..100."""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        rank = max(0, min(len(ordered) - 1, round(q / 100 * len(ordered)) - 1))
+        return ordered[rank]
+
+    def __str__(self) -> str:
+        return (
+            f"{self.name}: {len(self.latencies)} оп. за {self.elapsed:.2f} с, "
+            f"{self.throughput:.1f} оп./с, ошибок={self.errors}, "
+            f"p50={self.percentile(50) * 1000:.1f} мс, "
+            f"p99={self.percentile(99) * 1000:.1f} мс"
+        )
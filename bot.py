@@ -1,19 +1,28 @@
 import asyncio
 import logging
 
-import betterlogging as bl
 from aiogram import Bot, Dispatcher
-from aiogram.client.default import DefaultBotProperties
 from aiogram.fsm.storage.base import BaseStorage
 from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.fsm.storage.redis import DefaultKeyBuilder, RedisStorage
 from aiogram.types import (BotCommand, BotCommandScopeDefault,
                            MenuButtonCommands)
 
-from database import scheduler
+from database import background_jobs, db
 from tgbot.config import Config, load_config
-from tgbot.handlers import user_router
+from tgbot.handlers import routers_list
 from tgbot.middlewares.config import ConfigMiddleware
+from tgbot.middlewares.database import DatabaseMiddleware
+from tgbot.middlewares.log_context import LogContextMiddleware
+from tgbot.middlewares.metrics import MetricsMiddleware
+from tgbot.middlewares.tracing import HandlerTracingMiddleware, TracingMiddleware
+from tgbot.misc.log import setup_logging
+from tgbot.misc.storage import CachedRedisStorage
+from tgbot.services.metrics import start_metrics_server
+from tgbot.services.migrations import apply_migrations
+from tgbot.services.robokassa import robokassa_client
+from tgbot.services.subscribers import CHANNEL_ACCESS_MODE, subscribers
+from tgbot.services.telegram import close_bot, get_bot
 
 
 async def on_startup(bot: Bot, admin_ids: list[int]) -> None:
@@ -29,45 +38,76 @@ def register_global_middlewares(
     dp: Dispatcher, config: Config, session_pool=None
 ) -> None:
     """Регистрирует глобальные middleware."""
-    middlewares = [ConfigMiddleware(config)]
+    dp.update.outer_middleware(LogContextMiddleware())
+    dp.update.outer_middleware(TracingMiddleware())
+    middlewares = [MetricsMiddleware(), ConfigMiddleware(config)]
+    if session_pool is not None:
+        middlewares.append(DatabaseMiddleware(session_pool))
     for middleware in middlewares:
         dp.message.outer_middleware(middleware)
         dp.callback_query.outer_middleware(middleware)
+        dp.chat_join_request.outer_middleware(middleware)
+    handler_tracing = HandlerTracingMiddleware()
+    dp.message.middleware(handler_tracing)
+    dp.callback_query.middleware(handler_tracing)
+    dp.chat_join_request.middleware(handler_tracing)
 
 
-def setup_logging() -> None:
-    """Настройка цветного логирования."""
-    bl.basic_colorized_config(level=logging.INFO)
-    logging.getLogger(__name__).info("🚀 Starting bot...")
+def build_dispatcher(config: Config, session_pool=None) -> Dispatcher:
+    """Собирает Dispatcher (общий для polling и webhook режимов)."""
+    dp = Dispatcher(storage=get_storage(config))
+    dp.include_routers(*routers_list)
+    register_global_middlewares(dp, config, session_pool=session_pool)
+    return dp
 
 
 def get_storage(config: Config) -> BaseStorage:
-    """Возвращает хранилище (Redis или Memory)."""
+    """
+    Возвращает хранилище: Memory или Redis (по умолчанию с локальным
+    кэшем, FSM_CACHE_SIZE=0 его отключает).
+    """
     if config.tg_bot.use_redis:
-        return RedisStorage.from_url(
+        storage = RedisStorage.from_url(
             config.redis.dsn(),
             key_builder=DefaultKeyBuilder(with_bot_id=True, with_destiny=True),
         )
+        if config.tg_bot.fsm_cache_size:
+            return CachedRedisStorage(
+                storage, maxsize=config.tg_bot.fsm_cache_size
+            )
+        return storage
     return MemoryStorage()
 
 
 async def main() -> None:
     """Основная точка входа."""
-    setup_logging()
     config = load_config(".env")
-    storage = get_storage(config)
-
-    bot = Bot(
-        token=config.tg_bot.token,
-        default=DefaultBotProperties(parse_mode="HTML"),
-    )
-    dp = Dispatcher(storage=storage)
-    dp.include_router(user_router)
-    register_global_middlewares(dp, config)
-    asyncio.create_task(scheduler())
-
-    await on_startup(bot, config.tg_bot.admin_ids)
-    await dp.start_polling(bot)
+    setup_logging(config.logging)
+    logging.info("🚀 Starting bot...")
+    if config.webhook.enabled:
+        logging.error(
+            "WEBHOOK_ENABLED=true: бот обслуживается приложением app.py "
+            "(uvicorn app:app), polling не запускается"
+        )
+        return
+
+    start_metrics_server()
+    bot = get_bot(config.tg_bot.token)
+    await db.open()
+    async with db.acquire() as conn:
+        await apply_migrations(conn)
+    if CHANNEL_ACCESS_MODE == "join_request":
+        await subscribers.warm(db)
+    dp = build_dispatcher(config, session_pool=db)
+    asyncio.create_task(background_jobs())
+
+    try:
+        await on_startup(bot, config.tg_bot.admin_ids)
+        await dp.start_polling(bot)
+    finally:
+        await robokassa_client.close()
+        await close_bot()
+        await db.close()
 
 
 if __name__ == "__main__":
@@ -1,25 +1,102 @@
 import asyncio
+import functools
 import logging
 import os
-from datetime import date, datetime, timedelta
-from typing import Optional
+import random
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
 import asyncpg
-import pytz
-from aiogram import Bot
 from dotenv import load_dotenv
 
-load_dotenv()
+from tgbot.services.broadcast import BroadcastEngine
+from tgbot.services.leader import LeaderElection
+from tgbot.services.ledger import PaymentLedger
+from tgbot.services.metrics import (
+    DB_QUERY_SECONDS,
+    RENEWAL_OUTCOMES,
+    RENEWAL_RUN_SECONDS,
+)
+from tgbot.services.outbox import NotificationOutbox
+from tgbot.services.robokassa import (
+    INVOICE_FAILED_STATES,
+    INVOICE_PAID_STATES,
+    RobokassaError,
+    robokassa_client,
+)
+from tgbot.services.scheduler import (
+    DailySchedule,
+    IntervalSchedule,
+    RenewalWindow,
+    Scheduler,
+)
+from tgbot.services.stats import SubscriptionStats
+from tgbot.services.subscribers import CHANNEL_ACCESS_MODE, subscribers
+from tgbot.services.telegram import get_bot, telegram_limiter
+from tgbot.services.tracing import span
 
-BOT_TOKEN = os.getenv("BOT_TOKEN")
+load_dotenv()
 
 CHANNEL_ID = os.getenv("CHANNEL_ID")
 
 DB_DSN = os.getenv("DB_DSN")
 
-bot = Bot(BOT_TOKEN)
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+
+DB_POOL_ACQUIRE_TIMEOUT = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", "5"))
+
+RENEWAL_WORKERS = int(os.getenv("RENEWAL_WORKERS", "20"))
+
+RENEWAL_PROGRESS_EVERY = int(os.getenv("RENEWAL_PROGRESS_EVERY", "500"))
+
+RENEWAL_DB_CHUNK = int(os.getenv("RENEWAL_DB_CHUNK", "5000"))
+
+RENEWAL_SCAN_CHUNK = int(os.getenv("RENEWAL_SCAN_CHUNK", "1000"))
+
+REMINDER_DAYS_BEFORE = int(os.getenv("REMINDER_DAYS_BEFORE", "3"))
+
+STATS_RECONCILE_HOUR = int(os.getenv("STATS_RECONCILE_HOUR", "4"))
+
+# burst — все продления в RENEWAL_START_HOUR;
+# window — равномерно в течение RENEWAL_WINDOW_HOURS часов.
+RENEWAL_MODE = os.getenv("RENEWAL_MODE", "burst")
+
+RENEWAL_START_HOUR = int(os.getenv("RENEWAL_START_HOUR", "8"))
+
+RENEWAL_WINDOW_HOURS = int(os.getenv("RENEWAL_WINDOW_HOURS", "12"))
+
+RENEWAL_TICK_SECONDS = int(os.getenv("RENEWAL_TICK_SECONDS", "300"))
+
+# Отсрочка после неудачной попытки продления: удваивается с каждой
+# попыткой, но не больше RENEWAL_RETRY_MAX_SECONDS.
+RENEWAL_RETRY_SECONDS = int(os.getenv("RENEWAL_RETRY_SECONDS", "1800"))
+
+RENEWAL_RETRY_MAX_SECONDS = int(os.getenv("RENEWAL_RETRY_MAX_SECONDS", "86400"))
+
+# Число шардов продления: каждый шард (user_id % SCHEDULER_SHARDS)
+# обслуживает реплика, взявшая его advisory lock.
+SCHEDULER_SHARDS = int(os.getenv("SCHEDULER_SHARDS", "1"))
 
-MoscowTimeZone = pytz.timezone("Europe/Moscow")
+SCHEDULER_LOCK_ID = 74100018
+
+SCHEDULER_RETRY_SECONDS = float(os.getenv("SCHEDULER_RETRY_SECONDS", "10"))
+
+renewal_window = RenewalWindow(RENEWAL_START_HOUR, RENEWAL_WINDOW_HOURS)
 
 TARIFF_PRICES = {
     1: 1290,
@@ -28,6 +105,145 @@ TARIFF_PRICES = {
     9: 8990,
 }
 
+RENEWED_MESSAGE = (
+    "✅ Подписка автоматически продлена. Спасибо, что остаетесь с нами!"
+)
+
+PAYMENT_FAILED_MESSAGE = "❌ Автоплатёж не прошёл, подписка завершена."
+
+EXPIRED_MESSAGE = "❌ Срок подписки истёк, доступ закрыт."
+
+REMINDER_MESSAGE = (
+    "⏳ Ваша подписка скоро закончится. Продлите её, чтобы не потерять"
+    " доступ к каналу."
+)
+
+
+class DbPool:
+    """
+    Общий пул соединений asyncpg для FastAPI, планировщика и хэндлеров.
+    Открывается один раз на старте процесса и закрывается при остановке.
+    """
+
+    def __init__(
+        self,
+        dsn: Optional[str] = DB_DSN,
+        min_size: int = DB_POOL_MIN_SIZE,
+        max_size: int = DB_POOL_MAX_SIZE,
+        acquire_timeout: float = DB_POOL_ACQUIRE_TIMEOUT,
+    ):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self._pool: Optional[asyncpg.Pool] = None
+        self.acquired = 0
+        self.timeouts = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.wait_seconds = 0.0
+
+    @property
+    def pool(self) -> asyncpg.Pool:
+        if self._pool is None:
+            raise RuntimeError("Пул БД не открыт, вызовите DbPool.open()")
+        return self._pool
+
+    async def open(self) -> None:
+        """Создаёт пул (повторный вызов ничего не делает)."""
+        if self._pool is not None:
+            return
+        self._pool = await asyncpg.create_pool(
+            self.dsn, min_size=self.min_size, max_size=self.max_size
+        )
+        logging.info(
+            "🗄 Пул БД открыт (min=%s, max=%s)", self.min_size, self.max_size
+        )
+
+    async def close(self) -> None:
+        if self._pool is None:
+            return
+        pool, self._pool = self._pool, None
+        await pool.close()
+        logging.info("🗄 Пул БД закрыт")
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[asyncpg.Connection]:
+        """Берёт соединение из пула с таймаутом и учётом загрузки."""
+        pool = self.pool
+        started = time.monotonic()
+        try:
+            conn = await pool.acquire(timeout=self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logging.warning(
+                "⏳ Нет свободных соединений в пуле за %s с",
+                self.acquire_timeout,
+            )
+            raise
+        self.wait_seconds += time.monotonic() - started
+        self.acquired += 1
+        self.in_use += 1
+        self.peak_in_use = max(self.peak_in_use, self.in_use)
+        try:
+            yield conn
+        finally:
+            self.in_use -= 1
+            await pool.release(conn)
+
+    async def execute(self, query: str, *args: Any) -> str:
+        with DB_QUERY_SECONDS.labels("execute").time(), span("db:execute"):
+            async with self.acquire() as conn:
+                return await conn.execute(query, *args)
+
+    async def fetch(self, query: str, *args: Any) -> list:
+        with DB_QUERY_SECONDS.labels("fetch").time(), span("db:fetch"):
+            async with self.acquire() as conn:
+                return await conn.fetch(query, *args)
+
+    async def fetchrow(self, query: str, *args: Any):
+        with DB_QUERY_SECONDS.labels("fetchrow").time(), span("db:fetchrow"):
+            async with self.acquire() as conn:
+                return await conn.fetchrow(query, *args)
+
+    async def fetchval(self, query: str, *args: Any) -> Any:
+        with DB_QUERY_SECONDS.labels("fetchval").time(), span("db:fetchval"):
+            async with self.acquire() as conn:
+                return await conn.fetchval(query, *args)
+
+    def stats(self) -> Dict[str, Any]:
+        """Счётчики утилизации пула."""
+        size = idle = 0
+        if self._pool is not None:
+            size = self._pool.get_size()
+            idle = self._pool.get_idle_size()
+        return {
+            "size": size,
+            "idle": idle,
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "in_use": self.in_use,
+            "peak_in_use": self.peak_in_use,
+            "acquired": self.acquired,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": (
+                self.wait_seconds / self.acquired * 1000
+                if self.acquired
+                else 0.0
+            ),
+        }
+
+
+db = DbPool()
+
+outbox = NotificationOutbox(db)
+
+ledger = PaymentLedger(db)
+
+broadcasts = BroadcastEngine(db)
+
+stats = SubscriptionStats(db, TARIFF_PRICES)
+
 
 async def add_subscription(
     user_id: int,
@@ -38,12 +254,11 @@ async def add_subscription(
     """
     Создаёт или обновляет подписку в БД.
     """
-    conn = await asyncpg.connect(DB_DSN)
     try:
         start_date = date.today()
         end_date = start_date + timedelta(days=30 * months)
 
-        await conn.execute(
+        await db.execute(
             """
             INSERT INTO public.privat_user(
             user_id,
@@ -59,7 +274,10 @@ async def add_subscription(
                 end_subscription = EXCLUDED.end_subscription,
                 duration_months = EXCLUDED.duration_months,
                 recurring_id = EXCLUDED.recurring_id,
-                user_name = EXCLUDED.user_name
+                user_name = EXCLUDED.user_name,
+                renewal_attempts = 0,
+                next_renewal_attempt_at = NULL,
+                renewal_inv_id = NULL
             """,
             user_id,
             user_name,
@@ -71,116 +289,461 @@ async def add_subscription(
         logging.info("✅ Подписка для user_id=%s обновлена/создана", user_id)
     except Exception as e:
         logging.error("❌ Ошибка при добавлении подписки: %s", e)
-    finally:
-        await conn.close()
 
 
-async def charge_recurring_payment(recurring_id: str, amount: int) -> str:
+async def charge_recurring_payment(user_id: int, recurring_id: str, amount: int) -> str:
     """
-    Заглушка для рекуррентного платежа.
-    Здесь нужно вызвать реальный API Робокассы.
+    Рекуррентный платёж через общий клиент Robokassa.
+    InvId записывается в privat_user.renewal_inv_id до запроса: если
+    результат списания не будет записан (сбой, смена лидера), следующая
+    попытка сверит этот счёт (_previous_charge_paid), а не спишет снова.
+    При недоступности Robokassa бросает RobokassaError, и пользователь
+    остаётся в БД до следующего запуска.
     """
-    logging.info(
-        "⚡ Платёж по recurring_id=%s на сумму %s", recurring_id, amount
+    invoice_id = await ledger.allocate()
+    await db.execute(
+        "UPDATE public.privat_user SET renewal_inv_id = $2 WHERE user_id = $1",
+        user_id,
+        invoice_id,
+    )
+    return await robokassa_client.charge_recurring(
+        recurring_id, amount, invoice_id
     )
-    # TODO: реализовать реальный запрос к API Робокассы
-    return "OK"
 
 
-async def check_subscriptions() -> None:
+async def _previous_charge_paid(invoice_id: int) -> bool:
+    """
+    Исход прошлого списания, результат которого не был записан:
+    True — деньги получены, False — списания не было, можно
+    списывать заново. Если счёт ещё в обработке, бросает
+    RobokassaError, и попытка откладывается.
+    """
+    state = await robokassa_client.invoice_state(invoice_id)
+    if state in INVOICE_PAID_STATES:
+        return True
+    if state is None or state in INVOICE_FAILED_STATES:
+        return False
+    raise RobokassaError(f"Счёт {invoice_id} ещё в обработке (state={state})")
+
+
+@dataclass
+class RenewalReport:
+    """Итоги и прогресс одного прогона продления подписок."""
+
+    total: int = 0
+    processed: int = 0
+    renewed: int = 0
+    removed: int = 0
+    errors: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    @property
+    def throughput(self) -> float:
+        """Обработано пользователей в секунду."""
+        elapsed = self.elapsed
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.processed}/{self.total} обработано, "
+            f"продлено={self.renewed}, удалено={self.removed}, "
+            f"ошибок={self.errors}, {self.elapsed:.1f} с, "
+            f"{self.throughput:.1f} польз./с"
+        )
+
+
+@dataclass
+class RenewalBatch:
+    """Исходы продления, накопленные для пакетной записи в БД."""
+
+    renewals: List[Tuple[int, date]] = field(default_factory=list)
+    removals: List[Tuple[int, str]] = field(default_factory=list)
+    failures: List[int] = field(default_factory=list)
+
+
+async def check_subscriptions(
+    workers: int = RENEWAL_WORKERS,
+    window_offset: Optional[int] = None,
+    chunk_size: int = RENEWAL_SCAN_CHUNK,
+    shard: int = 0,
+    shards: int = 1,
+) -> RenewalReport:
     """
     Проверяет подписки пользователей и продлевает их,
     отключает при отсутствии оплаты.
+    Истёкшие подписки читаются страницами по chunk_size
+    (_expired_chunks), и каждая страница обрабатывается целиком:
+    списания и исключения из канала выполняются параллельно не более
+    чем workers воркерами через лимитеры, затем изменения в БД и
+    уведомления в outbox применяются пакетно (apply_renewal_outcomes).
+    Пользователи, у которых списание или исключение из канала
+    завершилось ошибкой, откладываются с экспоненциальной отсрочкой.
+    Если задан window_offset, из подписок, истёкших вчера, берутся
+    только те, чей слот в renewal_window не позже window_offset;
+    более старые просроченные подписки обрабатываются сразу.
+    При shards > 1 обрабатываются только user_id % shards == shard.
     """
-    conn = await asyncpg.connect(DB_DSN)
+    report = RenewalReport()
     try:
         today = date.today()
 
-        rows = await conn.fetch(
-            """
-            SELECT user_id, duration_months, recurring_id
+        async for rows in _expired_chunks(
+            today, window_offset, chunk_size, shard, shards
+        ):
+            report.total += len(rows)
+
+            batch = RenewalBatch()
+            await _run_workers(
+                rows,
+                lambda row: _charge_user(row, today, batch, report),
+                workers,
+                report,
+            )
+
+            kicked: List[Tuple[int, str]] = []
+            await _run_workers(
+                batch.removals,
+                lambda item: _kick_user(*item, kicked),
+                workers,
+                report,
+            )
+
+            kicked_ids = {user_id for user_id, _ in kicked}
+            batch.failures.extend(
+                user_id for user_id, _ in batch.removals if user_id not in kicked_ids
+            )
+
+            await apply_renewal_outcomes(today, batch.renewals, kicked, batch.failures)
+            report.renewed += len(batch.renewals)
+            report.removed += len(kicked)
+
+    except Exception as e:
+        logging.error("❌ Ошибка при проверке подписок: %s", e)
+        raise
+    finally:
+        RENEWAL_RUN_SECONDS.observe(report.elapsed)
+        logging.info("📊 Продление подписок: %s", report)
+        logging.info("🗄 Пул БД: %s", db.stats())
+    return report
+
+
+async def _expired_chunks(
+    today: date,
+    window_offset: Optional[int],
+    chunk_size: int,
+    shard: int = 0,
+    shards: int = 1,
+) -> AsyncIterator[list]:
+    """
+    Истёкшие подписки страницами по user_id (keyset-пагинация).
+    Соединение берётся только на время запроса страницы; продлённые
+    и удалённые на предыдущих страницах строки повторно не читаются.
+    Пользователи, чья следующая попытка ещё не наступила, пропускаются.
+    """
+    last_user_id = None
+    while True:
+        rows = await db.fetch(
+            f"""
+            SELECT user_id, duration_months, recurring_id, renewal_inv_id
             FROM public.privat_user
             WHERE end_subscription < $1
+              AND (
+                $2::int IS NULL
+                OR end_subscription < $1::date - 1
+                OR {renewal_window.sql_slot()} <= $2
+              )
+              AND ($3::bigint IS NULL OR user_id > $3)
+              AND ($6::int = 1 OR mod(user_id, $6) = $5)
+              AND (
+                next_renewal_attempt_at IS NULL
+                OR next_renewal_attempt_at <= now()
+              )
+            ORDER BY user_id
+            LIMIT $4
             """,
             today,
+            window_offset,
+            last_user_id,
+            chunk_size,
+            shard,
+            shards,
         )
+        if rows:
+            yield rows
+        if len(rows) < chunk_size:
+            return
+        last_user_id = rows[-1]["user_id"]
+
+
+async def _run_workers(
+    items: Sequence[Any],
+    handle: Callable[[Any], Awaitable[None]],
+    workers: int,
+    report: RenewalReport,
+) -> None:
+    """Обрабатывает items не более чем workers корутинами сразу."""
+    queue: asyncio.Queue = asyncio.Queue()
+    for item in items:
+        queue.put_nowait(item)
+
+    async def worker() -> None:
+        while True:
+            try:
+                item = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                await handle(item)
+            except Exception as e:
+                report.errors += 1
+                logging.error("❌ Ошибка продления (%s): %s", item, e)
 
-        for row in rows:
-            user_id = row["user_id"]
-            months = row["duration_months"]
-            recurring_id = row["recurring_id"]
+    await asyncio.gather(*(worker() for _ in range(min(workers, len(items)))))
 
-            if recurring_id:
-                amount = TARIFF_PRICES.get(months, 1290)
-                result = await charge_recurring_payment(recurring_id, amount)
 
-                if "OK" in result:
-                    new_end = today + timedelta(days=30 * months)
+async def _charge_user(
+    row, today: date, batch: RenewalBatch, report: RenewalReport
+) -> None:
+    """Списывает оплату и записывает исход продления в batch."""
+    user_id = row["user_id"]
+    months = row["duration_months"]
+    recurring_id = row["recurring_id"]
+
+    try:
+        if not recurring_id:
+            RENEWAL_OUTCOMES.labels("expired").inc()
+            batch.removals.append((user_id, EXPIRED_MESSAGE))
+            return
+
+        renewal_inv_id = row["renewal_inv_id"]
+        if renewal_inv_id is not None and await _previous_charge_paid(renewal_inv_id):
+            result = f"OK+{renewal_inv_id}"
+            logging.info(
+                "🔁 Списание InvId=%s для user_id=%s уже прошло", renewal_inv_id, user_id
+            )
+        else:
+            amount = TARIFF_PRICES.get(months, 1290)
+            result = await charge_recurring_payment(user_id, recurring_id, amount)
+
+        if "OK" in result:
+            RENEWAL_OUTCOMES.labels("renewed").inc()
+            new_end = today + timedelta(days=30 * months)
+            batch.renewals.append((user_id, new_end))
+            logging.info("🔄 Продлена подписка для user_id=%s", user_id)
+        else:
+            RENEWAL_OUTCOMES.labels("payment_failed").inc()
+            batch.removals.append((user_id, PAYMENT_FAILED_MESSAGE))
+    except Exception:
+        RENEWAL_OUTCOMES.labels("error").inc()
+        batch.failures.append(user_id)
+        raise
+    finally:
+        report.processed += 1
+        if report.processed % RENEWAL_PROGRESS_EVERY == 0:
+            logging.info("⏱ Продление подписок: %s", report)
+
+
+async def _kick_user(
+    user_id: int, message: str, kicked: List[Tuple[int, str]]
+) -> None:
+    """Исключает пользователя из канала (ban + unban)."""
+    bot = get_bot()
+    await telegram_limiter.call(
+        lambda: bot.ban_chat_member(CHANNEL_ID, user_id)
+    )
+    await telegram_limiter.call(
+        lambda: bot.unban_chat_member(CHANNEL_ID, user_id)
+    )
+    kicked.append((user_id, message))
+    logging.info("❌ Удалён user_id=%s (причина: %s)", user_id, message)
+
+
+async def apply_renewal_outcomes(
+    today: date,
+    renewals: Sequence[Tuple[int, date]],
+    removals: Sequence[Tuple[int, str]],
+    failures: Sequence[int] = (),
+    chunk_size: int = RENEWAL_DB_CHUNK,
+) -> None:
+    """
+    Применяет итоги продления set-based запросами: по одному UPDATE
+    продлённых, DELETE удалённых, UPDATE отложенных после ошибки
+    и одна вставка уведомлений в outbox на каждый чанк,
+    каждый чанк в своей транзакции.
+    """
+    total = max(len(renewals), len(removals), len(failures))
+    for i in range(0, total, chunk_size):
+        end = i + chunk_size
+        renew_chunk = renewals[i:end]
+        remove_chunk = removals[i:end]
+        failed_chunk = failures[i:end]
+        async with db.acquire() as conn:
+            async with conn.transaction():
+                if renew_chunk:
                     await conn.execute(
                         """
-                        UPDATE public.privat_user
-                        SET start_subscription=$1, end_subscription=$2
-                        WHERE user_id=$3
+                        UPDATE public.privat_user AS u
+                        SET start_subscription = $1,
+                            end_subscription = r.end_subscription,
+                            renewal_attempts = 0,
+                            next_renewal_attempt_at = NULL,
+                            renewal_inv_id = NULL
+                        FROM unnest($2::bigint[], $3::date[])
+                            AS r(user_id, end_subscription)
+                        WHERE u.user_id = r.user_id
                         """,
                         today,
-                        new_end,
-                        user_id,
-                    )
-                    await bot.send_message(
-                        user_id,
-                        "✅ Подписка автоматически продлена."
-                        " Спасибо, что остаетесь с нами!",
+                        [user_id for user_id, _ in renew_chunk],
+                        [new_end for _, new_end in renew_chunk],
                     )
-                    logging.info(
-                        "🔄 Продлена подписка для user_id=%s", user_id
+                if remove_chunk:
+                    await conn.execute(
+                        "DELETE FROM public.privat_user "
+                        "WHERE user_id = ANY($1::bigint[])",
+                        [user_id for user_id, _ in remove_chunk],
                     )
-                else:
-                    await _remove_user(
-                        conn,
-                        user_id,
-                        "❌ Автоплатёж не прошёл, подписка завершена.",
+                if failed_chunk:
+                    await conn.execute(
+                        """
+                        UPDATE public.privat_user
+                        SET renewal_attempts = renewal_attempts + 1,
+                            next_renewal_attempt_at = now() + least(
+                                $2 * power(2, least(renewal_attempts, 20)),
+                                $3
+                            ) * interval '1 second'
+                        WHERE user_id = ANY($1::bigint[])
+                        """,
+                        list(failed_chunk),
+                        RENEWAL_RETRY_SECONDS,
+                        RENEWAL_RETRY_MAX_SECONDS,
                     )
-            else:
-                await _remove_user(
-                    conn, user_id, "❌ Срок подписки истёк, доступ закрыт."
+                await outbox.enqueue_many(
+                    [(user_id, RENEWED_MESSAGE) for user_id, _ in renew_chunk]
+                    + list(remove_chunk),
+                    conn=conn,
                 )
+        if CHANNEL_ACCESS_MODE == "join_request":
+            await subscribers.add_many(user_id for user_id, _ in renew_chunk)
+            await subscribers.discard_many(
+                user_id for user_id, _ in remove_chunk
+            )
 
-    except Exception as e:
-        logging.error("❌ Ошибка при проверке подписок: %s", e)
-    finally:
-        await conn.close()
 
+async def send_expiry_reminders(
+    days_before: int = REMINDER_DAYS_BEFORE,
+) -> None:
+    """
+    Напоминает пользователям без автопродления, что подписка
+    закончится через days_before дней.
+    """
+    expires = date.today() + timedelta(days=days_before)
+    rows = await db.fetch(
+        """
+        SELECT user_id
+        FROM public.privat_user
+        WHERE end_subscription = $1 AND recurring_id IS NULL
+        """,
+        expires,
+    )
+    await outbox.enqueue_many(
+        [(row["user_id"], REMINDER_MESSAGE) for row in rows]
+    )
+    logging.info("🔔 Напоминания об окончании подписки: %s", len(rows))
 
-async def _remove_user(conn, user_id: int, message: str) -> None:
-    """Удаляет пользователя из БД и блокирует доступ в канал."""
-    try:
-        await bot.ban_chat_member(CHANNEL_ID, user_id)
-        await bot.unban_chat_member(CHANNEL_ID, user_id)  # «кик» пользователя
-        await conn.execute(
-            "DELETE FROM public.privat_user WHERE user_id=$1", user_id
+
+async def check_due_subscriptions(
+    shard: int = 0, shards: int = 1
+) -> RenewalReport:
+    """Обрабатывает пользователей, чей слот в окне продлений уже наступил."""
+    offset = renewal_window.offset(datetime.now(timezone.utc))
+    return await check_subscriptions(
+        window_offset=offset, shard=shard, shards=shards
+    )
+
+
+async def scheduler(shard: int = 0, shards: int = 1) -> None:
+    """
+    Планировщик: продление подписок каждый день в 08:00 по МСК
+    (или небольшими пачками в течение окна при RENEWAL_MODE=window)
+    и напоминания об окончании подписки в 12:00 по МСК.
+    При shards > 1 продлевает только свой шард, а напоминания
+    и сверку статистики выполняет планировщик шарда 0.
+    """
+    suffix = f":{shard}/{shards}" if shards > 1 else ""
+    jobs = Scheduler(db)
+    if RENEWAL_MODE == "window":
+        jobs.add_job(
+            f"renewal_window{suffix}",
+            IntervalSchedule(RENEWAL_TICK_SECONDS),
+            functools.partial(check_due_subscriptions, shard, shards),
         )
-        await bot.send_message(user_id, message)
-        logging.info("❌ Удалён user_id=%s (причина: %s)", user_id, message)
-    except Exception as e:
-        logging.error("⚠️ Ошибка при удалении пользователя %s: %s", user_id, e)
+    else:
+        jobs.add_job(
+            f"check_subscriptions{suffix}",
+            DailySchedule(RENEWAL_START_HOUR),
+            functools.partial(check_subscriptions, shard=shard, shards=shards),
+        )
+    if shard == 0:
+        jobs.add_job(
+            "expiry_reminders", DailySchedule(12), send_expiry_reminders
+        )
+        jobs.add_job(
+            "stats_reconcile",
+            DailySchedule(STATS_RECONCILE_HOUR),
+            stats.reconcile,
+        )
+    logging.info("📅 Планировщик запущен%s", suffix)
+    await jobs.run_forever()
 
 
-async def scheduler() -> None:
+async def background_jobs(shards: int = SCHEDULER_SHARDS) -> None:
     """
-    Планировщик: проверяет подписки каждый день в 08:00 по МСК.
+    Фоновые задачи с побочными эффектами (планировщик, outbox,
+    рассылки), безопасные при нескольких репликах: каждый шард
+    продления выполняет только реплика, удерживающая его advisory
+    lock; outbox, рассылки и напоминания идут вместе с шардом 0.
+    Реплика, которая уже ведёт шарды, пытается взять свободный шард
+    реже остальных.
     """
-    logging.info("📅 Планировщик запущен (ожидание 08:00 по МСК)")
+    elections = [
+        LeaderElection(
+            db.dsn,
+            SCHEDULER_LOCK_ID + shard,
+            name=f"Шард {shard}/{shards}",
+            retry_interval=SCHEDULER_RETRY_SECONDS,
+        )
+        for shard in range(shards)
+    ]
 
-    while True:
-        now = datetime.now(MoscowTimeZone)
+    def backoff() -> float:
+        leading = sum(election.is_leader for election in elections)
+        return SCHEDULER_RETRY_SECONDS * (1 + leading)
 
-        if now.hour == 8 and now.minute == 0:
-            logging.info("🔄 Запуск проверки подписок...")
-            try:
-                await check_subscriptions()
-                logging.info("✅ Проверка подписок завершена успешно")
-            except Exception as e:
-                logging.error("❌ Ошибка в check_subscriptions: %s", e)
-            await asyncio.sleep(60)  # чтобы не зациклиться
+    async def shard_work(shard: int) -> None:
+        if shard == 0:
+            await asyncio.gather(
+                scheduler(0, shards),
+                outbox.run_forever(),
+                broadcasts.run_forever(),
+            )
+        else:
+            await scheduler(shard, shards)
 
-        await asyncio.sleep(30)
+    await asyncio.gather(
+        *(
+            election.run(
+                functools.partial(shard_work, shard),
+                backoff,
+                # Реплики, стартовавшие одновременно, разбирают шарды
+                # вперемешку, а не все достаются первой.
+                initial_delay=random.uniform(0, SCHEDULER_RETRY_SECONDS)
+                if shards > 1
+                else 0,
+            )
+            for shard, election in enumerate(elections)
+        )
+    )
@@ -0,0 +1,16 @@
+-- Подписчики закрытого канала.
+CREATE TABLE IF NOT EXISTS public.privat_user (
+    user_id BIGINT PRIMARY KEY,
+    user_name TEXT,
+    start_subscription DATE,
+    end_subscription DATE,
+    duration_months INT,
+    recurring_id TEXT
+);
+
+-- Продление (end_subscription < $1) и напоминания
+-- (end_subscription = $1) ищут по дате окончания; INCLUDE даёт
+-- index-only scan без чтения строк таблицы.
+CREATE INDEX IF NOT EXISTS privat_user_end_subscription_idx
+    ON public.privat_user (end_subscription)
+    INCLUDE (user_id, duration_months, recurring_id);
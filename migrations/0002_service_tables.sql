@@ -0,0 +1,56 @@
+-- Время последнего запуска задач планировщика.
+CREATE TABLE IF NOT EXISTS public.scheduler_runs (
+    job_name TEXT PRIMARY KEY,
+    last_run TIMESTAMPTZ NOT NULL
+);
+
+-- file_id загруженных в Telegram файлов.
+CREATE TABLE IF NOT EXISTS public.media_files (
+    bot_id BIGINT NOT NULL,
+    file_hash TEXT NOT NULL,
+    file_id TEXT NOT NULL,
+    PRIMARY KEY (bot_id, file_hash)
+);
+
+-- Пул одноразовых ссылок-приглашений.
+CREATE TABLE IF NOT EXISTS public.invite_links (
+    invite_link TEXT PRIMARY KEY,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    expires_at TIMESTAMPTZ NOT NULL,
+    claimed_by BIGINT,
+    claimed_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS invite_links_free_idx
+    ON public.invite_links (expires_at)
+    WHERE claimed_by IS NULL;
+
+-- Очередь исходящих сообщений.
+CREATE TABLE IF NOT EXISTS public.notification_outbox (
+    id BIGSERIAL PRIMARY KEY,
+    chat_id BIGINT NOT NULL,
+    text TEXT NOT NULL,
+    reply_markup JSONB,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    attempts INT NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    last_error TEXT,
+    sent_at TIMESTAMPTZ,
+    failed_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS notification_outbox_pending_idx
+    ON public.notification_outbox (chat_id, id)
+    WHERE sent_at IS NULL AND failed_at IS NULL;
+
+-- Журнал платежей Robokassa и выдача InvId.
+CREATE SEQUENCE IF NOT EXISTS public.payment_inv_id_seq
+    START WITH 1000000000;
+
+CREATE TABLE IF NOT EXISTS public.payments (
+    inv_id BIGINT PRIMARY KEY,
+    user_id BIGINT NOT NULL,
+    months INT NOT NULL,
+    amount NUMERIC(12, 2) NOT NULL,
+    paid_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
@@ -0,0 +1,19 @@
+-- Рассылки администраторов с контрольной точкой прогресса.
+CREATE TABLE IF NOT EXISTS public.broadcasts (
+    id BIGSERIAL PRIMARY KEY,
+    text TEXT NOT NULL,
+    created_by BIGINT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    -- pending, running, done, cancelled
+    status TEXT NOT NULL DEFAULT 'pending',
+    last_user_id BIGINT,
+    sent INT NOT NULL DEFAULT 0,
+    failed INT NOT NULL DEFAULT 0,
+    blocked INT NOT NULL DEFAULT 0,
+    started_at TIMESTAMPTZ,
+    finished_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS broadcasts_active_idx
+    ON public.broadcasts (id)
+    WHERE status IN ('pending', 'running');
@@ -0,0 +1,99 @@
+-- Агрегаты privat_user для /stats: число подписчиков по тарифу и дате
+-- окончания. Таблица поддерживается триггерами при каждой записи
+-- (оплата, продление, удаление), поэтому её размер зависит от числа
+-- тарифов и дат, а не от числа пользователей.
+CREATE TABLE IF NOT EXISTS public.subscription_stats (
+    duration_months INT NOT NULL,
+    end_subscription DATE NOT NULL,
+    users INT NOT NULL,
+    PRIMARY KEY (duration_months, end_subscription)
+);
+
+-- Полный пересчёт: используется для начального заполнения и сверки.
+-- NULL в privat_user попадают в тариф 0 и дату -infinity.
+CREATE OR REPLACE VIEW public.subscription_stats_recount AS
+SELECT coalesce(duration_months, 0) AS duration_months,
+       coalesce(end_subscription, '-infinity'::date) AS end_subscription,
+       count(*)::int AS users
+FROM public.privat_user
+GROUP BY 1, 2;
+
+-- Statement-level триггеры с transition tables: пачка продлений
+-- или удалений обновляет агрегаты одним запросом на всю пачку.
+-- Строки агрегатов блокируются в порядке ключа, чтобы параллельные
+-- записи не взаимоблокировались.
+CREATE OR REPLACE FUNCTION public.subscription_stats_apply()
+RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO public.subscription_stats AS s
+            (duration_months, end_subscription, users)
+        SELECT coalesce(duration_months, 0),
+               coalesce(end_subscription, '-infinity'::date),
+               count(*)
+        FROM new_rows
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+        ON CONFLICT (duration_months, end_subscription)
+        DO UPDATE SET users = s.users + EXCLUDED.users;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO public.subscription_stats AS s
+            (duration_months, end_subscription, users)
+        SELECT coalesce(duration_months, 0),
+               coalesce(end_subscription, '-infinity'::date),
+               -count(*)
+        FROM old_rows
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+        ON CONFLICT (duration_months, end_subscription)
+        DO UPDATE SET users = s.users + EXCLUDED.users;
+    ELSE
+        INSERT INTO public.subscription_stats AS s
+            (duration_months, end_subscription, users)
+        SELECT duration_months, end_subscription, sum(delta)
+        FROM (
+            SELECT coalesce(duration_months, 0) AS duration_months,
+                   coalesce(end_subscription, '-infinity'::date)
+                       AS end_subscription,
+                   1 AS delta
+            FROM new_rows
+            UNION ALL
+            SELECT coalesce(duration_months, 0),
+                   coalesce(end_subscription, '-infinity'::date),
+                   -1
+            FROM old_rows
+        ) AS changes
+        GROUP BY 1, 2
+        HAVING sum(delta) <> 0
+        ORDER BY 1, 2
+        ON CONFLICT (duration_months, end_subscription)
+        DO UPDATE SET users = s.users + EXCLUDED.users;
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS privat_user_stats_insert ON public.privat_user;
+CREATE TRIGGER privat_user_stats_insert
+    AFTER INSERT ON public.privat_user
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.subscription_stats_apply();
+
+DROP TRIGGER IF EXISTS privat_user_stats_update ON public.privat_user;
+CREATE TRIGGER privat_user_stats_update
+    AFTER UPDATE ON public.privat_user
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.subscription_stats_apply();
+
+DROP TRIGGER IF EXISTS privat_user_stats_delete ON public.privat_user;
+CREATE TRIGGER privat_user_stats_delete
+    AFTER DELETE ON public.privat_user
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.subscription_stats_apply();
+
+-- CREATE TRIGGER блокирует запись в privat_user до конца миграции,
+-- поэтому начальное заполнение согласовано с триггерами.
+DELETE FROM public.subscription_stats;
+INSERT INTO public.subscription_stats
+SELECT * FROM public.subscription_stats_recount;
@@ -0,0 +1,15 @@
+-- Неудачные попытки продления (ошибка списания или исключения из
+-- канала): счётчик и время следующей попытки. Пока оно не наступило,
+-- продление пользователя пропускает, чтобы тики окна не повторяли
+-- списание каждые RENEWAL_TICK_SECONDS.
+ALTER TABLE public.privat_user
+    ADD COLUMN IF NOT EXISTS renewal_attempts INT NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS next_renewal_attempt_at TIMESTAMPTZ;
+
+-- Фильтр по next_renewal_attempt_at тоже читается из индекса,
+-- чтобы продление оставалось index-only scan.
+CREATE INDEX IF NOT EXISTS privat_user_renewal_idx
+    ON public.privat_user (end_subscription)
+    INCLUDE (user_id, duration_months, recurring_id, next_renewal_attempt_at);
+
+DROP INDEX IF EXISTS public.privat_user_end_subscription_idx;
@@ -0,0 +1,21 @@
+-- InvId последнего рекуррентного списания, исход которого ещё не
+-- записан. Номер сохраняется до запроса в Robokassa и очищается при
+-- продлении; если процесс упал или лидерство сменилось между списанием
+-- и записью результата, следующая попытка сверяет этот счёт через
+-- OpStateExt вместо повторного списания.
+ALTER TABLE public.privat_user
+    ADD COLUMN IF NOT EXISTS renewal_inv_id BIGINT;
+
+-- renewal_inv_id читается продлением вместе с остальными полями,
+-- поэтому тоже входит в индекс (index-only scan).
+CREATE INDEX IF NOT EXISTS privat_user_renewal_inv_idx
+    ON public.privat_user (end_subscription)
+    INCLUDE (
+        user_id,
+        duration_months,
+        recurring_id,
+        next_renewal_attempt_at,
+        renewal_inv_id
+    );
+
+DROP INDEX IF EXISTS public.privat_user_renewal_idx;
@@ -0,0 +1,46 @@
+import os
+from unittest.mock import AsyncMock
+
+import pytest
+
+from benchmarks import postgres
+from benchmarks.postgres import SEED_COLUMNS, disposable_database, seed_users
+
+BENCH_ADMIN_DSN = os.getenv("BENCH_ADMIN_DSN")
+
+
+@pytest.mark.asyncio
+async def test_seed_users_copies_named_columns(monkeypatch):
+    conn = AsyncMock()
+    monkeypatch.setattr(postgres.asyncpg, "connect", AsyncMock(return_value=conn))
+
+    expired = await seed_users("postgresql://bench", count=3)
+
+    assert expired == 3
+    kwargs = conn.copy_records_to_table.await_args.kwargs
+    assert kwargs["columns"] == SEED_COLUMNS
+    assert all(len(record) == len(SEED_COLUMNS) for record in kwargs["records"])
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(not BENCH_ADMIN_DSN, reason="нужен BENCH_ADMIN_DSN")
+async def test_seed_users_against_migrated_schema():
+    async with disposable_database(BENCH_ADMIN_DSN) as dsn:
+        expired = await seed_users(dsn, count=10, expired_share=0.5)
+
+        conn = await postgres.asyncpg.connect(dsn)
+        try:
+            row = await conn.fetchrow(
+                """
+                SELECT count(*) AS users,
+                       count(*) FILTER (WHERE renewal_attempts = 0) AS fresh,
+                       count(*) FILTER (WHERE end_subscription < CURRENT_DATE)
+                           AS expired
+                FROM public.privat_user
+                """
+            )
+        finally:
+            await conn.close()
+
+    assert row["users"] == row["fresh"] == 10
+    assert row["expired"] == expired
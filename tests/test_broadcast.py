@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from aiogram.exceptions import TelegramForbiddenError
+
+from tgbot.services.broadcast import BroadcastEngine
+
+
+class DirectLimiter:
+    async def call(self, method, chat_id=None):
+        return await method()
+
+
+def make_engine(db, bot):
+    return BroadcastEngine(db, bot=bot, rate_limiter=DirectLimiter(), batch_size=2)
+
+
+def broadcast_row(**overrides):
+    now = datetime.now(timezone.utc)
+    row = {
+        "id": 1,
+        "text": "Привет",
+        "created_by": 100,
+        "status": "running",
+        "last_user_id": None,
+        "sent": 0,
+        "failed": 0,
+        "blocked": 0,
+        "started_at": now - timedelta(seconds=10),
+        "finished_at": now,
+    }
+    row.update(overrides)
+    return row
+
+
+@pytest.mark.asyncio
+async def test_broadcast_pages_and_checkpoints():
+    db = AsyncMock()
+    db.fetch.side_effect = [
+        [{"user_id": 1}, {"user_id": 2}],
+        [{"user_id": 3}],
+        [],
+    ]
+    db.fetchval.return_value = "running"
+    db.fetchrow.return_value = broadcast_row(status="done", sent=2, blocked=1)
+    bot = MagicMock()
+
+    async def send_message(chat_id, text, **kwargs):
+        if chat_id == 2:
+            raise TelegramForbiddenError(method=MagicMock(), message="blocked")
+
+    bot.send_message = AsyncMock(side_effect=send_message)
+
+    await make_engine(db, bot).run_one(broadcast_row(status="pending"))
+
+    checkpoints = [call.args[1:] for call in db.fetchval.await_args_list]
+    assert checkpoints == [(1, 2, 1, 0, 1), (1, 3, 1, 0, 0)]
+    # Отчёт получает автор рассылки.
+    assert bot.send_message.await_args.args[0] == 100
+
+
+@pytest.mark.asyncio
+async def test_broadcast_resumes_after_checkpoint():
+    db = AsyncMock()
+    db.fetch.return_value = []
+    db.fetchrow.return_value = broadcast_row(status="done")
+    bot = MagicMock()
+    bot.send_message = AsyncMock()
+
+    await make_engine(db, bot).run_one(broadcast_row(last_user_id=500))
+
+    assert db.fetch.await_args.args[1] == 500
+
+
+@pytest.mark.asyncio
+async def test_cancelled_broadcast_stops_after_page():
+    db = AsyncMock()
+    db.fetch.return_value = [{"user_id": 1}, {"user_id": 2}]
+    db.fetchval.return_value = "cancelled"
+    db.fetchrow.return_value = broadcast_row(status="cancelled")
+    bot = MagicMock()
+    bot.send_message = AsyncMock()
+
+    await make_engine(db, bot).run_one(broadcast_row())
+
+    assert db.fetch.await_count == 1
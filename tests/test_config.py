@@ -0,0 +1,34 @@
+import pytest
+from environs import Env
+
+from tgbot.config import WebhookConfig
+
+
+def test_webhook_requires_secret_and_base_url():
+    with pytest.raises(ValueError, match="WEBHOOK_SECRET"):
+        WebhookConfig(enabled=True, base_url="https://example.com")
+    with pytest.raises(ValueError, match="WEBHOOK_SECRET"):
+        WebhookConfig(enabled=True, base_url="https://example.com", secret="a b")
+    with pytest.raises(ValueError, match="WEBHOOK_BASE_URL"):
+        WebhookConfig(enabled=True, secret="s3cret")
+
+
+def test_webhook_config_is_optional_when_disabled():
+    config = WebhookConfig(enabled=False)
+
+    assert config.secret is None
+
+
+def test_webhook_url():
+    config = WebhookConfig(
+        enabled=True, base_url="https://example.com/", secret="s3cret"
+    )
+
+    assert config.url == "https://example.com/telegram/webhook"
+
+
+def test_webhook_shutdown_timeout_from_env(monkeypatch):
+    monkeypatch.setenv("WEBHOOK_ENABLED", "false")
+    monkeypatch.setenv("WEBHOOK_SHUTDOWN_TIMEOUT", "5.5")
+
+    assert WebhookConfig.from_env(Env()).shutdown_timeout == 5.5
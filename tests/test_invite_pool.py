@@ -0,0 +1,24 @@
+from datetime import timedelta
+from unittest.mock import AsyncMock
+
+import pytest
+
+from tgbot.services.invite_pool import InviteLinkPool
+
+
+@pytest.mark.asyncio
+async def test_claim_hands_out_freshest_link():
+    db = AsyncMock()
+    db.fetchval.return_value = "https://t.me/+fresh"
+    pool = InviteLinkPool(db, channel_id=-100)
+
+    assert await pool.claim(42) == "https://t.me/+fresh"
+
+    query, user_id, min_remaining = db.fetchval.await_args.args
+    assert "ORDER BY expires_at DESC" in query
+    assert (user_id, min_remaining) == (42, timedelta(days=1))
+
+
+def test_links_must_outlive_min_remaining():
+    with pytest.raises(ValueError):
+        InviteLinkPool(AsyncMock(), channel_id=-100, link_ttl=timedelta(hours=12))
@@ -0,0 +1,55 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from tgbot.services.leader import LeaderElection
+
+
+def make_conn(health_effect=None):
+    conn = MagicMock()
+    conn.fetchval = AsyncMock(side_effect=health_effect)
+    return conn
+
+
+@pytest.mark.asyncio
+async def test_leader_cancels_work_when_lock_connection_dies():
+    election = LeaderElection(None, 1, check_interval=0.01)
+    conn = make_conn(ConnectionError("connection lost"))
+    cancelled = asyncio.Event()
+
+    async def work():
+        try:
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with pytest.raises(ConnectionError):
+        await election._lead(conn, work)
+
+    assert cancelled.is_set()
+    assert not election.is_leader
+    conn.terminate.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_standby_replica_does_not_run_work(monkeypatch):
+    election = LeaderElection(None, 1)
+    monkeypatch.setattr(election, "_try_acquire", AsyncMock(return_value=None))
+    work = AsyncMock()
+
+    task = asyncio.create_task(election.run(work, backoff=lambda: 0.01))
+    await asyncio.sleep(0.05)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+    assert election._try_acquire.await_count > 1
+    work.assert_not_called()
+
+
+def test_leader_must_notice_lost_lock_before_next_acquire():
+    assert LeaderElection(None, 1, retry_interval=4).check_interval == 1
+
+    with pytest.raises(ValueError):
+        LeaderElection(None, 1, retry_interval=10, check_interval=5)
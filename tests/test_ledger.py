@@ -0,0 +1,48 @@
+from decimal import Decimal
+from unittest.mock import AsyncMock
+
+import pytest
+
+from tgbot.services.ledger import PaymentLedger
+
+
+def make_ledger(block_size=3):
+    db = AsyncMock()
+    db.fetch.side_effect = [
+        [{"inv_id": inv_id} for inv_id in range(start, start + block_size)]
+        for start in (100, 200)
+    ]
+    return PaymentLedger(db, block_size=block_size)
+
+
+@pytest.mark.asyncio
+async def test_allocate_fetches_ids_in_blocks():
+    ledger = make_ledger(block_size=3)
+
+    ids = [await ledger.allocate() for _ in range(4)]
+
+    assert ids == [100, 101, 102, 200]
+    assert ledger.db.fetch.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_apply_payment_marks_inv_id_processed():
+    ledger = make_ledger()
+    ledger.db.fetchval.return_value = 123
+
+    assert not ledger.is_processed(555)
+    applied = await ledger.apply_payment(555, 123, "user_123", 3, Decimal("3490.00"))
+
+    assert applied
+    assert ledger.is_processed(555)
+
+
+@pytest.mark.asyncio
+async def test_duplicate_payment_is_not_applied():
+    ledger = make_ledger()
+    ledger.db.fetchval.return_value = None
+
+    applied = await ledger.apply_payment(555, 123, "user_123", 3, Decimal("3490.00"))
+
+    assert not applied
+    assert ledger.is_processed(555)
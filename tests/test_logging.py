@@ -0,0 +1,56 @@
+import json
+import logging
+import queue
+
+from prometheus_client import REGISTRY
+
+from tgbot.misc.log import (
+    ContextFilter,
+    DroppingQueueHandler,
+    JsonFormatter,
+    SamplingFilter,
+    log_context,
+)
+
+
+def make_record(level=logging.INFO, msg="✅ user_id=%s", args=(42,)):
+    return logging.LogRecord(
+        "root", level, "/app/tgbot/services/outbox.py", 1, msg, args, None
+    )
+
+
+def test_json_output_carries_context():
+    record = make_record()
+    with log_context(update_id=7, inv_id=1001):
+        ContextFilter().filter(record)
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry["message"] == "✅ user_id=42"
+    assert entry["update_id"] == 7
+    assert entry["inv_id"] == 1001
+    assert entry["module"] == "outbox"
+    assert "user_id" not in entry
+
+
+def test_sampling_keeps_warnings():
+    sampling = SamplingFilter({"outbox": 0.0})
+
+    assert not sampling.filter(make_record())
+    assert sampling.filter(make_record(logging.WARNING))
+    assert SamplingFilter({"ledger": 0.0}).filter(make_record())
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = DroppingQueueHandler(queue.Queue(1))
+    dropped = REGISTRY.get_sample_value("privatbot_log_records_dropped_total")
+
+    handler.handle(make_record())
+    handler.handle(make_record())
+
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == 1
+    assert (
+        REGISTRY.get_sample_value("privatbot_log_records_dropped_total") == dropped + 1
+    )
+    assert handler.queue.get_nowait().getMessage() == "✅ user_id=42"
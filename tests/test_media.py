@@ -0,0 +1,65 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.methods import SendPhoto
+
+from tgbot.services.media import MediaRegistry
+
+PHOTO = "Files/123.jpg"
+
+
+def make_message():
+    message = MagicMock()
+    message.bot.id = 42
+    sent = MagicMock()
+    sent.photo = [MagicMock(file_id="small"), MagicMock(file_id="uploaded")]
+    message.answer_photo = AsyncMock(return_value=sent)
+    return message
+
+
+def make_db(file_id=None):
+    db = AsyncMock()
+    db.fetchval.return_value = file_id
+    return db
+
+
+@pytest.mark.asyncio
+async def test_first_send_uploads_and_saves_file_id():
+    registry = MediaRegistry()
+    message = make_message()
+    db = make_db()
+
+    await registry.answer_photo(message, db, PHOTO, caption="hi")
+    await registry.answer_photo(message, db, PHOTO, caption="hi")
+
+    first, second = message.answer_photo.call_args_list
+    assert not isinstance(first.kwargs["photo"], str)
+    assert second.kwargs["photo"] == "uploaded"
+    db.fetchval.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_stored_file_id_is_reused():
+    registry = MediaRegistry()
+    message = make_message()
+
+    await registry.answer_photo(message, make_db("stored"), PHOTO)
+
+    message.answer_photo.assert_awaited_once_with(photo="stored")
+
+
+@pytest.mark.asyncio
+async def test_stale_file_id_is_reuploaded():
+    registry = MediaRegistry()
+    message = make_message()
+    sent = message.answer_photo.return_value
+    error = TelegramBadRequest(SendPhoto(chat_id=1, photo="x"), "bad id")
+    message.answer_photo.side_effect = [error, sent]
+    db = make_db("stale")
+
+    await registry.answer_photo(message, db, PHOTO)
+
+    assert message.answer_photo.await_count == 2
+    file_hash = registry.file_hash(PHOTO)
+    assert registry._file_ids[(42, file_hash)] == "uploaded"
@@ -0,0 +1,84 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from aiogram.dispatcher.event.bases import UNHANDLED
+from aiogram.exceptions import TelegramNetworkError
+from aiogram.methods import SendMessage
+from prometheus_client import REGISTRY
+
+from tgbot.middlewares.metrics import MetricsMiddleware
+from tgbot.services.metrics import BotApiMetricsMiddleware, OutboxCollector
+from tgbot.services.outbox import NotificationOutbox
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@pytest.mark.asyncio
+async def test_handler_latency_by_outcome():
+    middleware = MetricsMiddleware()
+    event = MagicMock()
+    labels = {"event": type(event).__name__}
+    ok = sample("privatbot_handler_seconds_count", status="ok", **labels)
+    unhandled = sample("privatbot_handler_seconds_count", status="unhandled", **labels)
+
+    assert await middleware(AsyncMock(return_value=1), event, {}) == 1
+    await middleware(AsyncMock(return_value=UNHANDLED), event, {})
+
+    assert sample("privatbot_handler_seconds_count", status="ok", **labels) == ok + 1
+    assert (
+        sample("privatbot_handler_seconds_count", status="unhandled", **labels)
+        == unhandled + 1
+    )
+
+
+@pytest.mark.asyncio
+async def test_bot_api_errors_are_counted_and_reraised():
+    middleware = BotApiMetricsMiddleware()
+    method = SendMessage(chat_id=1, text="hi")
+    error = TelegramNetworkError(method=method, message="timeout")
+    labels = {"method": "SendMessage"}
+    calls = sample("privatbot_bot_api_seconds_count", **labels)
+    errors = sample(
+        "privatbot_bot_api_errors_total",
+        error="TelegramNetworkError",
+        **labels,
+    )
+
+    with pytest.raises(TelegramNetworkError):
+        await middleware(AsyncMock(side_effect=error), MagicMock(), method)
+
+    assert sample("privatbot_bot_api_seconds_count", **labels) == calls + 1
+    assert (
+        sample(
+            "privatbot_bot_api_errors_total",
+            error="TelegramNetworkError",
+            **labels,
+        )
+        == errors + 1
+    )
+
+
+@pytest.mark.asyncio
+async def test_outbox_worker_exports_queue_gauges():
+    db = AsyncMock()
+    db.fetchrow.return_value = {"depth": 7, "oldest_age": 42.5}
+    outbox = NotificationOutbox(db, bot=MagicMock(), metrics_interval=60)
+
+    await outbox._refresh_metrics()
+    await outbox._refresh_metrics()  # в пределах интервала БД не спрашивается
+
+    assert db.fetchrow.await_count == 1
+    assert sample("privatbot_outbox_depth") == 7
+    assert sample("privatbot_outbox_oldest_age_seconds") == 42.5
+
+
+def test_outbox_collector_hides_stale_snapshot():
+    collector = OutboxCollector(stale_after=0)
+    assert list(collector.collect()) == []
+
+    collector.update(depth=3, oldest_age=1.0)
+    collector._updated -= 1
+
+    assert list(collector.collect()) == []
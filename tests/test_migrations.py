@@ -0,0 +1,49 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from tgbot.services.migrations import Migration, apply_migrations, load_migrations
+
+
+def test_load_migrations_sorted_by_version(tmp_path):
+    (tmp_path / "0002_second.sql").write_text("SELECT 2;")
+    (tmp_path / "0010_tenth.sql").write_text("SELECT 10;")
+    (tmp_path / "0001_first.sql").write_text("SELECT 1;")
+
+    migrations = load_migrations(tmp_path)
+
+    assert [m.version for m in migrations] == [1, 2, 10]
+    assert migrations[0] == Migration(1, "first", "SELECT 1;")
+
+
+def test_load_migrations_rejects_duplicate_versions(tmp_path):
+    (tmp_path / "0001_first.sql").write_text("SELECT 1;")
+    (tmp_path / "001_again.sql").write_text("SELECT 1;")
+
+    with pytest.raises(ValueError):
+        load_migrations(tmp_path)
+
+
+def test_shipped_migrations_are_loadable():
+    versions = [m.version for m in load_migrations()]
+
+    assert versions == sorted(set(versions))
+    assert versions[0] == 1
+
+
+@pytest.mark.asyncio
+async def test_apply_migrations_skips_applied_versions():
+    conn = AsyncMock()
+    conn.transaction = MagicMock(return_value=AsyncMock())
+    conn.fetch.return_value = [{"version": 1}]
+    migrations = [
+        Migration(1, "first", "SELECT 1;"),
+        Migration(2, "second", "SELECT 2;"),
+    ]
+
+    assert await apply_migrations(conn, migrations) == [2]
+
+    executed = [call.args[0] for call in conn.execute.await_args_list]
+    assert "SELECT 1;" not in executed
+    assert "SELECT 2;" in executed
+    assert "pg_advisory_unlock" in executed[-1]
@@ -0,0 +1,80 @@
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from aiogram.exceptions import TelegramForbiddenError, TelegramNetworkError
+from aiogram.methods import SendMessage
+
+from tgbot.services.outbox import NotificationOutbox
+from tgbot.services.rate_limiter import BotRateLimiter
+
+method = SendMessage(chat_id=1, text="hi")
+
+
+def make_outbox(rows, send_effects):
+    conn = AsyncMock()
+    conn.transaction = MagicMock(return_value=AsyncMock())
+
+    @asynccontextmanager
+    async def acquire():
+        yield conn
+
+    db = AsyncMock()
+    db.fetch.return_value = rows
+    db.acquire = acquire
+    bot = MagicMock()
+    bot.send_message = AsyncMock(side_effect=send_effects)
+    outbox = NotificationOutbox(
+        db, bot, BotRateLimiter(global_rate=1000, per_chat_rate=1000)
+    )
+    return outbox, conn
+
+
+def row(item_id, chat_id, attempts=0, reply_markup=None):
+    return {
+        "id": item_id,
+        "chat_id": chat_id,
+        "text": f"message {item_id}",
+        "reply_markup": reply_markup,
+        "attempts": attempts,
+    }
+
+
+@pytest.mark.asyncio
+async def test_drain_marks_sent_retry_and_failed():
+    rows = [row(1, 10), row(2, 20), row(3, 30, attempts=4), row(4, 40)]
+    outbox, conn = make_outbox(
+        rows,
+        [
+            None,
+            TelegramNetworkError(method, "timeout"),
+            TelegramNetworkError(method, "timeout"),
+            TelegramForbiddenError(method, "bot was blocked"),
+        ],
+    )
+
+    assert await outbox.drain_once() == 4
+
+    sent_call, retry_call, failed_call = conn.execute.await_args_list
+    assert sent_call.args[1] == [1]
+    assert retry_call.args[1] == [2]
+    assert failed_call.args[1] == [3, 4]
+
+
+@pytest.mark.asyncio
+async def test_drain_restores_reply_markup():
+    markup = '{"inline_keyboard": [[{"text": "x", "callback_data": "y"}]]}'
+    outbox, _ = make_outbox([row(1, 10, reply_markup=markup)], [None])
+
+    await outbox.drain_once()
+
+    kwargs = outbox.bot.send_message.await_args.kwargs
+    assert kwargs["reply_markup"].inline_keyboard[0][0].callback_data == "y"
+
+
+@pytest.mark.asyncio
+async def test_drain_on_empty_queue():
+    outbox, conn = make_outbox([], [])
+
+    assert await outbox.drain_once() == 0
+    conn.execute.assert_not_awaited()
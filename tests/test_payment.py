@@ -4,8 +4,13 @@ from unittest.mock import AsyncMock
 import pytest
 
 from tgbot.services.payment import PaymentService
+from tgbot.services.pending import MemoryPendingPaymentStore, PendingPayment
 
-service = PaymentService(merchant_login="test_login", password1="test_pass")
+service = PaymentService(
+    merchant_login="test_login",
+    password1="test_pass",
+    pending=MemoryPendingPaymentStore(),
+)
 
 user_id = 123
 
@@ -13,13 +18,15 @@ months = 3
 
 price = 500
 
+inv_id = 1000000042
+
 
 def test_generate_payment_url():
-    url = service.generate_payment_url(user_id, months, price)
+    url = service.generate_payment_url(user_id, months, price, inv_id)
     params = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(url).query))
     assert params["MerchantLogin"] == "test_login"
     assert params["OutSum"] == "500.00"
-    assert params["InvId"] == str(user_id * 10 + months)
+    assert params["InvId"] == str(inv_id)
     assert params["Shp_user"] == str(user_id)
     assert params["Shp_months"] == str(months)
     assert len(params["SignatureValue"]) == 32
@@ -46,15 +53,38 @@ async def test_start_payment():
     callback_query.message.answer = AsyncMock()
     callback_query.answer = AsyncMock()
 
-    await service.start_payment(callback_query, months, price)
-
-    inv_id = str(123 * 10 + months)
+    await service.start_payment(callback_query, months, price, inv_id)
 
-    assert inv_id in service.pending_payments
-    assert service.pending_payments[inv_id] == 123
+    assert await service.pending_payments.get(inv_id) == PendingPayment(
+        123, months, price
+    )
 
     callback_query.message.answer.assert_awaited_once()
     args, kwargs = callback_query.message.answer.call_args
 
     assert "Оплатить" in args[0]
     callback_query.answer.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_each_tariff_click_gets_new_inv_id(monkeypatch):
+    from tgbot.handlers import user
+    from tgbot.keyboards.inline import tariffs_keyboard
+
+    ledger = AsyncMock()
+    ledger.allocate.side_effect = [501, 502]
+    start_payment = AsyncMock()
+    monkeypatch.setattr(user, "ledger", ledger)
+    monkeypatch.setattr(user.payment_service, "start_payment", start_payment)
+    call = AsyncMock()
+    call.data = "pay:3"
+
+    await user.pay_tariff(call)
+    await user.pay_tariff(call)
+
+    buttons = [row[0] for row in tariffs_keyboard().inline_keyboard]
+    assert all(button.url is None for button in buttons)
+    assert [c.args[1:] for c in start_payment.await_args_list] == [
+        (3, 3490, 501),
+        (3, 3490, 502),
+    ]
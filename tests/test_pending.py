@@ -0,0 +1,67 @@
+import json
+import logging
+from unittest.mock import AsyncMock
+
+import pytest
+
+from tgbot.services.pending import (
+    MemoryPendingPaymentStore,
+    PendingPayment,
+    PendingPaymentStore,
+    RedisPendingPaymentStore,
+    create_pending_store,
+)
+
+payment = PendingPayment(user_id=123, months=3, amount=3490)
+
+
+@pytest.mark.asyncio
+async def test_memory_store_pop_removes_payment():
+    store = MemoryPendingPaymentStore()
+    await store.add(1000000001, payment)
+
+    assert await store.get(1000000001) == payment
+    assert await store.pop(1000000001) == payment
+    assert await store.get(1000000001) is None
+
+
+@pytest.mark.asyncio
+async def test_memory_store_is_bounded():
+    store = MemoryPendingPaymentStore(maxsize=2)
+    await store.add_many([(1, payment), (2, payment), (3, payment)])
+
+    assert len(store) == 2
+    assert await store.get(1) is None
+
+
+@pytest.mark.asyncio
+async def test_memory_store_expires_payments():
+    store = MemoryPendingPaymentStore(ttl=0)
+    await store.add(1, payment)
+
+    assert await store.get(1) is None
+
+
+@pytest.mark.asyncio
+async def test_redis_store_round_trip():
+    redis = AsyncMock()
+    redis.getdel.return_value = json.dumps(
+        {"user_id": 123, "months": 3, "amount": 3490}
+    ).encode()
+    store = RedisPendingPaymentStore(redis, ttl=60)
+
+    assert await store.pop(1000000001) == payment
+    redis.getdel.assert_awaited_once_with("pending_payment:1000000001")
+
+
+def test_memory_backend_warns_it_is_not_shared(caplog):
+    with caplog.at_level(logging.WARNING):
+        store = create_pending_store("memory")
+
+    assert isinstance(store, MemoryPendingPaymentStore)
+    assert "PENDING_PAYMENTS_BACKEND=redis" in caplog.text
+
+
+def test_pending_store_is_abstract():
+    with pytest.raises(TypeError):
+        PendingPaymentStore()
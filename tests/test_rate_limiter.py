@@ -0,0 +1,62 @@
+import time
+from unittest.mock import AsyncMock
+
+import pytest
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from tgbot.services.rate_limiter import BotRateLimiter, TokenBucket
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=20, capacity=1)
+    started = time.monotonic()
+    for _ in range(5):
+        await bucket.acquire()
+    elapsed = time.monotonic() - started
+    assert elapsed >= 4 / 20 * 0.9
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_burst_up_to_capacity():
+    bucket = TokenBucket(rate=1, capacity=5)
+    started = time.monotonic()
+    for _ in range(5):
+        await bucket.acquire()
+    assert time.monotonic() - started < 0.1
+
+
+@pytest.mark.asyncio
+async def test_bot_rate_limiter_retries_after_flood_control():
+    limiter = BotRateLimiter(global_rate=100, per_chat_rate=100)
+    method = SendMessage(chat_id=1, text="hi")
+    call = AsyncMock(
+        side_effect=[
+            TelegramRetryAfter(method, "Flood control", retry_after=0),
+            "sent",
+        ]
+    )
+
+    result = await limiter.call(call, chat_id=1)
+
+    assert result == "sent"
+    assert call.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_bot_rate_limiter_gives_up_after_max_retries():
+    limiter = BotRateLimiter(global_rate=100, max_retries=1)
+    method = SendMessage(chat_id=1, text="hi")
+    error = TelegramRetryAfter(method, "Flood control", retry_after=0)
+    call = AsyncMock(side_effect=[error, error])
+
+    with pytest.raises(TelegramRetryAfter):
+        await limiter.call(call)
+
+
+def test_bot_rate_limiter_evicts_idle_chats():
+    limiter = BotRateLimiter(max_chats=2)
+    for chat_id in (1, 2, 3):
+        limiter._chat_bucket(chat_id)
+    assert list(limiter._chats) == [2, 3]
@@ -0,0 +1,262 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+import database
+
+
+def user(user_id, recurring_id="r", renewal_inv_id=None):
+    return {
+        "user_id": user_id,
+        "duration_months": 1,
+        "recurring_id": recurring_id,
+        "renewal_inv_id": renewal_inv_id,
+    }
+
+
+@pytest.mark.asyncio
+async def test_expired_chunks_use_keyset_pagination(monkeypatch):
+    db = AsyncMock()
+    db.fetch.side_effect = [[user(1), user(2)], [user(5), user(7)], []]
+    monkeypatch.setattr(database, "db", db)
+
+    chunks = [
+        rows
+        async for rows in database._expired_chunks(
+            database.date.today(), None, chunk_size=2
+        )
+    ]
+
+    assert [[r["user_id"] for r in rows] for rows in chunks] == [
+        [1, 2],
+        [5, 7],
+    ]
+    last_ids = [call.args[3] for call in db.fetch.await_args_list]
+    assert last_ids == [None, 2, 7]
+
+
+@pytest.mark.asyncio
+async def test_check_subscriptions_writes_each_chunk(monkeypatch):
+    db = AsyncMock()
+    db.fetch.side_effect = [[user(1), user(2, None)], [user(3)]]
+    db.stats = MagicMock(return_value={})
+    monkeypatch.setattr(database, "db", db)
+    monkeypatch.setattr(
+        database, "charge_recurring_payment", AsyncMock(return_value="OK+1")
+    )
+    monkeypatch.setattr(database, "_kick_user", AsyncMock())
+    apply = AsyncMock()
+    monkeypatch.setattr(database, "apply_renewal_outcomes", apply)
+
+    report = await database.check_subscriptions(workers=2, chunk_size=2)
+
+    assert report.total == 3
+    assert report.renewed == 2
+    assert apply.await_count == 2
+    renewed = [
+        [user_id for user_id, _ in call.args[1]] for call in apply.await_args_list
+    ]
+    assert renewed == [[1], [3]]
+
+
+@pytest.mark.asyncio
+async def test_expired_chunks_filter_by_shard(monkeypatch):
+    db = AsyncMock()
+    db.fetch.return_value = []
+    monkeypatch.setattr(database, "db", db)
+
+    chunks = database._expired_chunks(
+        database.date.today(), None, 10, shard=1, shards=3
+    )
+    assert [rows async for rows in chunks] == []
+
+    assert db.fetch.await_args.args[5:] == (1, 3)
+
+
+@pytest.mark.asyncio
+async def test_apply_renewal_outcomes_writes_set_based(monkeypatch):
+    conn = AsyncMock()
+    conn.transaction = MagicMock()
+    db = MagicMock()
+    db.acquire.return_value.__aenter__.return_value = conn
+    outbox = MagicMock(enqueue_many=AsyncMock())
+    subscribers = MagicMock(add_many=AsyncMock(), discard_many=AsyncMock())
+    monkeypatch.setattr(database, "db", db)
+    monkeypatch.setattr(database, "outbox", outbox)
+    monkeypatch.setattr(database, "subscribers", subscribers)
+    monkeypatch.setattr(database, "CHANNEL_ACCESS_MODE", "join_request")
+    today = database.date(2026, 1, 1)
+    renewed_until = database.date(2026, 1, 31)
+    renewals = [(1, renewed_until), (2, renewed_until), (3, renewed_until)]
+    removals = [
+        (4, database.PAYMENT_FAILED_MESSAGE),
+        (5, database.EXPIRED_MESSAGE),
+    ]
+
+    await database.apply_renewal_outcomes(today, renewals, removals, chunk_size=2)
+
+    statements = [call.args for call in conn.execute.await_args_list]
+    assert [args[0].split()[0] for args in statements] == [
+        "UPDATE",
+        "DELETE",
+        "UPDATE",
+    ]
+    assert statements[0][1:] == (today, [1, 2], [renewed_until] * 2)
+    assert statements[1][1:] == ([4, 5],)
+    assert statements[2][1:] == (today, [3], [renewed_until])
+    notifications = [call.args[0] for call in outbox.enqueue_many.await_args_list]
+    assert notifications == [
+        [
+            (1, database.RENEWED_MESSAGE),
+            (2, database.RENEWED_MESSAGE),
+            (4, database.PAYMENT_FAILED_MESSAGE),
+            (5, database.EXPIRED_MESSAGE),
+        ],
+        [(3, database.RENEWED_MESSAGE)],
+    ]
+    assert all(
+        call.kwargs["conn"] is conn for call in outbox.enqueue_many.await_args_list
+    )
+    added = [list(call.args[0]) for call in subscribers.add_many.await_args_list]
+    removed = [list(call.args[0]) for call in subscribers.discard_many.await_args_list]
+    assert added == [[1, 2], [3]]
+    assert removed == [[4, 5], []]
+
+
+@pytest.mark.asyncio
+async def test_failed_attempts_are_backed_off(monkeypatch):
+    db = AsyncMock()
+    db.fetch.return_value = [user(1), user(2), user(3)]
+    db.stats = MagicMock(return_value={})
+    monkeypatch.setattr(database, "db", db)
+
+    async def charge(user_id, recurring_id, amount):
+        if charge.calls == 0:
+            charge.calls += 1
+            raise RuntimeError("HTTP 503")
+        return "ERROR"
+
+    charge.calls = 0
+    monkeypatch.setattr(database, "charge_recurring_payment", charge)
+
+    async def kick(user_id, message, kicked):
+        if user_id == 3:
+            raise RuntimeError("Bad Request")
+        kicked.append((user_id, message))
+
+    monkeypatch.setattr(database, "_kick_user", kick)
+    apply = AsyncMock()
+    monkeypatch.setattr(database, "apply_renewal_outcomes", apply)
+
+    report = await database.check_subscriptions(workers=1, chunk_size=10)
+
+    assert report.errors == 2
+    _, renewals, kicked, failures = apply.await_args.args
+    assert renewals == []
+    assert [user_id for user_id, _ in kicked] == [2]
+    assert failures == [1, 3]
+    assert "next_renewal_attempt_at <= now()" in db.fetch.await_args.args[0]
+
+
+@pytest.mark.asyncio
+async def test_apply_renewal_outcomes_postpones_failures(monkeypatch):
+    conn = AsyncMock()
+    conn.transaction = MagicMock()
+    db = MagicMock()
+    db.acquire.return_value.__aenter__.return_value = conn
+    monkeypatch.setattr(database, "db", db)
+    monkeypatch.setattr(database, "outbox", MagicMock(enqueue_many=AsyncMock()))
+
+    await database.apply_renewal_outcomes(
+        database.date(2026, 1, 1), [], [], [6, 7], chunk_size=10
+    )
+
+    ((query, user_ids, base, cap),) = [c.args for c in conn.execute.await_args_list]
+    assert "renewal_attempts = renewal_attempts + 1" in query
+    assert user_ids == [6, 7]
+    assert (base, cap) == (
+        database.RENEWAL_RETRY_SECONDS,
+        database.RENEWAL_RETRY_MAX_SECONDS,
+    )
+
+
+@pytest.mark.asyncio
+async def test_charge_records_invoice_before_request(monkeypatch):
+    calls = []
+    db = AsyncMock()
+    db.execute.side_effect = lambda *args: calls.append("db")
+    ledger = MagicMock(allocate=AsyncMock(return_value=1000000042))
+    client = MagicMock()
+    client.charge_recurring = AsyncMock(
+        side_effect=lambda *args: calls.append("charge") or "OK+1000000042"
+    )
+    monkeypatch.setattr(database, "db", db)
+    monkeypatch.setattr(database, "ledger", ledger)
+    monkeypatch.setattr(database, "robokassa_client", client)
+
+    await database.charge_recurring_payment(7, "rec-7", 1290)
+
+    assert calls == ["db", "charge"]
+    assert db.execute.await_args.args[1:] == (7, 1000000042)
+    assert client.charge_recurring.await_args.args == ("rec-7", 1290, 1000000042)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "state, charged, renewed",
+    [(100, False, True), (None, True, True), (10, True, True), (5, False, False)],
+)
+async def test_unrecorded_charge_is_checked_before_recharge(
+    monkeypatch, state, charged, renewed
+):
+    client = MagicMock(invoice_state=AsyncMock(return_value=state))
+    charge = AsyncMock(return_value="OK+2")
+    monkeypatch.setattr(database, "robokassa_client", client)
+    monkeypatch.setattr(database, "charge_recurring_payment", charge)
+    batch = database.RenewalBatch()
+
+    try:
+        await database._charge_user(
+            user(1, renewal_inv_id=1000000001),
+            database.date.today(),
+            batch,
+            database.RenewalReport(),
+        )
+    except database.RobokassaError:
+        pass
+
+    client.invoice_state.assert_awaited_once_with(1000000001)
+    assert charge.await_count == int(charged)
+    assert [user_id for user_id, _ in batch.renewals] == ([1] if renewed else [])
+    assert batch.failures == ([] if renewed else [1])
+
+
+@pytest.mark.asyncio
+async def test_timed_out_charge_is_checked_instead_of_retried(monkeypatch):
+    db = AsyncMock()
+    monkeypatch.setattr(database, "db", db)
+    monkeypatch.setattr(
+        database, "ledger", MagicMock(allocate=AsyncMock(return_value=1000000007))
+    )
+    client = MagicMock(
+        charge_recurring=AsyncMock(side_effect=database.RobokassaError("timeout")),
+        invoice_state=AsyncMock(return_value=100),
+    )
+    monkeypatch.setattr(database, "robokassa_client", client)
+    today = database.date.today()
+
+    first = database.RenewalBatch()
+    with pytest.raises(database.RobokassaError):
+        await database._charge_user(user(1), today, first, database.RenewalReport())
+    # InvId остался в privat_user: следующая попытка видит его в строке.
+    assert db.execute.await_args.args[1:] == (1, 1000000007)
+    assert first.failures == [1]
+
+    retry = database.RenewalBatch()
+    await database._charge_user(
+        user(1, renewal_inv_id=1000000007), today, retry, database.RenewalReport()
+    )
+
+    assert client.charge_recurring.await_count == 1
+    client.invoice_state.assert_awaited_once_with(1000000007)
+    assert [user_id for user_id, _ in retry.renewals] == [1]
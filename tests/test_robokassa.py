@@ -0,0 +1,101 @@
+from unittest.mock import AsyncMock
+
+import aiohttp
+import pytest
+
+from tgbot.services.robokassa import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RobokassaClient,
+    RobokassaError,
+)
+
+
+def make_client(**kwargs) -> RobokassaClient:
+    return RobokassaClient(
+        merchant_login="test_login",
+        password1="test_pass1",
+        password2="test_pass2",
+        backoff=0,
+        **kwargs,
+    )
+
+
+def test_circuit_breaker_opens_after_threshold():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_circuit_breaker_half_open_lets_one_probe_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_idempotent_request_is_retried():
+    client = make_client(max_retries=2)
+    client._send = AsyncMock(side_effect=[aiohttp.ClientError(), "state"])
+
+    assert await client.op_state(42) == "state"
+    assert client._send.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_charge_is_not_retried_after_request_was_sent():
+    client = make_client(max_retries=2)
+    client._send = AsyncMock(side_effect=aiohttp.ServerDisconnectedError())
+
+    with pytest.raises(RobokassaError):
+        await client.charge_recurring("rec-1", 1290, invoice_id=1)
+    assert client._send.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_fails_fast():
+    client = make_client(max_retries=0, breaker=CircuitBreaker(failure_threshold=1))
+    client._send = AsyncMock(side_effect=RobokassaError("HTTP 503"))
+
+    with pytest.raises(RobokassaError):
+        await client.op_state(1)
+    with pytest.raises(CircuitOpenError):
+        await client.op_state(2)
+    assert client._send.await_count == 1
+
+
+def op_state_response(result, state=None):
+    state_xml = f"<State><Code>{state}</Code></State>" if state is not None else ""
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        '<OperationStateResponse xmlns="http://merchant.roboxchange.com/'
+        f'WebService/"><Result><Code>{result}</Code></Result>{state_xml}'
+        "</OperationStateResponse>"
+    )
+
+
+@pytest.mark.asyncio
+async def test_invoice_state_parses_op_state():
+    client = make_client()
+    client.op_state = AsyncMock(
+        side_effect=[
+            op_state_response(0, 100),
+            op_state_response(3),
+            op_state_response(1),
+            "<html>",
+        ]
+    )
+
+    assert await client.invoice_state(1) == 100
+    assert await client.invoice_state(2) is None
+    with pytest.raises(RobokassaError):
+        await client.invoice_state(3)
+    with pytest.raises(RobokassaError):
+        await client.invoice_state(4)
@@ -0,0 +1,159 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock
+
+import pytest
+
+from tgbot.services.scheduler import (
+    DailySchedule,
+    IntervalSchedule,
+    MoscowTimeZone,
+    RenewalWindow,
+    Scheduler,
+)
+
+schedule = DailySchedule(8)
+
+
+def msk(*args) -> datetime:
+    return MoscowTimeZone.localize(datetime(*args))
+
+
+@pytest.mark.parametrize(
+    "now, previous, upcoming",
+    [
+        (msk(2024, 5, 10, 7, 59), msk(2024, 5, 9, 8), msk(2024, 5, 10, 8)),
+        (msk(2024, 5, 10, 8, 0), msk(2024, 5, 10, 8), msk(2024, 5, 11, 8)),
+        (msk(2024, 5, 10, 23, 0), msk(2024, 5, 10, 8), msk(2024, 5, 11, 8)),
+    ],
+)
+def test_daily_schedule(now, previous, upcoming):
+    assert schedule.previous(now) == previous
+    assert schedule.next(now) == upcoming
+
+
+def test_daily_schedule_accepts_utc():
+    now = datetime(2024, 5, 10, 5, 30, tzinfo=timezone.utc)  # 08:30 МСК
+    assert schedule.previous(now) == msk(2024, 5, 10, 8)
+
+
+def test_interval_schedule():
+    interval = IntervalSchedule(60)
+    now = datetime(2024, 5, 10, 12, 0, 30, tzinfo=timezone.utc)
+    assert interval.previous(now) == now - timedelta(seconds=30)
+    assert interval.next(now) == now + timedelta(seconds=30)
+
+
+def make_scheduler(last_runs):
+    db = AsyncMock()
+    db.fetch.return_value = [
+        {"job_name": name, "last_run": last_run} for name, last_run in last_runs.items()
+    ]
+    return Scheduler(db)
+
+
+@pytest.mark.asyncio
+async def test_scheduler_catches_up_missed_run():
+    yesterday = schedule.previous(datetime.now(timezone.utc)) - timedelta(days=1)
+    jobs = make_scheduler({"renewal": yesterday})
+    func = AsyncMock()
+    jobs.add_job("renewal", schedule, func)
+
+    await jobs._plan()
+    job = jobs.jobs[0]
+    assert job.next_due <= datetime.now(timezone.utc)
+
+    await jobs._run(job)
+
+    func.assert_awaited_once()
+    assert job.next_due > datetime.now(timezone.utc)
+    assert job.running is None
+    jobs.db.execute.assert_awaited()
+
+
+@pytest.mark.asyncio
+async def test_scheduler_waits_when_up_to_date():
+    last_run = schedule.previous(datetime.now(timezone.utc))
+    jobs = make_scheduler({"renewal": last_run})
+    jobs.add_job("renewal", schedule, AsyncMock())
+
+    await jobs._plan()
+
+    assert jobs.jobs[0].next_due == schedule.next(last_run)
+
+
+@pytest.mark.asyncio
+async def test_new_job_waits_for_next_slot():
+    jobs = make_scheduler({})
+    jobs.add_job("expiry_reminders", schedule, AsyncMock())
+    now = datetime.now(timezone.utc)
+
+    await jobs._plan()
+
+    assert jobs.jobs[0].next_due == schedule.next(now)
+
+
+@pytest.mark.asyncio
+async def test_scheduler_retries_failed_run():
+    jobs = make_scheduler({})
+    jobs.add_job("renewal", schedule, AsyncMock(side_effect=RuntimeError))
+
+    await jobs._plan()
+    job = jobs.jobs[0]
+    await jobs._run(job)
+
+    assert job.next_due > datetime.now(timezone.utc)
+    jobs.db.execute.assert_not_awaited()  # last_run не сохранён
+
+
+window = RenewalWindow(start_hour=8, hours=12)
+
+
+def test_renewal_window_slots_are_deterministic_and_spread():
+    slots = [window.slot(user_id) for user_id in range(10_000, 20_000)]
+    assert slots == [window.slot(user_id) for user_id in range(10_000, 20_000)]
+    assert all(0 <= slot < window.seconds for slot in slots)
+    per_hour = [0] * 12
+    for slot in slots:
+        per_hour[slot // 3600] += 1
+    assert min(per_hour) > 10_000 / 12 * 0.8
+
+
+def test_renewal_window_sql_slot_matches_python():
+    expression = window.sql_slot("user_id").replace("::numeric", "")
+    for user_id in (1, 123456789, 7_000_000_000):
+        assert eval(expression, {"user_id": user_id}) == window.slot(user_id)
+
+
+@pytest.mark.parametrize(
+    "now, offset",
+    [
+        (msk(2024, 5, 10, 7, 0), -1),
+        (msk(2024, 5, 10, 8, 0), 0),
+        (msk(2024, 5, 10, 9, 30), 5400),
+        (msk(2024, 5, 10, 21, 0), 12 * 3600),
+    ],
+)
+def test_renewal_window_offset(now, offset):
+    assert window.offset(now) == offset
+
+
+@pytest.mark.asyncio
+async def test_cancelled_scheduler_cancels_running_jobs():
+    yesterday = schedule.previous(datetime.now(timezone.utc)) - timedelta(days=1)
+    jobs = make_scheduler({"renewal": yesterday})
+    started = asyncio.Event()
+
+    async def renewal():
+        started.set()
+        await asyncio.sleep(3600)
+
+    jobs.add_job("renewal", schedule, renewal)
+    runner = asyncio.create_task(jobs.run_forever())
+    await started.wait()
+    job_task = jobs.jobs[0].running
+
+    runner.cancel()
+    await asyncio.gather(runner, return_exceptions=True)
+
+    assert job_task.cancelled()
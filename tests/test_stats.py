@@ -0,0 +1,69 @@
+from datetime import date
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from tgbot.services.stats import SubscriptionStats, format_stats
+
+PRICES = {1: 1290, 3: 3490}
+
+
+@pytest.mark.asyncio
+async def test_snapshot_reads_aggregates():
+    db = AsyncMock()
+    db.fetch.return_value = [
+        {"duration_months": 0, "active": 2, "expiring": 0},
+        {"duration_months": 1, "active": 10, "expiring": 3},
+        {"duration_months": 3, "active": 3, "expiring": 1},
+    ]
+
+    snapshot = await SubscriptionStats(db, PRICES).snapshot(
+        days=5, today=date(2026, 1, 10)
+    )
+
+    assert db.fetch.await_args.args[1:] == (
+        date(2026, 1, 10),
+        date(2026, 1, 15),
+    )
+    assert snapshot.active == {0: 2, 1: 10, 3: 3}
+    assert snapshot.total == 15
+    assert snapshot.expiring == 4
+    # Тариф без цены в MRR не входит.
+    assert snapshot.mrr == pytest.approx(10 * 1290 + 3490)
+    assert "MRR: 16 390 ₽" in format_stats(snapshot)
+
+
+@pytest.mark.asyncio
+async def test_reconcile_fixes_drifted_keys_under_row_lock():
+    conn = AsyncMock()
+    conn.transaction = MagicMock()
+    db = MagicMock()
+    db.fetch = AsyncMock(
+        return_value=[
+            {"duration_months": 1, "end_subscription": date(2026, 1, 10)},
+            {"duration_months": 3, "end_subscription": date(2026, 2, 1)},
+        ]
+    )
+    db.acquire.return_value.__aenter__.return_value = conn
+
+    assert await SubscriptionStats(db, PRICES).reconcile() == 2
+
+    statements = [call.args for call in conn.execute.await_args_list]
+    assert not any("LOCK TABLE" in args[0] for args in statements)
+    assert [args[0].split()[0] for args in statements] == [
+        "INSERT",
+        "SELECT",
+        "UPDATE",
+    ] * 2
+    assert "FOR UPDATE" in statements[1][0]
+    assert statements[5][1:] == (3, date(2026, 2, 1))
+    assert conn.transaction.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_reconcile_without_drift_writes_nothing():
+    db = MagicMock()
+    db.fetch = AsyncMock(return_value=[])
+
+    assert await SubscriptionStats(db, PRICES).reconcile() == 0
+    db.acquire.assert_not_called()
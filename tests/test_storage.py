@@ -0,0 +1,70 @@
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from aiogram.fsm.storage.base import StorageKey
+
+from tgbot.misc.storage import CachedRedisStorage
+
+key = StorageKey(bot_id=1, chat_id=2, user_id=3)
+
+
+def make_storage():
+    redis_storage = AsyncMock()
+    redis_storage.redis = MagicMock()
+    redis_storage.redis.publish = AsyncMock()
+    storage = CachedRedisStorage(redis_storage)
+    storage._ensure_listener = MagicMock()
+    storage._subscribed = True
+    return storage, redis_storage
+
+
+def invalidation(instance):
+    return json.dumps([instance, list(key.__dict__.values())]).encode()
+
+
+@pytest.mark.asyncio
+async def test_hot_reads_are_served_locally():
+    storage, redis_storage = make_storage()
+    redis_storage.get_state.return_value = "Form:name"
+
+    assert await storage.get_state(key) == "Form:name"
+    assert await storage.get_state(key) == "Form:name"
+
+    redis_storage.get_state.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_write_through_and_invalidate_other_processes():
+    storage, redis_storage = make_storage()
+
+    await storage.set_data(key, {"months": 3})
+
+    redis_storage.set_data.assert_awaited_once_with(key, {"months": 3})
+    redis_storage.redis.publish.assert_awaited_once()
+    assert await storage.get_data(key) == {"months": 3}
+    redis_storage.get_data.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_remote_invalidation_evicts_key():
+    storage, redis_storage = make_storage()
+    await storage.set_state(key, "Form:name")
+
+    storage._on_invalidate(invalidation(storage._instance))
+    assert await storage.get_state(key) == "Form:name"
+
+    storage._on_invalidate(invalidation("other"))
+    redis_storage.get_state.return_value = None
+    assert await storage.get_state(key) is None
+
+
+@pytest.mark.asyncio
+async def test_returned_data_is_a_copy():
+    storage, _ = make_storage()
+    await storage.set_data(key, {"items": [1]})
+
+    data = await storage.get_data(key)
+    data["items"].append(2)
+
+    assert await storage.get_data(key) == {"items": [1]}
@@ -0,0 +1,70 @@
+from unittest.mock import AsyncMock
+
+import pytest
+
+from tgbot.handlers import user
+from tgbot.services.subscribers import MemorySubscriberCache, SubscriberCache
+
+
+@pytest.mark.asyncio
+async def test_warm_and_update_memory_cache():
+    cache = MemorySubscriberCache()
+    db = AsyncMock()
+    db.fetch.return_value = [{"user_id": 1}, {"user_id": 2}]
+
+    assert await cache.warm(db) == 2
+    await cache.add(3)
+    await cache.discard_many([1])
+
+    assert not await cache.contains(1)
+    assert await cache.contains(2)
+    assert await cache.contains(3)
+
+
+@pytest.mark.asyncio
+async def test_cache_miss_falls_back_to_db():
+    cache = MemorySubscriberCache()
+    db = AsyncMock()
+    db.fetchval.side_effect = [42, None]
+
+    assert await cache.is_active(42, db)
+    assert await cache.is_active(42, db)
+    assert not await cache.is_active(7, db)
+    assert db.fetchval.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_join_request_is_approved_for_subscriber(monkeypatch):
+    cache = MemorySubscriberCache()
+    await cache.add(42)
+    monkeypatch.setattr(user, "subscribers", cache)
+    db = AsyncMock()
+    db.fetchval.return_value = None
+
+    subscriber = AsyncMock()
+    subscriber.from_user.id = 42
+    stranger = AsyncMock()
+    stranger.from_user.id = 7
+    await user.channel_join_request(subscriber, db)
+    await user.channel_join_request(stranger, db)
+
+    subscriber.approve.assert_awaited_once()
+    stranger.decline.assert_awaited_once()
+    stranger.approve.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_memory_entries_expire_and_are_rechecked():
+    cache = MemorySubscriberCache(ttl=0)
+    await cache.add(42)
+    db = AsyncMock()
+    db.fetchval.return_value = None
+
+    # Удаление прошло в другом процессе: запись истекла, БД говорит «нет».
+    assert not await cache.is_active(42, db)
+    db.fetchval.assert_awaited_once()
+
+
+def test_subscriber_cache_is_abstract():
+    with pytest.raises(TypeError):
+        SubscriberCache()
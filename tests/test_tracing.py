@@ -0,0 +1,56 @@
+import asyncio
+import logging
+import time
+
+import pytest
+
+from tgbot.services.profiler import LoopProfiler
+from tgbot.services.tracing import record_span, span, trace
+
+
+@pytest.mark.asyncio
+async def test_slow_trace_logs_spans_from_child_tasks(caplog):
+    async def call_api():
+        with span("api:SendMessage"):
+            await asyncio.sleep(0.01)
+
+    with caplog.at_level(logging.WARNING):
+        with trace("update 1 (message)", slow_seconds=0) as current:
+            await asyncio.create_task(call_api())
+            record_span("handler:user_start", 0.5)
+
+    assert [name for name, _ in current.spans] == [
+        "api:SendMessage",
+        "handler:user_start",
+    ]
+    assert "update 1 (message)" in caplog.text
+    assert current.summary().startswith("handler:user_start 0.50 с")
+
+
+def test_fast_trace_is_not_logged(caplog):
+    with caplog.at_level(logging.WARNING):
+        with trace("update 2 (message)", slow_seconds=60):
+            pass
+    record_span("db:fetch", 1.0)  # вне трассировки ничего не делает
+
+    assert caplog.text == ""
+
+
+@pytest.mark.asyncio
+async def test_profiler_dumps_loop_stacks(tmp_path):
+    profiler = LoopProfiler(directory=tmp_path, interval=0.001)
+
+    def busy_handler():
+        deadline = time.monotonic() + 0.2
+        while time.monotonic() < deadline:
+            pass
+
+    async def busy_loop():
+        await asyncio.sleep(0.02)
+        busy_handler()
+
+    path, _ = await asyncio.gather(profiler.profile(0.1), busy_loop())
+
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert any("busy_handler" in line for line in lines)
+    assert not profiler.running
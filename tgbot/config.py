@@ -1,5 +1,6 @@
-from dataclasses import dataclass
-from typing import Optional
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Optional
 
 from environs import Env
 from sqlalchemy.engine.url import URL
@@ -52,13 +53,20 @@ class TgBot:
     token: str
     admin_ids: list[int]
     use_redis: bool
+    fsm_cache_size: int = 10_000
 
     @staticmethod
     def from_env(env: Env):
         token = env.str("BOT_TOKEN")
         admin_ids = list(map(int, env.list("ADMINS")))
         use_redis = env.bool("USE_REDIS")
-        return TgBot(token=token, admin_ids=admin_ids, use_redis=use_redis)
+        fsm_cache_size = env.int("FSM_CACHE_SIZE", 10_000)
+        return TgBot(
+            token=token,
+            admin_ids=admin_ids,
+            use_redis=use_redis,
+            fsm_cache_size=fsm_cache_size,
+        )
 
 
 @dataclass
@@ -87,6 +95,70 @@ class RedisConfig:
         )
 
 
+@dataclass
+class WebhookConfig:
+    enabled: bool
+    base_url: Optional[str] = None
+    secret: Optional[str] = None
+    max_concurrency: int = 40
+    path: str = "/telegram/webhook"
+    # Сколько секунд при остановке ждать обновления, уже взятые
+    # в обработку, прежде чем отменить их и закрыть пул БД.
+    shutdown_timeout: float = 25
+
+    def __post_init__(self):
+        if not self.enabled:
+            return
+        # Без секрета любой, кто знает путь, может прислать поддельный
+        # update от имени администратора.
+        if not self.secret:
+            raise ValueError("WEBHOOK_ENABLED=true требует WEBHOOK_SECRET")
+        if not re.fullmatch(r"[A-Za-z0-9_-]{1,256}", self.secret):
+            raise ValueError(
+                "WEBHOOK_SECRET: 1-256 символов из A-Z, a-z, 0-9, _ и -"
+            )
+        if not self.base_url:
+            raise ValueError("WEBHOOK_ENABLED=true требует WEBHOOK_BASE_URL")
+
+    @property
+    def url(self) -> str:
+        return f"{self.base_url.rstrip('/')}{self.path}"
+
+    @staticmethod
+    def from_env(env: Env):
+        enabled = env.bool("WEBHOOK_ENABLED", False)
+        base_url = env.str("WEBHOOK_BASE_URL", None)
+        secret = env.str("WEBHOOK_SECRET", None)
+        max_concurrency = env.int("WEBHOOK_MAX_CONCURRENCY", 40)
+        shutdown_timeout = env.float("WEBHOOK_SHUTDOWN_TIMEOUT", 25)
+        return WebhookConfig(
+            enabled=enabled,
+            base_url=base_url,
+            secret=secret,
+            max_concurrency=max_concurrency,
+            shutdown_timeout=shutdown_timeout,
+        )
+
+
+@dataclass
+class LoggingConfig:
+    level: str = "INFO"
+    # text — цветной вывод для консоли; json — одна запись на строку.
+    format: str = "text"
+    # Доля INFO/DEBUG-записей, которая пишется, по имени модуля.
+    sampling: Dict[str, float] = field(default_factory=dict)
+    queue_size: int = 10_000
+
+    @staticmethod
+    def from_env(env: Env):
+        return LoggingConfig(
+            level=env.str("LOG_LEVEL", "INFO").upper(),
+            format=env.str("LOG_FORMAT", "text"),
+            sampling=env.dict("LOG_SAMPLING", {}, subcast_values=float),
+            queue_size=env.int("LOG_QUEUE_SIZE", 10_000),
+        )
+
+
 @dataclass
 class Miscellaneous:
     other_params: str = None
@@ -98,14 +170,19 @@ class Config:
     misc: Miscellaneous
     db: Optional[DbConfig] = None
     redis: Optional[RedisConfig] = None
+    webhook: Optional[WebhookConfig] = None
+    logging: Optional[LoggingConfig] = None
 
 
 def load_config(path: str = None) -> Config:
     env = Env()
     env.read_env(path)
+    tg_bot = TgBot.from_env(env)
     return Config(
-        tg_bot=TgBot.from_env(env),
+        tg_bot=tg_bot,
         # db=DbConfig.from_env(env),
-        # redis=RedisConfig.from_env(env),
+        redis=RedisConfig.from_env(env) if tg_bot.use_redis else None,
+        webhook=WebhookConfig.from_env(env),
+        logging=LoggingConfig.from_env(env),
         misc=Miscellaneous(),
     )
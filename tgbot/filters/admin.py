@@ -0,0 +1,13 @@
+from aiogram.filters import BaseFilter
+from aiogram.types import Message
+
+from tgbot.config import Config
+
+
+class AdminFilter(BaseFilter):
+    """Пропускает сообщения только от TgBot.admin_ids."""
+
+    is_admin: bool = True
+
+    async def __call__(self, obj: Message, config: Config) -> bool:
+        return (obj.from_user.id in config.tg_bot.admin_ids) == self.is_admin
@@ -0,0 +1,68 @@
+from aiogram import Router, types
+from aiogram.filters import Command, CommandObject
+from aiogram.types import FSInputFile
+
+from database import broadcasts, stats
+from tgbot.filters.admin import AdminFilter
+from tgbot.services.broadcast import format_report
+from tgbot.services.profiler import PROFILE_MAX_SECONDS, loop_profiler
+from tgbot.services.stats import format_stats
+
+admin_router = Router()
+admin_router.message.filter(AdminFilter())
+
+
+@admin_router.message(Command("broadcast"))
+async def broadcast_start(message: types.Message, command: CommandObject) -> None:
+    """Ставит в очередь рассылку текста после команды."""
+    if not command.args:
+        await message.answer("Использование: /broadcast <текст рассылки>")
+        return
+    # html_text сохраняет форматирование; отрезаем саму команду.
+    text = message.html_text.split(maxsplit=1)[1]
+    broadcast_id = await broadcasts.create(text, message.from_user.id)
+    await message.answer(
+        f"📣 Рассылка #{broadcast_id} поставлена в очередь. "
+        "По завершении придёт отчёт."
+    )
+
+
+@admin_router.message(Command("broadcast_status"))
+async def broadcast_status(message: types.Message) -> None:
+    """Прогресс последней рассылки."""
+    row = await broadcasts.last()
+    if row is None:
+        await message.answer("Рассылок ещё не было.")
+        return
+    await message.answer(format_report(row))
+
+
+@admin_router.message(Command("broadcast_cancel"))
+async def broadcast_cancel(message: types.Message) -> None:
+    """Отменяет текущую рассылку (после текущей страницы)."""
+    broadcast_id = await broadcasts.cancel()
+    if broadcast_id is None:
+        await message.answer("Активных рассылок нет.")
+        return
+    await message.answer(f"⛔ Рассылка #{broadcast_id} отменена.")
+
+
+@admin_router.message(Command("stats"))
+async def show_stats(message: types.Message, command: CommandObject) -> None:
+    """Подписчики по тарифам, истекающие подписки и MRR."""
+    days = int(command.args) if command.args and command.args.isdigit() else 7
+    snapshot = await stats.snapshot(days)
+    await message.answer(format_stats(snapshot))
+
+
+@admin_router.message(Command("profile"))
+async def profile_loop(message: types.Message, command: CommandObject) -> None:
+    """Профиль event loop за N секунд (по умолчанию 30) файлом."""
+    if loop_profiler.running:
+        await message.answer("Профилирование уже идёт.")
+        return
+    seconds = int(command.args) if command.args and command.args.isdigit() else 30
+    seconds = min(seconds, PROFILE_MAX_SECONDS)
+    await message.answer(f"🔬 Профилирую event loop {seconds} с…")
+    path = await loop_profiler.profile(seconds)
+    await message.answer_document(FSInputFile(path), caption=f"🔬 Профиль: {path.name}")
@@ -1,38 +1,29 @@
-import hashlib
 import logging
 import os
-import time
 
-import aiohttp
-import asyncpg
 from aiogram import F, Router, types
 from aiogram.filters import CommandStart
-from aiogram.types import CallbackQuery, FSInputFile
-from dotenv import load_dotenv
+from aiogram.types import CallbackQuery, ChatJoinRequest
 
-from tgbot.keyboards.inline import first_start_keyboard, tariffs_keyboard
-
-load_dotenv()
+from database import TARIFF_PRICES, ledger
+from tgbot.keyboards.inline import (
+    first_start_keyboard,
+    payment_service,
+    tariffs_keyboard,
+)
+from tgbot.services.media import media_registry
+from tgbot.services.subscribers import subscribers
 
 user_router = Router()
 
-MERCHANT_LOGIN = os.getenv("ROBO_LOGIN")
-
-PASSWORD1 = os.getenv("ROBO_PASS1")
-
-DB = os.getenv("DATABASE_URL")
+START_PHOTO = os.getenv("START_PHOTO", "Files/123.jpg")
 
-logging.basicConfig(level=logging.INFO)
+CHANNEL_ID = int(os.getenv("CHANNEL_ID", "0"))
 
 
 @user_router.message(CommandStart())
-async def user_start(message: types.Message) -> None:
+async def user_start(message: types.Message, db) -> None:
     """Приветственное сообщение при старте."""
-    try:
-        photo = FSInputFile("путь до файла на сервере")
-    except Exception:
-        photo = None
-
     caption_text = (
         "Смешная сумма за результат:"
         " 43₽ в день — дешевле, чем проезд в метро!\n"
@@ -44,8 +35,10 @@ async def user_start(message: types.Message) -> None:
         "Это не просто приватный канал — это трамплин в новую реальность 😎"
     )
 
-    if photo:
-        await message.answer_photo(photo=photo, caption=caption_text)
+    if os.path.exists(START_PHOTO):
+        await media_registry.answer_photo(
+            message, db, START_PHOTO, caption=caption_text
+        )
     else:
         await message.answer(caption_text)
 
@@ -58,7 +51,7 @@ async def user_start(message: types.Message) -> None:
 @user_router.callback_query(F.data == "to_rate")
 async def show_tariffs(call: CallbackQuery) -> None:
     """Меню с тарифами (кнопки → Robokassa)."""
-    kb = tariffs_keyboard(call.from_user.id)
+    kb = tariffs_keyboard()
 
     await call.message.edit_text(
         text=(
@@ -72,47 +65,28 @@ async def show_tariffs(call: CallbackQuery) -> None:
     )
 
 
-async def charge_recurring_payment(recurring_id: str, amount: int) -> str:
-    """Вызывает Robokassa API для рекуррентного платежа."""
-    invoice_id = int(time.time())
-    out_sum = f"{amount:.2f}"
-
-    signature_str = (
-        f"{MERCHANT_LOGIN}:{out_sum}:{invoice_id}:{recurring_id}:{PASSWORD1}"
-    )
-    signature = hashlib.md5(signature_str.encode()).hexdigest()
-
-    payload = {
-        "MerchantLogin": MERCHANT_LOGIN,
-        "OutSum": out_sum,
-        "InvoiceID": invoice_id,
-        "RecurringId": recurring_id,
-        "Description": "Продление подписки",
-        "SignatureValue": signature,
-    }
-
-    async with aiohttp.ClientSession() as session:
-        async with session.post(
-            "https://auth.robokassa.ru/Merchant/Recurring", data=payload
-        ) as resp:
-            text = await resp.text()
-            logging.info("⚡ Recurring payment: %s", text)
-            return text
+@user_router.callback_query(F.data.startswith("pay:"))
+async def pay_tariff(call: CallbackQuery) -> None:
+    """Выбран тариф: новый InvId и ссылка на оплату."""
+    months = int(call.data.split(":", 1)[1])
+    if months not in TARIFF_PRICES:
+        await call.answer("Тариф недоступен", show_alert=True)
+        return
+    inv_id = await ledger.allocate()
+    await payment_service.start_payment(call, months, TARIFF_PRICES[months], inv_id)
 
 
 @user_router.callback_query(F.data == "to_change")
-async def cancel_subscription(call: CallbackQuery) -> None:
+async def cancel_subscription(call: CallbackQuery, db) -> None:
     """Отмена подписки (очистка recurring_id в БД)."""
     user_id = call.from_user.id
 
     try:
-        conn = await asyncpg.connect(DB)
-        await conn.execute(
+        await db.execute(
             "UPDATE public.privat_user "
             "SET recurring_id = NULL WHERE user_id = $1",
             user_id,
         )
-        await conn.close()
         logging.info("🔴 Подписка отменена для user_id=%s", user_id)
         await call.message.edit_text("🔴 Ваша подписка была отменена.")
     except Exception as e:
@@ -122,3 +96,15 @@ async def cancel_subscription(call: CallbackQuery) -> None:
         )
 
     await call.answer()
+
+
+@user_router.chat_join_request(F.chat.id == CHANNEL_ID)
+async def channel_join_request(request: ChatJoinRequest, db) -> None:
+    """Заявка в канал: одобряется, если подписка активна."""
+    user_id = request.from_user.id
+    if await subscribers.is_active(user_id, db):
+        await request.approve()
+        logging.info("🚪 Заявка user_id=%s одобрена", user_id)
+    else:
+        await request.decline()
+        logging.info("🚪 Заявка user_id=%s отклонена", user_id)
@@ -1,9 +1,21 @@
-from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+from typing import Optional
+
+from aiogram.types import InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
-from database import TARIFF_PRICES
 from tgbot.services.payment import PaymentService
 
+TARIFF_BUTTONS = [
+    ("🔥 1 месяц", 1),
+    ("⚡️ 3 месяца", 3),
+    ("🖤 6 месяцев", 6),
+    ("🐘 9 месяцев", 9),
+]
+
+payment_service = PaymentService()
+
+_tariffs_markup: Optional[InlineKeyboardMarkup] = None
+
 
 def first_start_keyboard():
     builder = InlineKeyboardBuilder()
@@ -43,40 +55,18 @@ def to_access():
     return builder.as_markup()
 
 
-def tariffs_keyboard(user_id: int) -> InlineKeyboardMarkup:
-    payment_service = PaymentService()
-    buttons = [
-        [
-            InlineKeyboardButton(
-                text="🔥 1 месяц",
-                url=payment_service.generate_payment_url(
-                    user_id, 1, TARIFF_PRICES[1]
-                ),
-            )
-        ],
-        [
-            InlineKeyboardButton(
-                text="⚡️ 3 месяца",
-                url=payment_service.generate_payment_url(
-                    user_id, 3, TARIFF_PRICES[3]
-                ),
-            )
-        ],
-        [
-            InlineKeyboardButton(
-                text="🖤 6 месяцев",
-                url=payment_service.generate_payment_url(
-                    user_id, 6, TARIFF_PRICES[6]
-                ),
-            )
-        ],
-        [
-            InlineKeyboardButton(
-                text="🐘 9 месяцев",
-                url=payment_service.generate_payment_url(
-                    user_id, 9, TARIFF_PRICES[9]
-                ),
-            )
-        ],
-    ]
-    return InlineKeyboardMarkup(inline_keyboard=buttons)
+def tariffs_keyboard() -> InlineKeyboardMarkup:
+    """
+    Клавиатура тарифов. Одна на всех: InvId выдаётся только при нажатии
+    на тариф (см. handlers.user.pay_tariff), поэтому повторная покупка
+    всегда получает новый счёт.
+    """
+    global _tariffs_markup
+
+    if _tariffs_markup is None:
+        builder = InlineKeyboardBuilder()
+        for text, months in TARIFF_BUTTONS:
+            builder.button(text=text, callback_data=f"pay:{months}")
+        builder.adjust(1)
+        _tariffs_markup = builder.as_markup()
+    return _tariffs_markup
@@ -0,0 +1,18 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import Message
+
+
+class DatabaseMiddleware(BaseMiddleware):
+    def __init__(self, db) -> None:
+        self.db = db
+
+    async def __call__(
+        self,
+        handler: Callable[[Message, Dict[str, Any]], Awaitable[Any]],
+        event: Message,
+        data: Dict[str, Any],
+    ) -> Any:
+        data["db"] = self.db
+        return await handler(event, data)
@@ -0,0 +1,23 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from tgbot.misc.log import log_context
+
+
+class LogContextMiddleware(BaseMiddleware):
+    """update_id и user_id во всех логах обработки update."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        with log_context(
+            update_id=event.update_id,
+            user_id=user.id if user is not None else None,
+        ):
+            return await handler(event, data)
@@ -0,0 +1,32 @@
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.event.bases import UNHANDLED
+from aiogram.types import TelegramObject
+
+from tgbot.services.metrics import HANDLER_SECONDS
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """
+    Время обработки update по типу события и исходу
+    (ok, unhandled, error).
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        started = time.perf_counter()
+        status = "error"
+        try:
+            result = await handler(event, data)
+            status = "unhandled" if result is UNHANDLED else "ok"
+            return result
+        finally:
+            HANDLER_SECONDS.labels(type(event).__name__, status).observe(
+                time.perf_counter() - started
+            )
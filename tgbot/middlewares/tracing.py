@@ -0,0 +1,50 @@
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from tgbot.services.tracing import SLOW_UPDATE_SECONDS, record_span, trace
+
+
+class TracingMiddleware(BaseMiddleware):
+    """
+    Outer middleware update: время обработки целиком; медленные
+    update попадают в лог вместе с самыми долгими отрезками.
+    """
+
+    def __init__(self, slow_seconds: float = SLOW_UPDATE_SECONDS) -> None:
+        self.slow_seconds = slow_seconds
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        try:
+            name = f"update {event.update_id} ({event.event_type})"
+        except LookupError:
+            name = f"update {event.update_id}"
+        with trace(name, self.slow_seconds):
+            return await handler(event, data)
+
+
+class HandlerTracingMiddleware(BaseMiddleware):
+    """
+    Inner middleware: время конкретного хэндлера (outer middleware
+    хэндлер ещё не известен).
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        name = getattr(data["handler"].callback, "__name__", "handler")
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            record_span(f"handler:{name}", time.perf_counter() - started)
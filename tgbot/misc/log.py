@@ -0,0 +1,163 @@
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import queue
+import random
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Iterator, Mapping, Optional
+
+import betterlogging as bl
+
+from tgbot.config import LoggingConfig
+from tgbot.services.metrics import LOG_RECORDS_DROPPED
+
+TEXT_FORMAT = "[%(asctime)s] %(levelname)s — %(message)s"
+
+TEXT_DATEFMT = "%Y-%m-%d %H:%M:%S"
+
+# Поля контекста, которые попадают в каждую запись (update_id, user_id,
+# inv_id); задаются middleware бота и обработчиками Robokassa.
+CONTEXT_FIELDS = ("update_id", "user_id", "inv_id")
+
+# Логгеры uvicorn пишут в stdout сами; их записи тоже идут в очередь.
+CAPTURED_LOGGERS = ("uvicorn", "uvicorn.error", "uvicorn.access")
+
+_context: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar(
+    "log_context", default={}
+)
+
+_listener: Optional[QueueListener] = None
+
+
+def bind_log_context(**fields: Any) -> None:
+    """Добавляет поля в контекст логов текущей задачи."""
+    _context.set({**_context.get(), **fields})
+
+
+@contextmanager
+def log_context(**fields: Any) -> Iterator[None]:
+    """Поля контекста логов на время блока."""
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """
+    Копирует контекст в запись. Работает в потоке event loop,
+    до постановки записи в очередь: там contextvars ещё доступны.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for name, value in _context.get().items():
+            setattr(record, name, value)
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Пропускает долю rates[module] записей уровня ниже WARNING из
+    модуля module; предупреждения и ошибки пишутся всегда.
+    """
+
+    def __init__(self, rates: Mapping[str, float]):
+        super().__init__()
+        self.rates = dict(rates)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(record.module)
+        return rate is None or random.random() < rate
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    QueueHandler, который не блокирует event loop при переполненной
+    очереди: запись отбрасывается и учитывается в dropped и в метрике
+    privatbot_log_records_dropped_total.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Подставляем только аргументы сообщения (они могут измениться
+        # позже); traceback и форматирование остаются listener'у.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            LOG_RECORDS_DROPPED.inc()
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна JSON-запись на строку с полями контекста."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "module": record.module,
+            "message": record.getMessage(),
+        }
+        for name in CONTEXT_FIELDS:
+            value = getattr(record, name, None)
+            if value is not None:
+                entry[name] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def setup_logging(config: Optional[LoggingConfig] = None) -> None:
+    """
+    Единая настройка логов процесса. Корневой логгер только кладёт
+    записи в очередь (с контекстом и сэмплингом), а форматирование
+    и запись в stdout выполняет QueueListener в отдельном потоке.
+    Повторный вызов ничего не меняет; listener останавливается
+    (дописывая очередь) при выходе из процесса.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    config = config or LoggingConfig()
+
+    stream = logging.StreamHandler()
+    if config.format == "json":
+        stream.setFormatter(JsonFormatter())
+    else:
+        stream.setFormatter(
+            bl.ColorizedFormatter(fmt=TEXT_FORMAT, datefmt=TEXT_DATEFMT)
+        )
+
+    handler = DroppingQueueHandler(queue.Queue(config.queue_size))
+    if config.sampling:
+        handler.addFilter(SamplingFilter(config.sampling))
+    handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(config.level)
+    for name in CAPTURED_LOGGERS:
+        captured = logging.getLogger(name)
+        captured.handlers = []
+        captured.propagate = True
+
+    _listener = QueueListener(handler.queue, stream)
+    _listener.start()
+    atexit.register(_listener.stop)
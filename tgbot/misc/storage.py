@@ -0,0 +1,140 @@
+import asyncio
+import copy
+import json
+import logging
+import uuid
+from dataclasses import astuple
+from typing import Any, Dict, Mapping, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from aiogram.fsm.storage.redis import RedisStorage
+
+from tgbot.misc.cache import TTLCache
+
+_MISSING = object()
+
+
+class CachedRedisStorage(BaseStorage):
+    """
+    FSM-хранилище в два уровня: LRU-кэш процесса перед RedisStorage.
+    Чтение состояния и данных горячих пользователей не ходит в Redis;
+    запись идёт сразу в Redis (write-through), после чего остальные
+    процессы получают через pub/sub команду сбросить ключ у себя.
+    Пока подписка на канал не активна, кэш не используется, а при
+    её обрыве сбрасывается целиком; ttl ограничивает устаревание,
+    если сообщение об инвалидации всё же потерялось.
+    """
+
+    def __init__(
+        self,
+        storage: RedisStorage,
+        maxsize: int = 10_000,
+        ttl: float = 60,
+        channel: str = "fsm:invalidate",
+    ):
+        self.storage = storage
+        self.channel = channel
+        self._states: TTLCache[Optional[str]] = TTLCache(maxsize, ttl)
+        self._data: TTLCache[Dict[str, Any]] = TTLCache(maxsize, ttl)
+        self._instance = uuid.uuid4().hex
+        self._subscribed = False
+        # Растёт при каждой инвалидации: значение, прочитанное из Redis
+        # до неё, в кэш не попадает.
+        self._generation = 0
+        self._listener: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _encode(key: StorageKey) -> list:
+        return list(astuple(key))
+
+    def _cacheable(self, generation: int) -> bool:
+        return self._subscribed and generation == self._generation
+
+    def _ensure_listener(self) -> None:
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self) -> None:
+        """Слушает инвалидации; при обрыве переподписывается."""
+        while True:
+            pubsub = self.storage.redis.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                self._subscribed = True
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self._on_invalidate(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.warning("⚠️ Инвалидация FSM-кэша прервана: %s", e)
+            finally:
+                self._subscribed = False
+                self._generation += 1
+                self._states.clear()
+                self._data.clear()
+                await pubsub.aclose()
+            await asyncio.sleep(1)
+
+    def _on_invalidate(self, raw: bytes) -> None:
+        instance, key = json.loads(raw)
+        if instance == self._instance:
+            return
+        key = StorageKey(*key)
+        self._generation += 1
+        self._states.pop(key)
+        self._data.pop(key)
+
+    async def _invalidate_others(self, key: StorageKey) -> None:
+        await self.storage.redis.publish(
+            self.channel, json.dumps([self._instance, self._encode(key)])
+        )
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        generation = self._generation
+        await self.storage.set_state(key, state)
+        if self._cacheable(generation):
+            self._states.set(key, state.state if isinstance(state, State) else state)
+        else:
+            self._states.pop(key)
+        await self._invalidate_others(key)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        self._ensure_listener()
+        state = self._states.get(key, _MISSING)
+        if state is not _MISSING:
+            return state
+        generation = self._generation
+        state = await self.storage.get_state(key)
+        if self._cacheable(generation):
+            self._states.set(key, state)
+        return state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        generation = self._generation
+        await self.storage.set_data(key, data)
+        if self._cacheable(generation):
+            self._data.set(key, copy.deepcopy(dict(data)))
+        else:
+            self._data.pop(key)
+        await self._invalidate_others(key)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        self._ensure_listener()
+        data = self._data.get(key)
+        if data is None:
+            generation = self._generation
+            data = await self.storage.get_data(key)
+            if self._cacheable(generation):
+                self._data.set(key, copy.deepcopy(data))
+            return data
+        # Копия: хэндлер может менять словарь без set_data.
+        return copy.deepcopy(data)
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+        await self.storage.close()
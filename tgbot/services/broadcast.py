@@ -0,0 +1,227 @@
+import asyncio
+import logging
+import os
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramForbiddenError
+from dotenv import load_dotenv
+
+from tgbot.services.rate_limiter import BotRateLimiter
+from tgbot.services.telegram import get_bot, telegram_limiter
+
+load_dotenv()
+
+BROADCAST_BATCH = int(os.getenv("BROADCAST_BATCH", "500"))
+
+# Платная рассылка (allow_paid_broadcast, списываются Telegram Stars)
+# разрешает до 1000 сообщений в секунду вместо ~30.
+BROADCAST_PAID = os.getenv("BROADCAST_PAID", "false").lower() == "true"
+
+BROADCAST_PAID_RATE = float(os.getenv("BROADCAST_PAID_RATE", "1000"))
+
+
+def format_report(row) -> str:
+    """Итоги рассылки для администратора."""
+    finished = row["finished_at"] or datetime.now(timezone.utc)
+    elapsed = (
+        (finished - row["started_at"]).total_seconds() if row["started_at"] else 0.0
+    )
+    rate = row["sent"] / elapsed if elapsed > 0 else 0.0
+    return (
+        f"📣 Рассылка #{row['id']} ({row['status']}): "
+        f"отправлено {row['sent']}, заблокировали бота {row['blocked']}, "
+        f"ошибок {row['failed']}, {elapsed:.0f} с, {rate:.1f} сообщ./с"
+    )
+
+
+class BroadcastEngine:
+    """
+    Рассылка сообщения всем подписчикам из privat_user.
+    Получатели читаются страницами по user_id (keyset), сообщения
+    отправляются через лимитер Bot API, а после каждой страницы
+    счётчики и последний user_id сохраняются в broadcasts: после
+    перезапуска рассылка продолжается с контрольной точки (повторно
+    может уйти не больше одной страницы). Рассылки выполняются
+    по очереди одним воркером (run_forever на лидере шарда 0).
+    """
+
+    def __init__(
+        self,
+        db,
+        bot: Optional[Bot] = None,
+        rate_limiter: Optional[BotRateLimiter] = None,
+        batch_size: int = BROADCAST_BATCH,
+        paid: bool = BROADCAST_PAID,
+        poll_interval: float = 5,
+    ):
+        self.db = db
+        self._bot = bot
+        self.paid = paid
+        if rate_limiter is None:
+            rate_limiter = (
+                BotRateLimiter(global_rate=BROADCAST_PAID_RATE)
+                if paid
+                else telegram_limiter
+            )
+        self.rate_limiter = rate_limiter
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._wakeup = asyncio.Event()
+
+    @property
+    def bot(self) -> Bot:
+        return self._bot or get_bot()
+
+    async def create(self, text: str, created_by: int) -> int:
+        """Ставит рассылку в очередь; возвращает её номер."""
+        broadcast_id = await self.db.fetchval(
+            "INSERT INTO public.broadcasts (text, created_by) "
+            "VALUES ($1, $2) RETURNING id",
+            text,
+            created_by,
+        )
+        self._wakeup.set()
+        return broadcast_id
+
+    async def cancel(self) -> Optional[int]:
+        """Отменяет текущую (или ближайшую) рассылку."""
+        return await self.db.fetchval(
+            """
+            UPDATE public.broadcasts
+            SET status = 'cancelled', finished_at = now()
+            WHERE id = (
+                SELECT id FROM public.broadcasts
+                WHERE status IN ('pending', 'running')
+                ORDER BY id
+                LIMIT 1
+            )
+            RETURNING id
+            """
+        )
+
+    async def last(self):
+        """Последняя рассылка (для /broadcast_status)."""
+        return await self.db.fetchrow(
+            "SELECT * FROM public.broadcasts ORDER BY id DESC LIMIT 1"
+        )
+
+    async def _send(self, user_id: int, text: str) -> str:
+        try:
+            await self.rate_limiter.call(
+                lambda: self.bot.send_message(
+                    user_id,
+                    text,
+                    allow_paid_broadcast=self.paid or None,
+                ),
+                chat_id=user_id,
+            )
+        except TelegramForbiddenError:
+            return "blocked"
+        except Exception as e:
+            logging.warning("📣 Не доставлено user_id=%s: %s", user_id, e)
+            return "failed"
+        return "sent"
+
+    async def run_one(self, row) -> None:
+        """Выполняет (или продолжает) одну рассылку."""
+        broadcast_id = row["id"]
+        await self.db.execute(
+            """
+            UPDATE public.broadcasts
+            SET status = 'running', started_at = coalesce(started_at, now())
+            WHERE id = $1 AND status = 'pending'
+            """,
+            broadcast_id,
+        )
+        if row["last_user_id"] is not None:
+            logging.info(
+                "📣 Рассылка #%s продолжается после user_id=%s",
+                broadcast_id,
+                row["last_user_id"],
+            )
+        last_user_id = row["last_user_id"]
+        while True:
+            recipients = await self.db.fetch(
+                """
+                SELECT user_id FROM public.privat_user
+                WHERE $1::bigint IS NULL OR user_id > $1
+                ORDER BY user_id
+                LIMIT $2
+                """,
+                last_user_id,
+                self.batch_size,
+            )
+            if not recipients:
+                break
+            outcomes = Counter(
+                await asyncio.gather(
+                    *(self._send(r["user_id"], row["text"]) for r in recipients)
+                )
+            )
+            last_user_id = recipients[-1]["user_id"]
+            status = await self.db.fetchval(
+                """
+                UPDATE public.broadcasts
+                SET last_user_id = $2,
+                    sent = sent + $3,
+                    failed = failed + $4,
+                    blocked = blocked + $5
+                WHERE id = $1
+                RETURNING status
+                """,
+                broadcast_id,
+                last_user_id,
+                outcomes["sent"],
+                outcomes["failed"],
+                outcomes["blocked"],
+            )
+            if status != "running":
+                logging.info("📣 Рассылка #%s отменена", broadcast_id)
+                break
+
+        finished = await self.db.fetchrow(
+            """
+            UPDATE public.broadcasts
+            SET status = CASE WHEN status = 'running' THEN 'done'
+                              ELSE status END,
+                finished_at = coalesce(finished_at, now())
+            WHERE id = $1
+            RETURNING *
+            """,
+            broadcast_id,
+        )
+        report = format_report(finished)
+        logging.info(report)
+        try:
+            await self.rate_limiter.call(
+                lambda: self.bot.send_message(finished["created_by"], report),
+                chat_id=finished["created_by"],
+            )
+        except Exception as e:
+            logging.warning("📣 Не удалось отправить отчёт: %s", e)
+
+    async def run_forever(self) -> None:
+        """Воркер: выполняет рассылки из очереди по одной."""
+        while True:
+            self._wakeup.clear()
+            try:
+                row = await self.db.fetchrow(
+                    """
+                    SELECT * FROM public.broadcasts
+                    WHERE status IN ('pending', 'running')
+                    ORDER BY id
+                    LIMIT 1
+                    """
+                )
+                if row is not None:
+                    await self.run_one(row)
+                    continue
+            except Exception as e:
+                logging.error("❌ Ошибка рассылки: %s", e)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,158 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from aiogram import Bot
+
+from tgbot.services.rate_limiter import BotRateLimiter
+from tgbot.services.telegram import get_bot, telegram_limiter
+
+
+class InviteLinkPool:
+    """
+    Пул заранее созданных одноразовых ссылок-приглашений в канал.
+    Фоновая задача держит запас не ниже low_watermark (дополняя до
+    high_watermark) и удаляет использованные ссылки и ссылки, которым
+    осталось жить меньше min_remaining; путь успешной оплаты только
+    забирает из таблицы самую свежую ссылку.
+    """
+
+    def __init__(
+        self,
+        db,
+        channel_id: int,
+        bot: Optional[Bot] = None,
+        low_watermark: int = 20,
+        high_watermark: int = 50,
+        link_ttl: timedelta = timedelta(days=7),
+        refill_interval: float = 60,
+        rate_limiter: Optional[BotRateLimiter] = None,
+        min_remaining: timedelta = timedelta(days=1),
+    ):
+        if link_ttl <= min_remaining:
+            raise ValueError("link_ttl должен быть больше min_remaining")
+        self.db = db
+        self._bot = bot
+        self.channel_id = channel_id
+        self.low_watermark = low_watermark
+        self.high_watermark = high_watermark
+        self.link_ttl = link_ttl
+        self.refill_interval = refill_interval
+        self.rate_limiter = rate_limiter or telegram_limiter
+        # Ссылка, которой осталось жить меньше, в выдачу не попадает
+        # и удаляется при пополнении: покупатель получает ссылку,
+        # которая работает хотя бы min_remaining.
+        self.min_remaining = min_remaining
+        self._wakeup = asyncio.Event()
+
+    @property
+    def bot(self) -> Bot:
+        return self._bot or get_bot()
+
+    async def _create_link(self, name: str) -> tuple[str, datetime]:
+        expires_at = datetime.now(timezone.utc) + self.link_ttl
+        link = await self.rate_limiter.call(
+            lambda: self.bot.create_chat_invite_link(
+                chat_id=self.channel_id,
+                expire_date=expires_at,
+                member_limit=1,
+                name=name,
+            )
+        )
+        return link.invite_link, expires_at
+
+    async def available(self) -> int:
+        return await self.db.fetchval(
+            """
+            SELECT count(*) FROM public.invite_links
+            WHERE claimed_by IS NULL AND expires_at > now() + $1::interval
+            """,
+            self.min_remaining,
+        )
+
+    async def prune(self) -> None:
+        """Удаляет истёкшие, почти истёкшие и использованные ссылки."""
+        await self.db.execute(
+            """
+            DELETE FROM public.invite_links
+            WHERE expires_at <= now() + $1::interval
+               OR claimed_at < now() - $2::interval
+            """,
+            self.min_remaining,
+            self.link_ttl,
+        )
+
+    async def refill(self) -> int:
+        """Дополняет пул до high_watermark, если он ниже low_watermark."""
+        await self.prune()
+        available = await self.available()
+        if available >= self.low_watermark:
+            return 0
+        created = 0
+        for _ in range(self.high_watermark - available):
+            link, expires_at = await self._create_link("Оплата подписки")
+            await self.db.execute(
+                "INSERT INTO public.invite_links (invite_link, expires_at) "
+                "VALUES ($1, $2)",
+                link,
+                expires_at,
+            )
+            created += 1
+        logging.info("🔗 Пул ссылок пополнен на %s (было %s)", created, available)
+        return created
+
+    async def claim(self, user_id: int) -> str:
+        """
+        Забирает свободную ссылку для user_id. Если пул пуст,
+        создаёт ссылку напрямую через Bot API.
+        """
+        link = await self.db.fetchval(
+            """
+            UPDATE public.invite_links
+            SET claimed_by = $1, claimed_at = now()
+            WHERE invite_link = (
+                SELECT invite_link FROM public.invite_links
+                WHERE claimed_by IS NULL
+                  AND expires_at > now() + $2::interval
+                ORDER BY expires_at DESC
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING invite_link
+            """,
+            user_id,
+            self.min_remaining,
+        )
+        self._wakeup.set()
+        if link is not None:
+            return link
+
+        logging.warning("🔗 Пул ссылок пуст, создаём ссылку напрямую")
+        link, expires_at = await self._create_link(f"Оплата user={user_id}")
+        await self.db.execute(
+            """
+            INSERT INTO public.invite_links
+                (invite_link, expires_at, claimed_by, claimed_at)
+            VALUES ($1, $2, $3, now())
+            """,
+            link,
+            expires_at,
+            user_id,
+        )
+        return link
+
+    async def run_forever(self) -> None:
+        """Фоновое пополнение: по таймеру и после каждой выдачи."""
+        while True:
+            self._wakeup.clear()
+            try:
+                await self.refill()
+            except Exception as e:
+                logging.error("❌ Ошибка пополнения пула ссылок: %s", e)
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(), timeout=self.refill_interval
+                )
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import random
+from typing import Any, Awaitable, Callable, Optional
+
+import asyncpg
+
+
+class LeaderElection:
+    """
+    Лидерство среди реплик через session-level advisory lock
+    PostgreSQL на отдельном соединении (вне общего пула).
+    Пока соединение живо, лидер выполняет work; если соединение
+    оборвалось, PostgreSQL снимает блокировку, лидер отменяет work,
+    а блокировку забирает другая реплика. Потерю блокировки лидер
+    замечает не позже чем через 2 × check_interval, а другие реплики
+    пытаются взять её не чаще чем раз в 0.8 × retry_interval, поэтому
+    check_interval должен быть заметно меньше retry_interval: иначе
+    новый лидер начнёт работу, пока старый ещё её выполняет.
+    """
+
+    def __init__(
+        self,
+        dsn: Optional[str],
+        lock_id: int,
+        name: str = "leader",
+        retry_interval: float = 10,
+        check_interval: Optional[float] = None,
+    ):
+        if check_interval is None:
+            check_interval = retry_interval / 4
+        if 2 * check_interval >= 0.8 * retry_interval:
+            raise ValueError(
+                "check_interval должен быть меньше 0.4 × retry_interval, "
+                "чтобы старый лидер останавливался раньше, чем появится новый"
+            )
+        self.dsn = dsn
+        self.lock_id = lock_id
+        self.name = name
+        self.retry_interval = retry_interval
+        self.check_interval = check_interval
+        self.is_leader = False
+
+    async def _try_acquire(self) -> Optional[asyncpg.Connection]:
+        """Соединение с взятой блокировкой или None, если она занята."""
+        conn = await asyncpg.connect(self.dsn)
+        try:
+            if await conn.fetchval("SELECT pg_try_advisory_lock($1)", self.lock_id):
+                return conn
+        except BaseException:
+            await conn.close()
+            raise
+        await conn.close()
+        return None
+
+    async def _lead(
+        self,
+        conn: asyncpg.Connection,
+        work: Callable[[], Awaitable[Any]],
+    ) -> None:
+        """Выполняет work, пока соединение с блокировкой отвечает."""
+        self.is_leader = True
+        logging.info("👑 %s: эта реплика — лидер", self.name)
+        task = asyncio.create_task(work())
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=self.check_interval)
+                if done:
+                    await task
+                    logging.warning("👑 %s: работа лидера завершилась", self.name)
+                    return
+                await asyncio.wait_for(conn.fetchval("SELECT 1"), self.check_interval)
+        finally:
+            self.is_leader = False
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            conn.terminate()
+
+    async def run(
+        self,
+        work: Callable[[], Awaitable[Any]],
+        backoff: Optional[Callable[[], float]] = None,
+        initial_delay: float = 0,
+    ) -> None:
+        """
+        Бесконечно пытается стать лидером и выполнять work.
+        backoff возвращает паузу перед следующей попыткой
+        (по умолчанию retry_interval с небольшим разбросом).
+        """
+        await asyncio.sleep(initial_delay)
+        while True:
+            try:
+                conn = await self._try_acquire()
+                if conn is not None:
+                    await self._lead(conn, work)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error("👑 %s: лидерство потеряно: %s", self.name, e)
+            delay = backoff() if backoff else self.retry_interval
+            await asyncio.sleep(delay * random.uniform(0.8, 1.2))
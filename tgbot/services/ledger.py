@@ -0,0 +1,93 @@
+import asyncio
+import logging
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import List
+
+from tgbot.misc.cache import TTLCache
+
+
+class PaymentLedger:
+    """
+    Журнал платежей Robokassa (таблица payments).
+    InvId выдаются из последовательности payment_inv_id_seq блоками,
+    повторные callback'и по уже учтённому InvId распознаются сначала
+    по кэшу процесса, затем по первичному ключу payments, и не трогают
+    privat_user.
+    """
+
+    def __init__(self, db, block_size: int = 100):
+        self.db = db
+        self.block_size = block_size
+        self._ids: List[int] = []
+        self._lock = asyncio.Lock()
+        self._processed: TTLCache[bool] = TTLCache(maxsize=100_000, ttl=86400)
+
+    async def allocate(self) -> int:
+        """Новый уникальный InvId."""
+        async with self._lock:
+            if not self._ids:
+                rows = await self.db.fetch(
+                    "SELECT nextval('public.payment_inv_id_seq') AS inv_id "
+                    "FROM generate_series(1, $1)",
+                    self.block_size,
+                )
+                self._ids = [row["inv_id"] for row in rows]
+            return self._ids.pop(0)
+
+    def is_processed(self, inv_id: int) -> bool:
+        """Быстрая проверка без БД: InvId уже учтён этим процессом."""
+        return inv_id in self._processed
+
+    async def apply_payment(
+        self,
+        inv_id: int,
+        user_id: int,
+        user_name: str,
+        months: int,
+        amount: Decimal,
+    ) -> bool:
+        """
+        Одним запросом записывает платёж и продлевает подписку.
+        Возвращает False, если InvId уже был учтён.
+        """
+        start_date = date.today()
+        end_date = start_date + timedelta(days=30 * months)
+        applied = await self.db.fetchval(
+            """
+            WITH paid AS (
+                INSERT INTO public.payments (inv_id, user_id, months, amount)
+                VALUES ($1, $2, $3, $4)
+                ON CONFLICT (inv_id) DO NOTHING
+                RETURNING inv_id
+            )
+            INSERT INTO public.privat_user (user_id,
+             user_name,
+              start_subscription,
+               end_subscription,
+                duration_months,
+                 recurring_id)
+            SELECT $2, $5, $6, $7, $3, inv_id::text FROM paid
+            ON CONFLICT (user_id) DO UPDATE
+            SET start_subscription = EXCLUDED.start_subscription,
+                end_subscription = EXCLUDED.end_subscription,
+                duration_months = EXCLUDED.duration_months,
+                recurring_id = EXCLUDED.recurring_id,
+                user_name = EXCLUDED.user_name,
+                renewal_attempts = 0,
+                next_renewal_attempt_at = NULL,
+                renewal_inv_id = NULL
+            RETURNING user_id
+            """,
+            inv_id,
+            user_id,
+            months,
+            amount,
+            user_name,
+            start_date,
+            end_date,
+        )
+        self._processed.set(inv_id, True)
+        if applied is None:
+            logging.info("🔁 Повторный callback для InvId=%s", inv_id)
+        return applied is not None
@@ -0,0 +1,98 @@
+import hashlib
+import logging
+import os
+from typing import Any, Dict, Optional, Tuple
+
+from aiogram import types
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import FSInputFile
+
+
+class MediaRegistry:
+    """
+    Реестр file_id загруженных в Telegram файлов.
+    Файл загружается один раз, file_id хранится в памяти и в БД
+    (media_files) по ключу (bot_id, sha256 файла) и переиспользуется.
+    Если Telegram отверг устаревший file_id, файл загружается заново.
+    """
+
+    def __init__(self) -> None:
+        self._file_ids: Dict[Tuple[int, str], str] = {}
+        self._hashes: Dict[str, Tuple[float, int, str]] = {}
+
+    def file_hash(self, path: str) -> str:
+        """sha256 файла; пересчитывается только при изменении файла."""
+        stat = os.stat(path)
+        cached = self._hashes.get(path)
+        if cached and cached[:2] == (stat.st_mtime, stat.st_size):
+            return cached[2]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(65536), b""):
+                digest.update(chunk)
+        file_hash = digest.hexdigest()
+        self._hashes[path] = (stat.st_mtime, stat.st_size, file_hash)
+        return file_hash
+
+    async def get(self, db, bot_id: int, file_hash: str) -> Optional[str]:
+        key = (bot_id, file_hash)
+        file_id = self._file_ids.get(key)
+        if file_id is None:
+            file_id = await db.fetchval(
+                "SELECT file_id FROM public.media_files "
+                "WHERE bot_id = $1 AND file_hash = $2",
+                bot_id,
+                file_hash,
+            )
+            if file_id is not None:
+                self._file_ids[key] = file_id
+        return file_id
+
+    async def save(self, db, bot_id: int, file_hash: str, file_id: str) -> None:
+        self._file_ids[(bot_id, file_hash)] = file_id
+        await db.execute(
+            """
+            INSERT INTO public.media_files (bot_id, file_hash, file_id)
+            VALUES ($1, $2, $3)
+            ON CONFLICT (bot_id, file_hash) DO UPDATE
+            SET file_id = EXCLUDED.file_id
+            """,
+            bot_id,
+            file_hash,
+            file_id,
+        )
+
+    async def forget(self, db, bot_id: int, file_hash: str) -> None:
+        self._file_ids.pop((bot_id, file_hash), None)
+        await db.execute(
+            "DELETE FROM public.media_files " "WHERE bot_id = $1 AND file_hash = $2",
+            bot_id,
+            file_hash,
+        )
+
+    async def answer_photo(
+        self, message: types.Message, db, path: str, **kwargs: Any
+    ) -> types.Message:
+        """Отправляет фото по file_id, а при его отсутствии — загружает."""
+        bot_id = message.bot.id
+        file_hash = self.file_hash(path)
+
+        file_id = await self.get(db, bot_id, file_hash)
+        if file_id is not None:
+            try:
+                return await message.answer_photo(photo=file_id, **kwargs)
+            except TelegramBadRequest as e:
+                logging.warning(
+                    "🖼 file_id для %s отклонён (%s), загружаем заново",
+                    path,
+                    e,
+                )
+                await self.forget(db, bot_id, file_hash)
+
+        sent = await message.answer_photo(photo=FSInputFile(path), **kwargs)
+        await self.save(db, bot_id, file_hash, sent.photo[-1].file_id)
+        logging.info("🖼 Файл %s загружен в Telegram", path)
+        return sent
+
+
+media_registry = MediaRegistry()
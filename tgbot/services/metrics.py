@@ -0,0 +1,155 @@
+import logging
+import os
+import time
+from typing import Iterator, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from dotenv import load_dotenv
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    Counter,
+    Histogram,
+    generate_latest,
+    start_http_server,
+)
+from prometheus_client.core import GaugeMetricFamily, Metric
+
+from tgbot.services.tracing import record_span
+
+load_dotenv()
+
+# Порт /metrics процесса бота в режиме polling (0 — не открывать);
+# FastAPI отдаёт метрики на своём /metrics.
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "privatbot_http_request_seconds",
+    "Время обработки HTTP-запроса FastAPI",
+    ["route", "status"],
+)
+
+DB_QUERY_SECONDS = Histogram(
+    "privatbot_db_query_seconds",
+    "Время запроса к БД (с ожиданием соединения)",
+    ["operation"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+
+BOT_API_SECONDS = Histogram(
+    "privatbot_bot_api_seconds",
+    "Время вызова Bot API",
+    ["method"],
+)
+
+BOT_API_ERRORS = Counter(
+    "privatbot_bot_api_errors_total",
+    "Ошибки вызовов Bot API",
+    ["method", "error"],
+)
+
+HANDLER_SECONDS = Histogram(
+    "privatbot_handler_seconds",
+    "Время обработки update хэндлерами aiogram",
+    ["event", "status"],
+)
+
+RENEWAL_RUN_SECONDS = Histogram(
+    "privatbot_renewal_run_seconds",
+    "Длительность прогона продления подписок",
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600),
+)
+
+RENEWAL_OUTCOMES = Counter(
+    "privatbot_renewal_outcomes_total",
+    "Исходы продления по пользователям",
+    ["outcome"],
+)
+
+LOG_RECORDS_DROPPED = Counter(
+    "privatbot_log_records_dropped_total",
+    "Записи лога, отброшенные из-за переполненной очереди",
+)
+
+
+class OutboxCollector:
+    """
+    Глубина очереди notification_outbox и возраст самого старого
+    неотправленного сообщения. Значения обновляет воркер outbox
+    (он работает только на лидере); в остальных процессах и при
+    устаревшем снимке метрики не отдаются, чтобы не подменять их нулями.
+    """
+
+    def __init__(self, stale_after: float = 120):
+        self.stale_after = stale_after
+        self._snapshot: Optional[Tuple[float, float]] = None
+        self._updated = 0.0
+
+    def update(self, depth: int, oldest_age: float) -> None:
+        self._snapshot = (depth, oldest_age)
+        self._updated = time.monotonic()
+
+    def collect(self) -> Iterator[Metric]:
+        if self._snapshot is None:
+            return
+        if time.monotonic() - self._updated > self.stale_after:
+            return
+        depth, oldest_age = self._snapshot
+        yield GaugeMetricFamily(
+            "privatbot_outbox_depth",
+            "Неотправленных сообщений в notification_outbox",
+            value=depth,
+        )
+        yield GaugeMetricFamily(
+            "privatbot_outbox_oldest_age_seconds",
+            "Возраст самого старого неотправленного сообщения",
+            value=oldest_age,
+        )
+
+
+OUTBOX_METRICS = OutboxCollector()
+REGISTRY.register(OUTBOX_METRICS)
+
+
+class BotApiMetricsMiddleware(BaseRequestMiddleware):
+    """
+    Middleware сессии aiogram: время и ошибки вызовов Bot API
+    (время также попадает в трассировку текущего update).
+    """
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        name = type(method).__name__
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            BOT_API_ERRORS.labels(name, type(e).__name__).inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            BOT_API_SECONDS.labels(name).observe(elapsed)
+            record_span(f"api:{name}", elapsed)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Метрики процесса в текстовом формате Prometheus."""
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def start_metrics_server(port: int = METRICS_PORT) -> None:
+    """HTTP-сервер /metrics в фоновом потоке для процесса без FastAPI."""
+    if not port:
+        return
+    start_http_server(port)
+    logging.info("📈 Метрики доступны на :%s/metrics", port)
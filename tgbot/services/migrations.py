@@ -0,0 +1,83 @@
+import logging
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import asyncpg
+
+MIGRATIONS_DIR = Path(__file__).resolve().parents[2] / "migrations"
+
+# Ключ advisory lock: бот и FastAPI могут стартовать одновременно.
+MIGRATIONS_LOCK_ID = 74100016
+
+_FILE_NAME = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    sql: str
+
+
+def load_migrations(directory: Path = MIGRATIONS_DIR) -> List[Migration]:
+    """Миграции из файлов NNNN_name.sql, по возрастанию версии."""
+    migrations = {}
+    for path in directory.glob("*.sql"):
+        match = _FILE_NAME.match(path.name)
+        if match is None:
+            raise ValueError(f"Некорректное имя миграции: {path.name}")
+        version = int(match.group(1))
+        if version in migrations:
+            raise ValueError(f"Повторяется версия миграции {version}")
+        migrations[version] = Migration(
+            version, match.group(2), path.read_text(encoding="utf-8")
+        )
+    return [migrations[version] for version in sorted(migrations)]
+
+
+async def apply_migrations(
+    conn: asyncpg.Connection,
+    migrations: Optional[Sequence[Migration]] = None,
+) -> List[int]:
+    """
+    Применяет ещё не применённые миграции, каждую в своей транзакции,
+    и отмечает их в schema_migrations. Возвращает применённые версии.
+    """
+    if migrations is None:
+        migrations = load_migrations()
+    await conn.execute("SELECT pg_advisory_lock($1)", MIGRATIONS_LOCK_ID)
+    try:
+        await conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS public.schema_migrations (
+                version INT PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            )
+            """
+        )
+        rows = await conn.fetch("SELECT version FROM public.schema_migrations")
+        applied = {row["version"] for row in rows}
+        done = []
+        for migration in migrations:
+            if migration.version in applied:
+                continue
+            async with conn.transaction():
+                await conn.execute(migration.sql)
+                await conn.execute(
+                    "INSERT INTO public.schema_migrations (version, name) "
+                    "VALUES ($1, $2)",
+                    migration.version,
+                    migration.name,
+                )
+            logging.info(
+                "🗄 Применена миграция %04d_%s",
+                migration.version,
+                migration.name,
+            )
+            done.append(migration.version)
+        return done
+    finally:
+        await conn.execute("SELECT pg_advisory_unlock($1)", MIGRATIONS_LOCK_ID)
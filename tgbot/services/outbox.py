@@ -0,0 +1,229 @@
+import asyncio
+import logging
+import time
+from datetime import timedelta
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+from aiogram.types import InlineKeyboardMarkup
+
+from tgbot.services.metrics import OUTBOX_METRICS
+from tgbot.services.rate_limiter import BotRateLimiter
+from tgbot.services.telegram import get_bot, telegram_limiter
+
+
+class NotificationOutbox:
+    """
+    Надёжная очередь исходящих сообщений в таблице notification_outbox.
+    Обработчики запросов только добавляют строку, а фоновый воркер
+    отправляет сообщения пачками через лимитер Bot API с повторами.
+    Для каждого чата сообщения уходят строго по порядку: пока первое
+    неотправленное сообщение чата не доставлено, следующие ждут.
+    Воркер должен работать в одном экземпляре.
+    """
+
+    def __init__(
+        self,
+        db,
+        bot: Optional[Bot] = None,
+        rate_limiter: Optional[BotRateLimiter] = None,
+        batch_size: int = 100,
+        poll_interval: float = 1.0,
+        max_attempts: int = 5,
+        retry_backoff: float = 30,
+        metrics_interval: float = 15,
+    ):
+        self.db = db
+        self._bot = bot
+        self.rate_limiter = rate_limiter or telegram_limiter
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.metrics_interval = metrics_interval
+        self._metrics_at = 0.0
+        self._wakeup = asyncio.Event()
+
+    @property
+    def bot(self) -> Bot:
+        return self._bot or get_bot()
+
+    async def enqueue(
+        self,
+        chat_id: int,
+        text: str,
+        reply_markup: Optional[InlineKeyboardMarkup] = None,
+        conn=None,
+    ) -> None:
+        """Добавляет сообщение в очередь (можно внутри транзакции conn)."""
+        markup = (
+            reply_markup.model_dump_json(exclude_none=True)
+            if reply_markup is not None
+            else None
+        )
+        await (conn or self.db).execute(
+            "INSERT INTO public.notification_outbox "
+            "(chat_id, text, reply_markup) VALUES ($1, $2, $3)",
+            chat_id,
+            text,
+            markup,
+        )
+        self._wakeup.set()
+
+    async def enqueue_many(
+        self, messages: Sequence[Tuple[int, str]], conn=None
+    ) -> None:
+        """Добавляет пачку сообщений одним запросом."""
+        if not messages:
+            return
+        await (conn or self.db).execute(
+            """
+            INSERT INTO public.notification_outbox (chat_id, text)
+            SELECT * FROM unnest($1::bigint[], $2::text[])
+            """,
+            [chat_id for chat_id, _ in messages],
+            [text for _, text in messages],
+        )
+        self._wakeup.set()
+
+    async def _fetch_batch(self) -> list:
+        """Первое неотправленное сообщение каждого чата, готовое к отправке."""
+        return await self.db.fetch(
+            """
+            SELECT * FROM (
+                SELECT DISTINCT ON (chat_id)
+                    id, chat_id, text, reply_markup, attempts,
+                    next_attempt_at
+                FROM public.notification_outbox
+                WHERE sent_at IS NULL AND failed_at IS NULL
+                ORDER BY chat_id, id
+            ) AS heads
+            WHERE next_attempt_at <= now()
+            ORDER BY id
+            LIMIT $1
+            """,
+            self.batch_size,
+        )
+
+    async def _send(self, row) -> Tuple[str, Optional[str]]:
+        """Отправляет одно сообщение; возвращает (исход, ошибка)."""
+        markup = None
+        if row["reply_markup"] is not None:
+            markup = InlineKeyboardMarkup.model_validate_json(row["reply_markup"])
+        try:
+            await self.rate_limiter.call(
+                lambda: self.bot.send_message(
+                    row["chat_id"], row["text"], reply_markup=markup
+                ),
+                chat_id=row["chat_id"],
+            )
+        except (TelegramForbiddenError, TelegramBadRequest) as e:
+            return "failed", str(e)
+        except Exception as e:
+            if row["attempts"] + 1 >= self.max_attempts:
+                return "failed", str(e)
+            return "retry", str(e)
+        return "sent", None
+
+    async def drain_once(self) -> int:
+        """Отправляет одну пачку; возвращает её размер."""
+        rows = await self._fetch_batch()
+        if not rows:
+            return 0
+
+        results = await asyncio.gather(*(self._send(row) for row in rows))
+        sent, retry, failed = [], [], []
+        for row, (outcome, error) in zip(rows, results):
+            if outcome == "sent":
+                sent.append(row["id"])
+            elif outcome == "retry":
+                retry.append((row["id"], error))
+            else:
+                failed.append((row["id"], error))
+                logging.warning(
+                    "📭 Сообщение %s для chat_id=%s не доставлено: %s",
+                    row["id"],
+                    row["chat_id"],
+                    error,
+                )
+
+        async with self.db.acquire() as conn:
+            async with conn.transaction():
+                if sent:
+                    await conn.execute(
+                        "UPDATE public.notification_outbox "
+                        "SET sent_at = now(), attempts = attempts + 1 "
+                        "WHERE id = ANY($1::bigint[])",
+                        sent,
+                    )
+                if retry:
+                    await conn.execute(
+                        """
+                        UPDATE public.notification_outbox AS o
+                        SET attempts = o.attempts + 1,
+                            last_error = r.error,
+                            next_attempt_at = now()
+                                + $3::interval * power(2, o.attempts)
+                        FROM unnest($1::bigint[], $2::text[])
+                            AS r(id, error)
+                        WHERE o.id = r.id
+                        """,
+                        [item_id for item_id, _ in retry],
+                        [error for _, error in retry],
+                        timedelta(seconds=self.retry_backoff),
+                    )
+                if failed:
+                    await conn.execute(
+                        """
+                        UPDATE public.notification_outbox AS o
+                        SET attempts = o.attempts + 1,
+                            last_error = r.error,
+                            failed_at = now()
+                        FROM unnest($1::bigint[], $2::text[])
+                            AS r(id, error)
+                        WHERE o.id = r.id
+                        """,
+                        [item_id for item_id, _ in failed],
+                        [error for _, error in failed],
+                    )
+        return len(rows)
+
+    async def run_forever(self) -> None:
+        """Фоновый воркер: отправляет пачки, пока очередь не опустеет."""
+        while True:
+            self._wakeup.clear()
+            await self._refresh_metrics()
+            try:
+                if await self.drain_once() >= self.batch_size:
+                    continue
+            except Exception as e:
+                logging.error("❌ Ошибка отправки очереди сообщений: %s", e)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def metrics(self) -> Dict[str, Any]:
+        """Глубина очереди и возраст самого старого сообщения."""
+        row = await self.db.fetchrow(
+            """
+            SELECT count(*) AS depth,
+                   coalesce(
+                       extract(epoch FROM now() - min(created_at)), 0
+                   ) AS oldest_age
+            FROM public.notification_outbox
+            WHERE sent_at IS NULL AND failed_at IS NULL
+            """
+        )
+        return {"depth": row["depth"], "oldest_age": float(row["oldest_age"])}
+
+    async def _refresh_metrics(self) -> None:
+        """Раз в metrics_interval обновляет метрики очереди для /metrics."""
+        if time.monotonic() - self._metrics_at < self.metrics_interval:
+            return
+        self._metrics_at = time.monotonic()
+        try:
+            OUTBOX_METRICS.update(**await self.metrics())
+        except Exception as e:
+            logging.warning("⚠️ Не удалось снять метрики очереди сообщений: %s", e)
@@ -2,11 +2,13 @@ import hashlib
 import logging
 import os
 import urllib.parse
-from typing import Dict
+from typing import Dict, Optional
 
 from aiogram import types
 from dotenv import load_dotenv
 
+from tgbot.services.pending import PendingPayment, PendingPaymentStore, pending_payments
+
 load_dotenv()
 
 MERCHANT_LOGIN = os.getenv("ROBO_LOGIN")
@@ -18,22 +20,28 @@ IS_TEST = "0"
 
 ROBO_URL = "https://auth.robokassa.ru/Merchant/Index.aspx"
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="[%(asctime)s] %(levelname)s — %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
-
 
 class PaymentService:
     """Класс для формирования платёжных ссылок через Robokassa."""
 
     def __init__(
-        self, merchant_login: str = MERCHANT_LOGIN, password1: str = PASSWORD1
+        self,
+        merchant_login: str = MERCHANT_LOGIN,
+        password1: str = PASSWORD1,
+        pending: Optional[PendingPaymentStore] = None,
     ):
         self.merchant_login = merchant_login
         self.password1 = password1
-        self.pending_payments: Dict[str, int] = {}
+        self.pending_payments = pending or pending_payments
+        # Неизменная часть ссылки считается один раз.
+        self._url_prefix = (
+            f"{ROBO_URL}?"
+            + urllib.parse.urlencode(
+                {"MerchantLogin": merchant_login, "IsTest": IS_TEST}
+            )
+            + "&"
+        )
+        self._descriptions: Dict[int, str] = {}
 
     def _generate_signature(
         self, out_sum: str, inv_id: str, shp_params: Dict[str, str]
@@ -47,27 +55,33 @@ class PaymentService:
         return hashlib.md5(string_for_sign.encode("utf-8")).hexdigest().upper()
 
     def generate_payment_url(
-        self, user_id: int, months: int, price: int
+        self, user_id: int, months: int, price: int, inv_id: int
     ) -> str:
-        """Генерирует платёжную ссылку Robokassa."""
+        """
+        Генерирует платёжную ссылку Robokassa.
+        inv_id должен быть уникальным (PaymentLedger.allocate).
+        """
         out_sum = f"{price}.00"
-        inv_id = str(user_id * 10 + months)
-        description = f"Подписка на {months} мес."
+        inv_id = str(inv_id)
         shp_params = {"Shp_months": str(months), "Shp_user": str(user_id)}
         signature_value = self._generate_signature(out_sum, inv_id, shp_params)
-        params = {
-            "MerchantLogin": self.merchant_login,
-            "OutSum": out_sum,
-            "InvId": inv_id,
-            "Description": description,
-            "SignatureValue": signature_value,
-            "IsTest": IS_TEST,
-            **shp_params,
-        }
-        return f"{ROBO_URL}?{urllib.parse.urlencode(params)}"
+        description = self._descriptions.get(months)
+        if description is None:
+            description = urllib.parse.quote_plus(f"Подписка на {months} мес.")
+            self._descriptions[months] = description
+        return (
+            f"{self._url_prefix}OutSum={out_sum}&InvId={inv_id}"
+            f"&Description={description}"
+            f"&SignatureValue={signature_value}"
+            f"&Shp_months={months}&Shp_user={user_id}"
+        )
 
     async def start_payment(
-        self, callback_query: types.CallbackQuery, months: int, price: int
+        self,
+        callback_query: types.CallbackQuery,
+        months: int,
+        price: int,
+        inv_id: int,
     ) -> None:
         """
         Запускает процесс оплаты:
@@ -76,9 +90,12 @@ class PaymentService:
         - отправляет пользователю
         """
         user_id = callback_query.from_user.id
-        payment_url = self.generate_payment_url(user_id, months, price)
-        inv_id = str(user_id * 10 + months)
-        self.pending_payments[inv_id] = user_id
+        payment_url = self.generate_payment_url(
+            user_id, months, price, inv_id
+        )
+        await self.pending_payments.add(
+            inv_id, PendingPayment(user_id, months, price)
+        )
         logging.info(
             "💰 Новый платёж: user_id=%s, months=%s, amount=%s",
             user_id,
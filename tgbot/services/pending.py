@@ -0,0 +1,133 @@
+import json
+import logging
+import os
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass
+from typing import Iterable, Optional, Tuple
+
+from dotenv import load_dotenv
+from environs import Env
+from redis.asyncio import Redis
+
+from tgbot.config import RedisConfig
+from tgbot.misc.cache import TTLCache
+
+load_dotenv()
+
+# memory — в памяти процесса; redis — общий для бота и FastAPI.
+# По умолчанию redis, если он включён (USE_REDIS).
+PENDING_PAYMENTS_BACKEND = os.getenv("PENDING_PAYMENTS_BACKEND") or (
+    "redis" if Env().bool("USE_REDIS", False) else "memory"
+)
+
+PENDING_PAYMENT_TTL = int(os.getenv("PENDING_PAYMENT_TTL", "86400"))
+
+PENDING_PAYMENTS_MAXSIZE = int(os.getenv("PENDING_PAYMENTS_MAXSIZE", "100000"))
+
+
+@dataclass(frozen=True)
+class PendingPayment:
+    """Выставленный, но ещё не оплаченный счёт."""
+
+    user_id: int
+    months: int
+    amount: int
+
+
+class PendingPaymentStore(ABC):
+    """Хранилище неоплаченных счетов по InvId с истечением по TTL."""
+
+    @abstractmethod
+    async def add_many(self, payments: Iterable[Tuple[int, PendingPayment]]) -> None:
+        """Сохраняет счета пачкой."""
+
+    @abstractmethod
+    async def get(self, inv_id: int) -> Optional[PendingPayment]:
+        """Счёт по InvId или None, если его нет или он истёк."""
+
+    @abstractmethod
+    async def pop(self, inv_id: int) -> Optional[PendingPayment]:
+        """Забирает счёт: повторный pop того же InvId вернёт None."""
+
+    async def add(self, inv_id: int, payment: PendingPayment) -> None:
+        await self.add_many([(inv_id, payment)])
+
+
+class MemoryPendingPaymentStore(PendingPaymentStore):
+    """Счета в памяти процесса: не больше maxsize, старые вытесняются."""
+
+    def __init__(
+        self,
+        maxsize: int = PENDING_PAYMENTS_MAXSIZE,
+        ttl: float = PENDING_PAYMENT_TTL,
+    ):
+        self._payments: TTLCache[PendingPayment] = TTLCache(maxsize, ttl)
+
+    async def add_many(self, payments: Iterable[Tuple[int, PendingPayment]]) -> None:
+        for inv_id, payment in payments:
+            self._payments.set(inv_id, payment)
+
+    async def get(self, inv_id: int) -> Optional[PendingPayment]:
+        return self._payments.get(inv_id)
+
+    async def pop(self, inv_id: int) -> Optional[PendingPayment]:
+        return self._payments.pop(inv_id)
+
+    def __len__(self) -> int:
+        return len(self._payments)
+
+
+class RedisPendingPaymentStore(PendingPaymentStore):
+    """
+    Счета в Redis: ключ на InvId с EX=ttl, поэтому их видят все
+    процессы. Размер ограничен TTL (и maxmemory самого Redis).
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        ttl: int = PENDING_PAYMENT_TTL,
+        prefix: str = "pending_payment:",
+    ):
+        self.redis = redis
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _key(self, inv_id: int) -> str:
+        return f"{self.prefix}{inv_id}"
+
+    @staticmethod
+    def _load(raw: Optional[bytes]) -> Optional[PendingPayment]:
+        if raw is None:
+            return None
+        return PendingPayment(**json.loads(raw))
+
+    async def add_many(self, payments: Iterable[Tuple[int, PendingPayment]]) -> None:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for inv_id, payment in payments:
+                pipe.set(self._key(inv_id), json.dumps(asdict(payment)), ex=self.ttl)
+            await pipe.execute()
+
+    async def get(self, inv_id: int) -> Optional[PendingPayment]:
+        return self._load(await self.redis.get(self._key(inv_id)))
+
+    async def pop(self, inv_id: int) -> Optional[PendingPayment]:
+        return self._load(await self.redis.getdel(self._key(inv_id)))
+
+
+def create_pending_store(
+    backend: str = PENDING_PAYMENTS_BACKEND,
+) -> PendingPaymentStore:
+    """Хранилище по PENDING_PAYMENTS_BACKEND (Redis — из RedisConfig)."""
+    if backend == "redis":
+        config = RedisConfig.from_env(Env())
+        return RedisPendingPaymentStore(Redis.from_url(config.dsn()))
+    logging.warning(
+        "⚠️ Неоплаченные счета хранятся в памяти процесса: FastAPI не увидит "
+        "счета, выставленные ботом в другом процессе "
+        "(PENDING_PAYMENTS_BACKEND=redis)"
+    )
+    return MemoryPendingPaymentStore()
+
+
+pending_payments = create_pending_store()
@@ -0,0 +1,91 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from types import FrameType
+from typing import Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "profiles"))
+
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+
+PROFILE_MAX_SECONDS = int(os.getenv("PROFILE_MAX_SECONDS", "120"))
+
+
+def _fold(frame: Optional[FrameType]) -> str:
+    """Стек от корня к листу в формате collapsed stacks (a;b;c)."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{Path(code.co_filename).name}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class LoopProfiler:
+    """
+    Сэмплирующий профайлер потока event loop: отдельный поток раз
+    в interval снимает стек потока loop, одинаковые стеки
+    суммируются. Результат пишется в файл collapsed stacks
+    («стек количество» на строку) — его понимают flamegraph.pl
+    и speedscope. Одновременно выполняется один профиль.
+    """
+
+    def __init__(
+        self,
+        directory: Path = PROFILE_DIR,
+        interval: float = PROFILE_INTERVAL_MS / 1000,
+    ):
+        self.directory = directory
+        self.interval = interval
+        self.running = False
+
+    def _sample(self, thread_id: int, seconds: float) -> Counter:
+        stacks: Counter = Counter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            frame = sys._current_frames().get(thread_id)
+            if frame is not None:
+                stacks[_fold(frame)] += 1
+            time.sleep(self.interval)
+        return stacks
+
+    def _dump(self, stacks: Counter) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"loop-{datetime.now():%Y%m%d-%H%M%S}.folded"
+        with path.open("w", encoding="utf-8") as file:
+            for stack, count in stacks.most_common():
+                file.write(f"{stack} {count}\n")
+        return path
+
+    async def profile(self, seconds: float) -> Path:
+        """
+        Профилирует event loop, из которого вызван, в течение seconds
+        секунд и возвращает путь к файлу профиля.
+        """
+        if self.running:
+            raise RuntimeError("Профилирование уже идёт")
+        seconds = min(seconds, PROFILE_MAX_SECONDS)
+        self.running = True
+        try:
+            logging.info("🔬 Профилирование event loop на %s с", seconds)
+            stacks = await asyncio.to_thread(
+                self._sample, threading.get_ident(), seconds
+            )
+            path = await asyncio.to_thread(self._dump, stacks)
+        finally:
+            self.running = False
+        logging.info("🔬 Профиль записан: %s (%s сэмплов)", path, sum(stacks.values()))
+        return path
+
+
+loop_profiler = LoopProfiler()
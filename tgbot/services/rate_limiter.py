@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from aiogram.exceptions import TelegramRetryAfter
+
+T = TypeVar("T")
+
+
+class TokenBucket:
+    """
+    Асинхронный token bucket: rate токенов в секунду, не больше capacity
+    подряд. Ожидающие корутины обслуживаются по очереди.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    def pause(self, seconds: float) -> None:
+        """Запрещает выдачу токенов на seconds секунд (flood control)."""
+        until = time.monotonic() + seconds
+        self._blocked_until = max(self._blocked_until, until)
+        self._tokens = 0
+        self._updated = until
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    await asyncio.sleep(self._blocked_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class BotRateLimiter:
+    """
+    Ограничитель вызовов Bot API: общий лимит на бота и отдельный
+    лимит на каждый чат. При TelegramRetryAfter ставит на паузу
+    общий bucket и повторяет вызов.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = 30,
+        per_chat_rate: float = 1,
+        max_chats: int = 10_000,
+        max_retries: int = 3,
+    ):
+        self.global_bucket = TokenBucket(global_rate)
+        self.per_chat_rate = per_chat_rate
+        self.max_chats = max_chats
+        self.max_retries = max_retries
+        self._chats: "OrderedDict[int, TokenBucket]" = OrderedDict()
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.per_chat_rate, capacity=1)
+            self._chats[chat_id] = bucket
+            if len(self._chats) > self.max_chats:
+                self._chats.popitem(last=False)
+        else:
+            self._chats.move_to_end(chat_id)
+        return bucket
+
+    async def call(
+        self,
+        method: Callable[[], Awaitable[T]],
+        chat_id: Optional[int] = None,
+    ) -> T:
+        """
+        Выполняет вызов Bot API с учётом лимитов.
+        chat_id=None — вызов без персонального лимита (бан, инвайты).
+        """
+        attempt = 0
+        while True:
+            if chat_id is not None:
+                await self._chat_bucket(chat_id).acquire()
+            await self.global_bucket.acquire()
+            try:
+                return await method()
+            except TelegramRetryAfter as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                logging.warning(
+                    "⏸ Flood control: пауза %s с (chat_id=%s)",
+                    e.retry_after,
+                    chat_id,
+                )
+                self.global_bucket.pause(e.retry_after)
@@ -0,0 +1,254 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+from xml.etree import ElementTree
+
+import aiohttp
+from dotenv import load_dotenv
+
+from tgbot.services.rate_limiter import TokenBucket
+
+load_dotenv()
+
+MERCHANT_LOGIN = os.getenv("ROBO_LOGIN")
+
+PASSWORD1 = os.getenv("ROBO_PASS1")
+
+PASSWORD2 = os.getenv("ROBO_PASS2")
+
+RECURRING_URL = os.getenv(
+    "ROBOKASSA_RECURRING_URL", "https://auth.robokassa.ru/Merchant/Recurring"
+)
+
+OP_STATE_URL = os.getenv(
+    "ROBOKASSA_OP_STATE_URL",
+    "https://auth.robokassa.ru/Merchant/WebService/Service.asmx/OpStateExt",
+)
+
+ROBOKASSA_TIMEOUT = float(os.getenv("ROBOKASSA_TIMEOUT", "10"))
+
+ROBOKASSA_CONNECT_TIMEOUT = float(os.getenv("ROBOKASSA_CONNECT_TIMEOUT", "3"))
+
+ROBOKASSA_CONNECTIONS = int(os.getenv("ROBOKASSA_CONNECTIONS", "20"))
+
+ROBOKASSA_RETRIES = int(os.getenv("ROBOKASSA_RETRIES", "3"))
+
+ROBOKASSA_RATE = float(os.getenv("ROBOKASSA_RATE", "10"))
+
+OP_STATE_NAMESPACES = {"r": "http://merchant.roboxchange.com/WebService/"}
+
+# Result/Code ответа OpStateExt, когда счёт Robokassa не известен.
+INVOICE_NOT_FOUND = 3
+
+# State/Code счёта: деньги получены (50, 100) или списание точно
+# не состоялось (10 — отменён, 60 — возвращён); остальные — в обработке.
+INVOICE_PAID_STATES = frozenset({50, 100})
+
+INVOICE_FAILED_STATES = frozenset({10, 60})
+
+
+class RobokassaError(Exception):
+    """Robokassa недоступна или ответила ошибкой сервера."""
+
+
+class CircuitOpenError(RobokassaError):
+    """Запрос не отправлен: circuit breaker разомкнут."""
+
+
+class CircuitBreaker:
+    """
+    Размыкается после failure_threshold ошибок подряд и отклоняет
+    запросы reset_timeout секунд, после чего пропускает один пробный.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.opened_at is not None or (self.failures >= self.failure_threshold):
+            if self.opened_at is None:
+                logging.error("🔌 Robokassa недоступна, запросы приостановлены")
+            self.opened_at = time.monotonic()
+
+
+class RobokassaClient:
+    """
+    Клиент API Robokassa с долгоживущей HTTP-сессией, таймаутами,
+    ограниченными повторами и circuit breaker.
+    """
+
+    def __init__(
+        self,
+        merchant_login: str = MERCHANT_LOGIN,
+        password1: str = PASSWORD1,
+        password2: str = PASSWORD2,
+        timeout: float = ROBOKASSA_TIMEOUT,
+        connect_timeout: float = ROBOKASSA_CONNECT_TIMEOUT,
+        connections: int = ROBOKASSA_CONNECTIONS,
+        max_retries: int = ROBOKASSA_RETRIES,
+        backoff: float = 0.5,
+        rate_limiter: Optional[TokenBucket] = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.merchant_login = merchant_login
+        self.password1 = password1
+        self.password2 = password2
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=connect_timeout)
+        self.connections = connections
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.rate_limiter = rate_limiter
+        self.breaker = breaker or CircuitBreaker()
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=self.timeout,
+                connector=aiohttp.TCPConnector(
+                    limit=self.connections, ttl_dns_cache=300
+                ),
+            )
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _send(self, method: str, url: str, **kwargs: Any) -> str:
+        async with self._get_session().request(method, url, **kwargs) as resp:
+            text = await resp.text()
+            if resp.status >= 500:
+                raise RobokassaError(f"HTTP {resp.status}: {text[:200]}")
+            return text
+
+    async def _request(
+        self, method: str, url: str, idempotent: bool, **kwargs: Any
+    ) -> str:
+        """
+        Выполняет запрос через circuit breaker. Идемпотентные запросы
+        повторяются при любой транспортной ошибке, остальные — только
+        если соединение не было установлено.
+        """
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                raise CircuitOpenError("Robokassa circuit breaker is open")
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire()
+            try:
+                text = await self._send(method, url, **kwargs)
+            except (
+                aiohttp.ClientError,
+                asyncio.TimeoutError,
+                RobokassaError,
+            ) as e:
+                self.breaker.record_failure()
+                retryable = idempotent or isinstance(e, aiohttp.ClientConnectorError)
+                attempt += 1
+                if not retryable or attempt > self.max_retries:
+                    raise RobokassaError(str(e) or type(e).__name__) from e
+                delay = self.backoff * 2 ** (attempt - 1)
+                logging.warning(
+                    "🔁 Robokassa %s: %s, повтор через %.1f с",
+                    url,
+                    e,
+                    delay,
+                )
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return text
+
+    async def charge_recurring(
+        self, recurring_id: str, amount: int, invoice_id: int
+    ) -> str:
+        """
+        Рекуррентное списание по ранее сохранённому recurring_id.
+        invoice_id выдаёт PaymentLedger: номер по времени совпадал бы
+        у списаний, сделанных в одну секунду. Запрос не повторяется:
+        при таймауте списание могло пройти, и его исход проверяется
+        по invoice_id через invoice_state.
+        """
+        out_sum = f"{amount:.2f}"
+
+        signature_str = (
+            f"{self.merchant_login}:{out_sum}:{invoice_id}:"
+            f"{recurring_id}:{self.password1}"
+        )
+        signature = hashlib.md5(signature_str.encode()).hexdigest()
+
+        payload: Dict[str, Any] = {
+            "MerchantLogin": self.merchant_login,
+            "OutSum": out_sum,
+            "InvoiceID": invoice_id,
+            "RecurringId": recurring_id,
+            "Description": "Продление подписки",
+            "SignatureValue": signature,
+        }
+        text = await self._request(
+            "POST", RECURRING_URL, idempotent=False, data=payload
+        )
+        logging.info("⚡ Recurring payment: %s", text)
+        return text
+
+    async def op_state(self, invoice_id: int) -> str:
+        """Статус счёта (OpStateExt), запрос идемпотентный."""
+        signature_str = f"{self.merchant_login}:{invoice_id}:{self.password2}"
+        params = {
+            "MerchantLogin": self.merchant_login,
+            "InvoiceID": str(invoice_id),
+            "Signature": hashlib.md5(signature_str.encode()).hexdigest(),
+        }
+        return await self._request("GET", OP_STATE_URL, idempotent=True, params=params)
+
+    async def invoice_state(self, invoice_id: int) -> Optional[int]:
+        """Код состояния счёта (State/Code) или None, если счёта нет."""
+        text = await self.op_state(invoice_id)
+        try:
+            root = ElementTree.fromstring(text)
+            result = int(
+                root.findtext("r:Result/r:Code", namespaces=OP_STATE_NAMESPACES)
+            )
+            if result == INVOICE_NOT_FOUND:
+                return None
+            if result != 0:
+                raise RobokassaError(f"OpStateExt: код {result}")
+            return int(root.findtext("r:State/r:Code", namespaces=OP_STATE_NAMESPACES))
+        except (ElementTree.ParseError, TypeError, ValueError) as e:
+            raise RobokassaError(f"Некорректный ответ OpStateExt: {e}") from e
+
+
+robokassa_client = RobokassaClient(rate_limiter=TokenBucket(ROBOKASSA_RATE))
@@ -0,0 +1,231 @@
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import pytz
+
+MoscowTimeZone = pytz.timezone("Europe/Moscow")
+
+MAX_SLEEP_SECONDS = 300
+
+RETRY_DELAY_SECONDS = 300
+
+
+class DailySchedule:
+    """Запуск раз в сутки в заданное время (по умолчанию по МСК)."""
+
+    def __init__(self, hour: int, minute: int = 0, tz=MoscowTimeZone):
+        self.at = time(hour, minute)
+        self.tz = tz
+
+    def _at_day(self, day) -> datetime:
+        return self.tz.localize(datetime.combine(day, self.at))
+
+    def previous(self, now: datetime) -> datetime:
+        """Последний плановый запуск не позже now."""
+        day = now.astimezone(self.tz).date()
+        due = self._at_day(day)
+        if due > now:
+            due = self._at_day(day - timedelta(days=1))
+        return due
+
+    def next(self, after: datetime) -> datetime:
+        """Первый плановый запуск строго после after."""
+        day = after.astimezone(self.tz).date()
+        due = self._at_day(day)
+        if due <= after:
+            due = self._at_day(day + timedelta(days=1))
+        return due
+
+    def __repr__(self) -> str:
+        return f"daily at {self.at:%H:%M} {self.tz}"
+
+
+class IntervalSchedule:
+    """Запуск каждые seconds секунд (выровнено по эпохе)."""
+
+    def __init__(self, seconds: int):
+        self.seconds = seconds
+
+    def previous(self, now: datetime) -> datetime:
+        ts = now.timestamp()
+        return datetime.fromtimestamp(ts - ts % self.seconds, tz=timezone.utc)
+
+    def next(self, after: datetime) -> datetime:
+        return self.previous(after) + timedelta(seconds=self.seconds)
+
+    def __repr__(self) -> str:
+        return f"every {self.seconds} s"
+
+
+class RenewalWindow:
+    """
+    Окно, по которому растягиваются продления: каждый пользователь
+    получает детерминированный слот (секунду от начала окна) по хэшу
+    user_id, и обрабатывается, когда окно дошло до его слота.
+    """
+
+    # Мультипликативный хэш Кнута; то же выражение используется в SQL.
+    HASH_MULTIPLIER = 2654435761
+    HASH_MODULUS = 2**32
+
+    def __init__(self, start_hour: int, hours: int, tz=MoscowTimeZone):
+        self.start = time(start_hour)
+        self.seconds = hours * 3600
+        self.tz = tz
+
+    def slot(self, user_id: int) -> int:
+        hashed = user_id * self.HASH_MULTIPLIER % self.HASH_MODULUS
+        return hashed % self.seconds
+
+    def sql_slot(self, column: str = "user_id") -> str:
+        """SQL-выражение, совпадающее с slot()."""
+        return (
+            f"(({column}::numeric * {self.HASH_MULTIPLIER}) "
+            f"% {self.HASH_MODULUS}) % {self.seconds}"
+        )
+
+    def offset(self, now: datetime) -> int:
+        """
+        Сколько секунд окна прошло к моменту now: -1 до начала окна,
+        self.seconds после его конца.
+        """
+        local = now.astimezone(self.tz)
+        start = self.tz.localize(datetime.combine(local.date(), self.start))
+        elapsed = int((now - start).total_seconds())
+        if elapsed < 0:
+            return -1
+        return min(elapsed, self.seconds)
+
+    def __repr__(self) -> str:
+        return f"window from {self.start:%H:%M}, {self.seconds} s"
+
+
+@dataclass
+class Job:
+    name: str
+    schedule: Any
+    func: Callable[[], Awaitable[Any]]
+    next_due: Optional[datetime] = None
+    running: Optional[asyncio.Task] = field(default=None, repr=False)
+
+
+class Scheduler:
+    """
+    Планировщик задач: спит до ближайшего запуска, хранит время
+    последнего успешного запуска в БД (scheduler_runs) и при старте
+    догоняет пропущенные запуски. Задача без истории впервые
+    запускается по расписанию, а не сразу: иначе первый деплой
+    выполнил бы её дважды (за прошлый и за ближайший слот).
+    Упавший запуск не отмечается выполненным и повторяется.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.jobs: List[Job] = []
+
+    def add_job(self, name: str, schedule, func: Callable[[], Awaitable[Any]]) -> None:
+        self.jobs.append(Job(name=name, schedule=schedule, func=func))
+
+    @staticmethod
+    def _now() -> datetime:
+        return datetime.now(timezone.utc)
+
+    async def _load_last_runs(self) -> Dict[str, datetime]:
+        rows = await self.db.fetch(
+            "SELECT job_name, last_run FROM public.scheduler_runs"
+        )
+        return {row["job_name"]: row["last_run"] for row in rows}
+
+    async def _save_last_run(self, job: Job, last_run: datetime) -> None:
+        await self.db.execute(
+            """
+            INSERT INTO public.scheduler_runs (job_name, last_run)
+            VALUES ($1, $2)
+            ON CONFLICT (job_name) DO UPDATE
+            SET last_run = EXCLUDED.last_run
+            """,
+            job.name,
+            last_run,
+        )
+
+    async def _plan(self) -> None:
+        """Вычисляет первый запуск каждой задачи с учётом пропусков."""
+        last_runs = await self._load_last_runs()
+        now = self._now()
+        for job in self.jobs:
+            last_run = last_runs.get(job.name)
+            job.next_due = job.schedule.next(last_run or now)
+            if job.next_due <= now:
+                logging.info(
+                    "📅 Задача %s пропустила запуск %s — догоняем",
+                    job.name,
+                    job.next_due,
+                )
+
+    async def _run(self, job: Job) -> None:
+        try:
+            await self._execute(job)
+        finally:
+            job.running = None
+
+    async def _execute(self, job: Job) -> None:
+        started = self._now()
+        logging.info("🔄 Запуск задачи %s", job.name)
+        try:
+            await job.func()
+        except Exception as e:
+            logging.error("❌ Ошибка в задаче %s: %s", job.name, e)
+            job.next_due = self._now() + timedelta(seconds=RETRY_DELAY_SECONDS)
+            return
+
+        completed = job.schedule.previous(started)
+        try:
+            await self._save_last_run(job, completed)
+        except Exception as e:
+            logging.error("⚠️ Не удалось сохранить запуск задачи %s: %s", job.name, e)
+        job.next_due = job.schedule.next(completed)
+        logging.info(
+            "✅ Задача %s завершена, следующий запуск %s",
+            job.name,
+            job.next_due,
+        )
+
+    async def run_forever(self) -> None:
+        await self._plan()
+        for job in self.jobs:
+            logging.info("📅 %s: %s", job.name, job.schedule)
+        try:
+            await self._loop()
+        finally:
+            # При отмене (например, потере лидерства) задачи не должны
+            # продолжать работу в фоне.
+            running = [j.running for j in self.jobs if j.running]
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+
+    async def _loop(self) -> None:
+        while True:
+            now = self._now()
+            for job in self.jobs:
+                if job.running is None and job.next_due <= now:
+                    job.running = asyncio.create_task(self._run(job))
+
+            idle = [j.next_due for j in self.jobs if j.running is None]
+            timeout = MAX_SLEEP_SECONDS
+            if idle:
+                timeout = (min(idle) - now).total_seconds()
+                timeout = min(max(timeout, 0), MAX_SLEEP_SECONDS)
+
+            running = [j.running for j in self.jobs if j.running]
+            if running:
+                await asyncio.wait(
+                    running,
+                    timeout=timeout,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+            else:
+                await asyncio.sleep(timeout)
@@ -0,0 +1,154 @@
+import logging
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Dict, Mapping, Optional
+
+STATS_QUERY = """
+    SELECT duration_months,
+           sum(users) AS active,
+           coalesce(sum(users) FILTER (WHERE end_subscription <= $2), 0)
+               AS expiring
+    FROM public.subscription_stats
+    WHERE end_subscription >= $1
+    GROUP BY duration_months
+    ORDER BY duration_months
+"""
+
+# Ключи агрегатов, расходящиеся с полным пересчётом (нулевые строки
+# агрегатов равны отсутствующим).
+DRIFT_QUERY = """
+    SELECT duration_months, end_subscription
+    FROM (
+        SELECT * FROM public.subscription_stats
+        WHERE users <> 0
+    ) AS s
+    FULL JOIN public.subscription_stats_recount AS r
+        USING (duration_months, end_subscription)
+    WHERE s.users IS DISTINCT FROM r.users
+    ORDER BY duration_months, end_subscription
+"""
+
+
+@dataclass
+class StatsSnapshot:
+    """Сводка для /stats."""
+
+    day: date
+    days: int
+    active: Dict[int, int] = field(default_factory=dict)
+    expiring: int = 0
+    mrr: float = 0.0
+
+    @property
+    def total(self) -> int:
+        return sum(self.active.values())
+
+
+class SubscriptionStats:
+    """
+    Статистика подписок по таблице subscription_stats, которую
+    триггеры privat_user обновляют при каждой записи. Запрос /stats
+    читает только агрегаты (тарифы × даты окончания), а не всех
+    пользователей; reconcile периодически сверяет их с полным
+    пересчётом и исправляет расходящиеся строки, не блокируя запись
+    в privat_user.
+    """
+
+    def __init__(self, db, prices: Mapping[int, int]):
+        self.db = db
+        self.prices = prices
+
+    async def snapshot(
+        self, days: int = 7, today: Optional[date] = None
+    ) -> StatsSnapshot:
+        """Активные по тарифам, истекающие за days дней и MRR."""
+        today = today or date.today()
+        rows = await self.db.fetch(STATS_QUERY, today, today + timedelta(days=days))
+        snapshot = StatsSnapshot(day=today, days=days)
+        for row in rows:
+            months = row["duration_months"]
+            snapshot.active[months] = row["active"]
+            snapshot.expiring += row["expiring"]
+            # Месячная выручка: цена тарифа, разнесённая по его месяцам.
+            if months in self.prices:
+                snapshot.mrr += row["active"] * self.prices[months] / months
+        return snapshot
+
+    async def reconcile(self) -> int:
+        """
+        Сверяет агрегаты с пересчётом по privat_user без блокировки
+        таблицы. Расхождения ищутся одним запросом: агрегаты пишутся
+        триггерами в той же транзакции, что и privat_user, поэтому
+        в снимке запроса они согласованы. Каждый расходящийся ключ
+        затем исправляется отдельно (_fix_key) под блокировкой его
+        строки агрегата. Возвращает число исправленных строк агрегатов.
+        """
+        drifted = await self.db.fetch(DRIFT_QUERY)
+        if drifted:
+            async with self.db.acquire() as conn:
+                for row in drifted:
+                    await self._fix_key(
+                        conn, row["duration_months"], row["end_subscription"]
+                    )
+            logging.warning("📊 Статистика расходилась: %s строк", len(drifted))
+        else:
+            logging.info("📊 Статистика сверена без расхождений")
+        return len(drifted)
+
+    @staticmethod
+    async def _fix_key(conn, months: int, end_subscription: date) -> None:
+        """
+        Пересчитывает одну строку агрегатов. Строка создаётся, если её
+        нет, и блокируется (FOR UPDATE): записи в privat_user с этим
+        ключом ждут её в триггере, а уже закоммиченные видны пересчёту,
+        который выполняется следующим запросом с новым снимком.
+        """
+        async with conn.transaction():
+            await conn.execute(
+                """
+                INSERT INTO public.subscription_stats
+                    (duration_months, end_subscription, users)
+                VALUES ($1, $2, 0)
+                ON CONFLICT DO NOTHING
+                """,
+                months,
+                end_subscription,
+            )
+            await conn.execute(
+                """
+                SELECT 1 FROM public.subscription_stats
+                WHERE duration_months = $1 AND end_subscription = $2
+                FOR UPDATE
+                """,
+                months,
+                end_subscription,
+            )
+            await conn.execute(
+                """
+                UPDATE public.subscription_stats
+                SET users = (
+                    SELECT count(*)
+                    FROM public.privat_user
+                    WHERE coalesce(duration_months, 0) = $1
+                      AND (
+                        end_subscription = $2
+                        OR ($2 = '-infinity'::date AND end_subscription IS NULL)
+                      )
+                )
+                WHERE duration_months = $1 AND end_subscription = $2
+                """,
+                months,
+                end_subscription,
+            )
+
+
+def format_stats(snapshot: StatsSnapshot) -> str:
+    """Текст ответа на /stats."""
+    lines = [f"📊 Статистика на {snapshot.day:%d.%m.%Y}"]
+    lines.append(f"Активных подписчиков: {snapshot.total}")
+    for months, count in snapshot.active.items():
+        label = f"{months} мес." if months else "без тарифа"
+        lines.append(f"  • {label}: {count}")
+    lines.append(f"Истекают в ближайшие {snapshot.days} дн.: {snapshot.expiring}")
+    lines.append(f"MRR: {snapshot.mrr:,.0f} ₽".replace(",", " "))
+    return "\n".join(lines)
@@ -0,0 +1,163 @@
+import logging
+import os
+import random
+from abc import ABC, abstractmethod
+from typing import Iterable
+
+from dotenv import load_dotenv
+from environs import Env
+from redis.asyncio import Redis
+
+from tgbot.config import RedisConfig
+from tgbot.misc.cache import TTLCache
+
+load_dotenv()
+
+# invite — ссылка из пула после оплаты; join_request — общая ссылка
+# с заявками на вступление, которые бот одобряет по кэшу подписчиков.
+CHANNEL_ACCESS_MODE = os.getenv("CHANNEL_ACCESS_MODE", "invite")
+
+# memory — в памяти процесса; redis — общий для бота и FastAPI.
+SUBSCRIBER_CACHE_BACKEND = os.getenv("SUBSCRIBER_CACHE_BACKEND", "memory")
+
+# Сколько секунд memory-кэш верит записи без проверки по БД.
+SUBSCRIBER_CACHE_TTL = int(os.getenv("SUBSCRIBER_CACHE_TTL", "300"))
+
+SUBSCRIBER_CACHE_MAXSIZE = int(os.getenv("SUBSCRIBER_CACHE_MAXSIZE", "1000000"))
+
+ACTIVE_SUBSCRIBERS_QUERY = """
+    SELECT user_id FROM public.privat_user
+    WHERE end_subscription >= CURRENT_DATE
+"""
+
+
+class SubscriberCache(ABC):
+    """
+    Множество user_id с активной подпиской для решения по заявкам
+    на вступление. Заполняется из privat_user при старте и
+    обновляется при оплате, продлении и удалении.
+    """
+
+    @abstractmethod
+    async def warm(self, db) -> int:
+        """Заполняет кэш активными подписчиками; возвращает их число."""
+
+    @abstractmethod
+    async def add_many(self, user_ids: Iterable[int]) -> None:
+        """Отмечает пользователей активными (оплата, продление)."""
+
+    @abstractmethod
+    async def discard_many(self, user_ids: Iterable[int]) -> None:
+        """Убирает пользователей (подписка завершена)."""
+
+    @abstractmethod
+    async def contains(self, user_id: int) -> bool:
+        """Есть ли пользователь в кэше (без обращения к БД)."""
+
+    async def add(self, user_id: int) -> None:
+        await self.add_many([user_id])
+
+    async def is_active(self, user_id: int, db) -> bool:
+        """
+        Проверка по кэшу; при промахе — по БД (оплата могла пройти
+        в другом процессе), и найденный подписчик попадает в кэш.
+        """
+        if await self.contains(user_id):
+            return True
+        active = await db.fetchval(
+            ACTIVE_SUBSCRIBERS_QUERY + " AND user_id = $1", user_id
+        )
+        if active is None:
+            return False
+        await self.add(user_id)
+        return True
+
+
+class MemorySubscriberCache(SubscriberCache):
+    """
+    Кэш в памяти процесса. Удаления при продлении видит только
+    процесс-лидер, поэтому запись живёт не дольше ttl секунд, после
+    чего is_active перепроверяет пользователя по БД.
+    """
+
+    def __init__(
+        self,
+        ttl: float = SUBSCRIBER_CACHE_TTL,
+        maxsize: int = SUBSCRIBER_CACHE_MAXSIZE,
+    ):
+        self.ttl = ttl
+        self._user_ids: TTLCache[bool] = TTLCache(maxsize, ttl)
+
+    async def warm(self, db) -> int:
+        rows = await db.fetch(ACTIVE_SUBSCRIBERS_QUERY)
+        self._user_ids.clear()
+        for row in rows:
+            # Разброс, чтобы записи прогрева не истекали одновременно.
+            self._user_ids.set(
+                row["user_id"], True, ttl=self.ttl * random.uniform(0.5, 1)
+            )
+        logging.info("👥 Кэш подписчиков: %s", len(rows))
+        return len(rows)
+
+    async def add_many(self, user_ids: Iterable[int]) -> None:
+        for user_id in user_ids:
+            self._user_ids.set(user_id, True)
+
+    async def discard_many(self, user_ids: Iterable[int]) -> None:
+        for user_id in user_ids:
+            self._user_ids.pop(user_id)
+
+    async def contains(self, user_id: int) -> bool:
+        return user_id in self._user_ids
+
+
+class RedisSubscriberCache(SubscriberCache):
+    """Кэш в Redis SET — общий для всех процессов."""
+
+    def __init__(self, redis: Redis, key: str = "subscribers:active"):
+        self.redis = redis
+        self.key = key
+
+    async def warm(self, db) -> int:
+        rows = await db.fetch(ACTIVE_SUBSCRIBERS_QUERY)
+        user_ids = [row["user_id"] for row in rows]
+        # Новое множество собирается рядом и подменяет старое атомарно.
+        staging = f"{self.key}:warming"
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(staging)
+            for i in range(0, len(user_ids), 10_000):
+                end = i + 10_000
+                pipe.sadd(staging, *user_ids[i:end])
+            if user_ids:
+                pipe.rename(staging, self.key)
+            else:
+                pipe.delete(self.key)
+            await pipe.execute()
+        logging.info("👥 Кэш подписчиков: %s", len(user_ids))
+        return len(user_ids)
+
+    async def add_many(self, user_ids: Iterable[int]) -> None:
+        user_ids = list(user_ids)
+        if user_ids:
+            await self.redis.sadd(self.key, *user_ids)
+
+    async def discard_many(self, user_ids: Iterable[int]) -> None:
+        user_ids = list(user_ids)
+        if user_ids:
+            await self.redis.srem(self.key, *user_ids)
+
+    async def contains(self, user_id: int) -> bool:
+        return bool(await self.redis.sismember(self.key, user_id))
+
+
+def create_subscriber_cache(
+    backend: str = SUBSCRIBER_CACHE_BACKEND,
+) -> SubscriberCache:
+    """Кэш по SUBSCRIBER_CACHE_BACKEND (Redis — из RedisConfig)."""
+    if backend == "redis":
+        config = RedisConfig.from_env(Env())
+        return RedisSubscriberCache(Redis.from_url(config.dsn()))
+    return MemorySubscriberCache()
+
+
+subscribers = create_subscriber_cache()
@@ -0,0 +1,66 @@
+import os
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from dotenv import load_dotenv
+
+from tgbot.services.metrics import BotApiMetricsMiddleware
+from tgbot.services.rate_limiter import BotRateLimiter
+
+load_dotenv()
+
+BOT_CONNECTIONS = int(os.getenv("BOT_CONNECTIONS", "100"))
+
+BOT_KEEPALIVE = float(os.getenv("BOT_KEEPALIVE", "60"))
+
+BOT_REQUEST_TIMEOUT = float(os.getenv("BOT_REQUEST_TIMEOUT", "30"))
+
+# Собственный Bot API сервер (или заглушка в нагрузочных тестах).
+BOT_API_SERVER = os.getenv("BOT_API_SERVER")
+
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))
+
+TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", "1"))
+
+# Общий для процесса учёт лимитов Bot API.
+telegram_limiter = BotRateLimiter(
+    global_rate=TELEGRAM_GLOBAL_RATE, per_chat_rate=TELEGRAM_CHAT_RATE
+)
+
+_bot: Optional[Bot] = None
+
+
+def create_session() -> AiohttpSession:
+    """HTTP-сессия Bot API с ограничением соединений и keep-alive."""
+    session = AiohttpSession(limit=BOT_CONNECTIONS, timeout=BOT_REQUEST_TIMEOUT)
+    if BOT_API_SERVER:
+        session.api = TelegramAPIServer.from_base(BOT_API_SERVER)
+    # Параметры TCPConnector, который aiogram создаёт при первом запросе.
+    session._connector_init["keepalive_timeout"] = BOT_KEEPALIVE
+    session.middleware(BotApiMetricsMiddleware())
+    return session
+
+
+def get_bot(token: Optional[str] = None) -> Bot:
+    """
+    Единственный Bot процесса: создаётся при первом вызове и дальше
+    используется хэндлерами, планировщиком и платёжными эндпоинтами.
+    """
+    global _bot
+    if _bot is None:
+        _bot = Bot(
+            token=token or os.getenv("BOT_TOKEN"),
+            session=create_session(),
+            default=DefaultBotProperties(parse_mode="HTML"),
+        )
+    return _bot
+
+
+async def close_bot() -> None:
+    global _bot
+    if _bot is not None:
+        await _bot.session.close()
+        _bot = None
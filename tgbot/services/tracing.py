@@ -0,0 +1,82 @@
+import contextvars
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Порог, после которого update или HTTP-запрос логируется как медленный.
+SLOW_UPDATE_SECONDS = float(os.getenv("SLOW_UPDATE_SECONDS", "1"))
+
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "1"))
+
+_current: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar(
+    "trace", default=None
+)
+
+
+class Trace:
+    """
+    Трассировка одного update или HTTP-запроса: общее время и
+    отрезки (хэндлер, вызовы Bot API, запросы к БД), записанные
+    внутри него, в том числе из порождённых задач.
+    """
+
+    def __init__(self, name: str, max_spans: int = 100):
+        self.name = name
+        self.max_spans = max_spans
+        self.started = time.perf_counter()
+        self.spans: List[Tuple[str, float]] = []
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def add(self, name: str, seconds: float) -> None:
+        if len(self.spans) < self.max_spans:
+            self.spans.append((name, seconds))
+
+    def summary(self, limit: int = 5) -> str:
+        """Самые долгие отрезки, например «api:SendPhoto 1.20 с»."""
+        slowest = sorted(self.spans, key=lambda span: span[1], reverse=True)
+        return ", ".join(f"{name} {seconds:.2f} с" for name, seconds in slowest[:limit])
+
+
+@contextmanager
+def trace(name: str, slow_seconds: float) -> Iterator[Trace]:
+    """Трассировка блока; если он дольше slow_seconds — в лог."""
+    current = Trace(name)
+    token = _current.set(current)
+    try:
+        yield current
+    finally:
+        _current.reset(token)
+        elapsed = current.elapsed
+        if elapsed >= slow_seconds:
+            logging.warning(
+                "🐢 Медленно: %s — %.2f с (%s)",
+                name,
+                elapsed,
+                current.summary() or "без вложенных вызовов",
+            )
+
+
+def record_span(name: str, seconds: float) -> None:
+    """Добавляет отрезок к текущей трассировке (вне её ничего не делает)."""
+    current = _current.get()
+    if current is not None:
+        current.add(name, seconds)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Засекает блок как отрезок текущей трассировки."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - started)